@@ -1,30 +1,136 @@
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Iterator
+
 import bcrypt
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from ... import schemas, models, dependencies
-from ...code_generator import generate_full_code_on_server  # Наша будущая логика
+from ... import schemas, dependencies, crud, metrics, security, step_naming, wire
+from ...assets import asset_store
+from ...cache import canonical_hash, generation_cache
+from ...core import config
+from ...code_generator import code_diff, generate_full_code, generation_cache_key, group_test_cases_by_page
+from ...export import iter_project_files, stream_zip
+from ...executor import ExecutorSaturated, generation_executor
+from ...jobs import job_registry, run_generation_job
 from ...models import User, License
+from ...security import LicenseState
+from ...test_case_store import test_case_store
 
 router = APIRouter()
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверяет заголовок If-None-Match (список ETag через запятую, допускаются слабые W/"...")."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _content_digest(request: schemas.GenerationRequest, body: bytes) -> str:
+    """
+    Отпечаток тест-кейсов запроса для ключа кэша. С манифестом это его хеши (их считает клиент,
+    активный тест-кейс тоже в манифесте) - тест-кейсы заново не сериализуются; иначе - SHA-256 тела.
+    """
+    if request.testCaseManifest is not None:
+        if any(ref.id == request.activeTestCase.id for ref in request.testCaseManifest):
+            return canonical_hash({
+                "manifest": [[ref.id, ref.hash] for ref in request.testCaseManifest],
+                "active": request.activeTestCase.id,
+            })
+    return wire.body_digest(body, request.previousEtag)
+
+
+def _resolve_test_cases(request: schemas.GenerationRequest, license_id: int):
+    """
+    Тест-кейсы страницы для генерации: (активный, все, их IR или None, id недостающих, id несохраненных).
+    Синхронная: с манифестом сохраняет и компилирует присланные тест-кейсы.
+    """
+    # Конвертируем Pydantic модели в обычные словари Python (без повторного копирования шагов)
+    active_test_case_dict = request.activeTestCase.to_generator_dict()
+    if request.testCaseManifest is None:
+        all_test_cases_dicts = [tc.to_generator_dict() for tc in request.allTestCasesForPage]
+        return active_test_case_dict, all_test_cases_dicts, None, [], []
+    # Дельта-синхронизация: недостающие тест-кейсы страницы берутся из хранилища лицензии
+    uploaded = {tc.id: tc.to_generator_dict() for tc in request.allTestCasesForPage if tc.id}
+    if request.activeTestCase.id:
+        uploaded[request.activeTestCase.id] = active_test_case_dict  # Тот же объект - IR не строится дважды
+    all_test_cases_dicts, compiled_test_cases, missing, not_stored = test_case_store.resolve(
+        license_id, request.testCaseManifest, uploaded
+    )
+    return active_test_case_dict, all_test_cases_dicts, compiled_test_cases, missing, not_stored
+
+
 @router.post("/generate", response_model=schemas.GenerationResponse)
 async def generate_test_code(
-        request: schemas.GenerationRequest,
-        license: models.License = Depends(dependencies.get_valid_license)
+        raw_request: Request,
+        request: schemas.GenerationRequest = Depends(wire.read_generation_request),
+        if_none_match: str | None = Header(default=None),
+        license: LicenseState = Depends(dependencies.get_valid_license)
 ):
     try:
-        # Конвертируем Pydantic модели в обычные словари Python
-        active_test_case_dict = request.activeTestCase.model_dump()
-        all_test_cases_dicts = [tc.model_dump() for tc in request.allTestCasesForPage]
-
-        generated_code = await generate_full_code_on_server(
-            active_test_case=active_test_case_dict,  # <-- Передается словарь
-            all_test_cases_for_page=all_test_cases_dicts,  # <-- Передается список словарей
-            state_data=request.stateData,  # Это уже словарь, менять не нужно
-            options=request.options  # Это тоже словарь
+        # Все CPU-шаги запроса (ключ кэша, сборка тест-кейсов, генерация, diff) выполняются вне event loop
+        # и под одним допуском generation_executor: большой запрос не блокирует остальные и не обходит лимиты
+        with generation_executor.reservation(license.id):
+            # Одинаковый вход дает одинаковый код: ключ кэша служит и ETag-ом ответа
+            content_digest = await generation_executor.run_local(_content_digest, request, raw_request.state.body)
+            cache_key = generation_cache_key(license.id, content_digest, request.stateData, request.options)
+            etag = f'"{cache_key}"'
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+            cached = generation_cache.get(cache_key)
+            not_stored = []
+            if cached is None or request.testCaseManifest is not None:
+                # С манифестом присланные тест-кейсы сохраняются и при попадании в кэш: клиент считает их синхронизированными
+                active_test_case_dict, all_test_cases_dicts, compiled_test_cases, missing, not_stored = (
+                    await generation_executor.run_local(_resolve_test_cases, request, license.id)
+                )
+            if cached is None:
+                if missing:
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"missing": missing})
+                if generation_executor.kind == "process":
+                    compiled_test_cases = None  # IR дешевле построить заново, чем передать в процесс
+                # Генерация - CPU-bound, выполняем ее в пуле, чтобы не блокировать event loop
+                with metrics.stage_timer("generate"):
+                    generated_code = await generation_executor.run_reserved(
+                        generate_full_code,
+                        active_test_case=active_test_case_dict,  # <-- Передается словарь
+                        all_test_cases_for_page=all_test_cases_dicts,  # <-- Передается список словарей
+                        state_data=request.stateData,  # Это уже словарь, менять не нужно
+                        options=request.options,  # Это тоже словарь
+                        compiled_test_cases=compiled_test_cases,  # IR тест-кейсов из хранилища, если есть
+                    )
+                generation_cache.set(cache_key, (license.id, generated_code))
+            else:
+                generated_code = cached[1]
+
+            diff = None
+            previous_key = (request.previousEtag or "").removeprefix("W/").strip('"')
+            if previous_key:
+                previous = (license.id, generated_code) if previous_key == cache_key else generation_cache.get(previous_key)
+                # Код чужой лицензии по ее ETag не отдается
+                if previous is not None and previous[0] == license.id:
+                    diff = await generation_executor.run_local(code_diff, previous[1], generated_code)
+
+        # Ответ сериализуется здесь, а не FastAPI, чтобы стадию serialize можно было замерить
+        with metrics.stage_timer("serialize"):
+            body = schemas.GenerationResponse(
+                code=generated_code, diff=diff, notStoredTestCases=not_stored or None
+            ).model_dump_json(exclude_none=True)
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)},
         )
-        return {"code": generated_code}
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print("Code generation failed:", e)
@@ -32,9 +138,125 @@ async def generate_test_code(
         raise HTTPException(status_code=500, detail="Failed to generate code on the server.")
 
 
+# --- ФОНОВЫЕ ЗАДАНИЯ ДЛЯ ЦЕЛЫХ КОЛЛЕКЦИЙ ---
+
+@router.post("/generate/jobs", response_model=schemas.JobStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+        request: schemas.CollectionGenerationRequest = Depends(wire.read_collection_request),
+        license: LicenseState = Depends(dependencies.get_valid_license)
+):
+    """Ставит генерацию всей коллекции в фон и сразу возвращает id задания."""
+    if job_registry.active_count(license.id) >= job_registry.max_active_per_license:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many active jobs")
+
+    test_cases = [tc.to_generator_dict() for tc in request.testCases]
+    job = job_registry.create(license.id, total=len(group_test_cases_by_page(test_cases)))
+    job.task = asyncio.create_task(run_generation_job(job, test_cases, request.stateData, request.options))
+    return job.snapshot()
+
+
+def _get_job_or_404(job_id: str, license: LicenseState):
+    job = job_registry.get(job_id, license.id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/generate/jobs/{job_id}", response_model=schemas.JobStatusResponse)
+async def get_generation_job(job_id: str, license: LicenseState = Depends(dependencies.get_valid_license)):
+    return _get_job_or_404(job_id, license).snapshot()
+
+
+@router.get("/generate/jobs/{job_id}/events")
+async def stream_generation_job_events(job_id: str, license: LicenseState = Depends(dependencies.get_valid_license)):
+    """Server-Sent Events: событие "progress" на каждое изменение и финальное "done"/"failed"."""
+    job = _get_job_or_404(job_id, license)
+
+    async def event_stream():
+        while True:
+            changed = job.changed  # Берем событие до снимка, чтобы не пропустить обновление
+            snapshot = job.snapshot()
+            event_name = snapshot["status"] if job.is_finished else "progress"
+            yield f"event: {event_name}\ndata: {json.dumps(snapshot)}\n\n"
+            if job.is_finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=config.JOB_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/generate/jobs/{job_id}/result", response_model=schemas.JobResultResponse)
+async def get_generation_job_result(job_id: str, license: LicenseState = Depends(dependencies.get_valid_license)):
+    job = _get_job_or_404(job_id, license)
+    if job.status == "failed":
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job is not finished yet")
+    return {"pages": job.results, "basePage": job.base_page}
+
+
+# --- ЭКСПОРТ ГОТОВОГО PYTEST-ПРОЕКТА ---
+
+async def _reserved_stream(chunks: Iterator[bytes], license_id: int) -> AsyncIterator[bytes]:
+    """
+    Отдает куски синхронного генератора, вычисляя каждый вне event loop под допуском generation_executor.
+    Место занимается при старте потока и освобождается по его окончании или обрыву.
+    """
+    with generation_executor.reservation(license_id):
+        while True:
+            chunk = await generation_executor.run_local(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+@router.post("/export")
+async def export_project(
+        request: schemas.CollectionGenerationRequest = Depends(wire.read_collection_request),
+        license: LicenseState = Depends(dependencies.get_valid_license)
+):
+    """
+    Отдает zip с готовым к запуску проектом: pages/, tests/, conftest.py.
+    Архив генерируется и передается потоково, файл за файлом.
+    """
+    # Проверяем допуск до ответа: когда поток начался, отказать с 503 уже нельзя
+    try:
+        generation_executor.check_admission(license.id)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    test_cases = [tc.to_generator_dict() for tc in request.testCases]
+    collection_name = request.stateData.get("collections", {}).get(
+        request.stateData.get("activeCollectionId"), {}
+    ).get("name", "autotests")
+    # В заголовке допустим только latin-1, поэтому оставляем в имени файла лишь ASCII
+    filename = re.sub(r"[^A-Za-z0-9_-]+", "_", str(collection_name)).strip("_") or "autotests"
+    return StreamingResponse(
+        _reserved_stream(stream_zip(iter_project_files(test_cases, request.stateData, request.options)), license.id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+    )
+
+
+@router.get("/stats")
+async def get_stats():
+    """Счетчики кэшей и очередей сервера."""
+    return {
+        "generation_cache": generation_cache.stats(),
+        "executor": generation_executor.stats(),
+        "test_case_store": test_case_store.stats(),
+    }
+
+
 @router.get("/validate")
 async def validate_license(
-        license: models.License = Depends(dependencies.get_valid_license)
+        license: LicenseState = Depends(dependencies.get_valid_license)
 ):
     """
     Эндпоинт для проверки ключа из расширения.
@@ -42,6 +264,74 @@ async def validate_license(
     return {"status": "valid", "expires_at": license.expires_at}
 
 
+@router.post("/token", response_model=schemas.TokenResponse)
+async def exchange_license_key_for_token(
+        license: LicenseState = Depends(dependencies.get_license_for_token_exchange)
+):
+    """
+    Обменивает лицензионный ключ на подписанный токен. Запросы с токеном
+    проверяются без обращения к БД до истечения его срока.
+    """
+    token, expires_in = security.create_license_token(license)
+    return {"access_token": token, "expires_in": expires_in}
+
+
+# --- ИМЕНА ШАГОВ ALLURE ЧЕРЕЗ LLM ---
+
+@router.post("/step-names", response_model=schemas.StepNamingResponse)
+async def name_steps(
+        request: schemas.StepNamingRequest,
+        license: LicenseState = Depends(dependencies.get_valid_license)
+):
+    """
+    Имена шагов Allure для пачки шагов: повторы берутся из кэша, остальные - одним промптом к LLM.
+    Если LLM не ответила вовремя, возвращаются шаблонные имена.
+    """
+    if len(request.steps) > config.STEP_NAMING_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail="Too many steps")
+    keys = [(step.action, step.element, step.value) for step in request.steps]
+    return await run_in_threadpool(step_naming.name_steps, keys)
+
+
+# --- АССЕТЫ (скриншоты шагов) ---
+# Расширение загружает каждый скриншот один раз, а в /generate передает только его хеш.
+
+@router.post("/assets/check", response_model=schemas.AssetCheckResponse)
+async def check_assets(
+        request: schemas.AssetCheckRequest,
+        license: LicenseState = Depends(dependencies.get_valid_license)
+):
+    """Возвращает хеши, которых еще нет на сервере и которые нужно загрузить."""
+    if len(request.hashes) > config.MAX_ASSET_CHECK_HASHES:
+        raise HTTPException(status_code=413, detail="Too many hashes")
+    invalid = [h for h in request.hashes if not asset_store.is_valid_digest(h)]
+    if invalid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid asset hashes: {invalid[:5]}")
+    missing = await run_in_threadpool(asset_store.missing, request.hashes)
+    return {"missing": missing}
+
+
+@router.put("/assets/{digest}")
+async def upload_asset(
+        digest: str,
+        request: Request,
+        license: LicenseState = Depends(dependencies.get_valid_license)
+):
+    """Загружает ассет. Тело запроса - сырые байты, digest - их SHA-256 в hex."""
+    if not asset_store.is_valid_digest(digest):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid asset hash")
+    if await run_in_threadpool(asset_store.exists, digest):
+        return {"hash": digest, "stored": False}
+
+    # Content-Length проверяется до чтения, а тело читается потоком с обрывом на лимите: память не растет выше него
+    data = await wire.read_limited_body(request, config.MAX_ASSET_BYTES)
+    try:
+        await run_in_threadpool(asset_store.put, data, digest)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"hash": digest, "stored": True}
+
+
 # --- ЗАГЛУШКИ ДЛЯ УПРАВЛЕНИЯ ПОДПИСКОЙ ---
 # В реальном приложении здесь будет логика регистрации, оплаты через Stripe/Paddle и т.д.
 
@@ -65,3 +355,12 @@ async def create_user_and_license(email: str, db=Depends(dependencies.get_db)):
     db.refresh(db_license)
 
     return {"email": db_user.email, "license_key": db_license.key, "expires_at": db_license.expires_at}
+
+
+@router.post("/dev/deactivate-license")
+async def deactivate_license(license_key: str, db=Depends(dependencies.get_db)):
+    db_license = crud.deactivate_license(db, key=license_key)
+    if not db_license:
+        raise HTTPException(status_code=404, detail="License not found")
+    dependencies.invalidate_license(LicenseState.from_model(db_license))
+    return {"license_key": db_license.key, "is_active": db_license.is_active}
@@ -0,0 +1,74 @@
+# app/assets.py
+import hashlib
+import os
+import re
+import tempfile
+from typing import Iterable, List, Optional
+
+from .core import config
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class AssetStore:
+    """
+    Файловое хранилище бинарных ассетов (скриншотов шагов), адресуемое SHA-256 от содержимого.
+    Один и тот же скриншот хранится ровно один раз, сколько бы тест-кейсов на него ни ссылалось.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @staticmethod
+    def compute_digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def is_valid_digest(digest: str) -> bool:
+        return bool(_DIGEST_RE.match(digest or ""))
+
+    def _path(self, digest: str) -> str:
+        # Раскладываем по подкаталогам, чтобы не держать десятки тысяч файлов в одной папке
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return self.is_valid_digest(digest) and os.path.exists(self._path(digest))
+
+    def missing(self, digests: Iterable[str]) -> List[str]:
+        """Возвращает хеши, которых еще нет в хранилище (без дубликатов, с сохранением порядка)."""
+        return [d for d in dict.fromkeys(digests) if not self.exists(d)]
+
+    def put(self, data: bytes, digest: Optional[str] = None) -> str:
+        """
+        Сохраняет содержимое и возвращает его хеш.
+        Если передан ожидаемый хеш, он должен совпасть с фактическим, иначе ValueError.
+        """
+        actual = self.compute_digest(data)
+        if digest is not None and digest != actual:
+            raise ValueError(f"Хеш содержимого {actual} не совпадает с заявленным {digest}")
+        path = self._path(actual)
+        if os.path.exists(path):
+            return actual
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Пишем во временный файл и атомарно переименовываем, чтобы параллельные
+        # загрузки одного и того же скриншота не видели недописанный файл.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return actual
+
+    def get(self, digest: str) -> Optional[bytes]:
+        if not self.exists(digest):
+            return None
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+
+asset_store = AssetStore(config.ASSET_STORE_DIR)
@@ -0,0 +1,120 @@
+# app/cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from .core import config
+
+
+def canonical_hash(obj: Any) -> str:
+    """SHA-256 от канонического JSON (сортированные ключи, без пробелов) - не зависит от порядка ключей."""
+    payload = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш с TTL и ограничением по количеству записей и суммарному размеру значений.
+    Размер значения считается функцией sizeof (по умолчанию len) либо передается явно в set().
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 1024,
+            max_bytes: Optional[int] = None,
+            ttl_seconds: Optional[float] = None,
+            sizeof: Callable[[Any], int] = len,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """Сохраняет значение. False - значение больше всего кэша и не сохранено."""
+        if size is None:
+            size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False  # Значение больше всего кэша - не кэшируем
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._data and (
+                    len(self._data) > self.max_entries
+                    or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Кэш сгенерированного кода: ключ - канонический хеш запроса, значение - (id лицензии, код)
+generation_cache = LRUCache(
+    max_entries=config.GENERATION_CACHE_MAX_ENTRIES,
+    max_bytes=config.GENERATION_CACHE_MAX_BYTES,
+    ttl_seconds=config.GENERATION_CACHE_TTL_SECONDS,
+    sizeof=lambda entry: len(entry[1].encode("utf-8")),  # (id лицензии, код)
+)
@@ -0,0 +1,195 @@
+# app/cli.py
+"""
+Офлайн-генерация кода из экспортированных записей, без HTTP и проверки лицензии.
+
+    python -m app.cli recordings/ generated/ --workers 8
+
+Поддерживаемые JSON-файлы:
+  * запрос /generate (activeTestCase, allTestCasesForPage, ...) -> один .py файл;
+  * запрос для коллекции (testCases, stateData, ...) -> дерево pytest-проекта;
+  * экспорт состояния расширения (testCases, collections, ...) -> дерево pytest-проекта.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Tuple
+
+from . import schemas
+from .code_generator import GENERATOR_VERSION, generate_full_code
+from .export import iter_project_files
+from .step_ir import count_steps
+
+MANIFEST_NAME = ".codegen-manifest.json"
+
+
+def _state_export_to_collection(raw: Dict) -> Dict:
+    """Экспорт состояния расширения хранит тест-кейсы словарем id -> тест-кейс."""
+    return {
+        "testCases": list(raw["testCases"].values()),
+        "stateData": {key: raw.get(key) for key in ("collections", "activeCollectionId", "environments", "activeEnvironment")},
+    }
+
+
+def _build_outputs(raw: Dict, output_base: str) -> Tuple[Iterable[Tuple[str, Iterable[str]]], int]:
+    """Валидирует вход схемами API и возвращает (файлы для записи, число шагов)."""
+    if "activeTestCase" in raw:
+        request = schemas.GenerationRequest.model_validate(raw)
+        code = generate_full_code(
+            request.activeTestCase.to_generator_dict(),
+            [tc.to_generator_dict() for tc in request.allTestCasesForPage],
+            request.stateData,
+            request.options,
+        )
+        return [(output_base + ".py", [code])], count_steps(request.activeTestCase.recordedSteps)
+
+    if isinstance(raw.get("testCases"), dict):
+        raw = _state_export_to_collection(raw)
+    request = schemas.CollectionGenerationRequest.model_validate(raw)
+    test_cases = [tc.to_generator_dict() for tc in request.testCases]
+    files = (
+        (os.path.join(output_base, path), chunks)
+        for path, chunks in iter_project_files(test_cases, request.stateData, request.options)
+    )
+    return files, sum(count_steps(tc["recordedSteps"]) for tc in test_cases)
+
+
+def _write_if_changed(path: str, content: str) -> bool:
+    """Пишет файл, только если содержимое изменилось (сравнение по хешу). Возвращает True, если записал."""
+    data = content.encode("utf-8")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def process_file(input_path: str, output_base: str) -> Dict:
+    """Обрабатывает один входной файл. Выполняется в процессе-воркере, результаты пишет сам."""
+    started = time.perf_counter()
+    result = {"input": input_path, "status": "generated", "written": 0, "unchanged": 0, "steps": 0, "outputs": []}
+    try:
+        with open(input_path, "rb") as f:
+            raw = json.loads(f.read())
+        files, result["steps"] = _build_outputs(raw, output_base)
+        for path, chunks in files:
+            if _write_if_changed(path, "".join(chunks)):
+                result["written"] += 1
+            else:
+                result["unchanged"] += 1
+            result["outputs"].append(path)
+        if not result["written"]:
+            result["status"] = "unchanged"
+    except Exception as e:  # Ошибка в одном файле не должна останавливать весь прогон
+        result["status"] = "failed"
+        result["error"] = f"{e.__class__.__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _input_hash(path: str) -> str:
+    digest = hashlib.sha256(GENERATOR_VERSION.encode())
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _load_manifest(output_dir: str) -> Dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir: str, manifest: Dict) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    _write_if_changed(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _find_inputs(input_dir: str) -> List[str]:
+    inputs = []
+    for root, _, filenames in os.walk(input_dir):
+        inputs.extend(os.path.join(root, name) for name in filenames if name.endswith(".json"))
+    return sorted(inputs)
+
+
+def _print_result(result: Dict, rel_path: str) -> None:
+    line = f"{result['status']:<10}{result['seconds'] * 1000:9.1f} ms  {result['steps']:6} steps  {rel_path}"
+    if result.get("error"):
+        line += f"  ({result['error']})"
+    print(line, flush=True)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Офлайн-генерация кода из JSON-записей.")
+    parser.add_argument("input_dir", help="Каталог с JSON-файлами записей/коллекций")
+    parser.add_argument("output_dir", help="Каталог для сгенерированного кода")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Число процессов (1 - без пула)")
+    parser.add_argument("--force", action="store_true", help="Перегенерировать даже неизмененные входы")
+    args = parser.parse_args(argv)
+
+    inputs = _find_inputs(args.input_dir)
+    manifest = _load_manifest(args.output_dir)
+    started = time.perf_counter()
+    counts = {"generated": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    total_steps = 0
+
+    pending = {}
+    for input_path in inputs:
+        rel_path = os.path.relpath(input_path, args.input_dir)
+        input_hash = _input_hash(input_path)
+        entry = manifest.get(rel_path)
+        if (
+                not args.force and entry and entry["hash"] == input_hash
+                and all(os.path.exists(os.path.join(args.output_dir, path)) for path in entry["outputs"])
+        ):
+            counts["skipped"] += 1
+            continue
+        output_base = os.path.join(args.output_dir, os.path.splitext(rel_path)[0])
+        pending[input_path] = (rel_path, input_hash, output_base)
+
+    def handle(result: Dict) -> None:
+        nonlocal total_steps
+        rel_path, input_hash, _ = pending[result["input"]]
+        counts[result["status"]] += 1
+        total_steps += result["steps"]
+        _print_result(result, rel_path)
+        if result["status"] == "failed":
+            manifest.pop(rel_path, None)
+        else:
+            outputs = [os.path.relpath(path, args.output_dir) for path in result["outputs"]]
+            manifest[rel_path] = {"hash": input_hash, "outputs": outputs}
+
+    if args.workers <= 1:
+        for input_path, (_, _, output_base) in pending.items():
+            handle(process_file(input_path, output_base))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(process_file, path, output_base) for path, (_, _, output_base) in pending.items()]
+            for future in as_completed(futures):
+                handle(future.result())
+
+    _save_manifest(args.output_dir, manifest)
+
+    elapsed = time.perf_counter() - started
+    processed = len(pending)
+    print(
+        f"\n{len(inputs)} files: {counts['generated']} generated, {counts['unchanged']} unchanged, "
+        f"{counts['skipped']} skipped (same input), {counts['failed']} failed in {elapsed:.2f} s"
+    )
+    if processed and elapsed > 0:
+        print(f"Throughput: {processed / elapsed:.1f} files/s, {total_steps / elapsed:.0f} steps/s ({args.workers} workers)")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
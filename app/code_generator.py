@@ -1,7 +1,23 @@
 # app/code_generator.py
 
+import difflib
 import re
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Hashable, Optional, Set, Union
+
+from .cache import canonical_hash
+from .step_ir import (
+    CompiledTestCase,
+    ConditionalNode,
+    StepNode,
+    compile_test_case,
+    element_fingerprint,
+)
+from .step_minimizer import REMOVAL_REASONS, minimize
+from .step_prefix import SharedPrefix, shared_prefixes
+from .tree_shaker import code_identifiers, shake_module
+
+# Ревизия эмиттеров: поднимается вручную, когда меняется код, собираемый из IR (шаблоны учитываются хешем ниже)
+GENERATOR_REVISION = "4"
 
 # Константа, перенесенная из base_page.js
 BASE_PAGE_PYTHON_CODE = """
@@ -9,13 +25,21 @@ BASE_PAGE_PYTHON_CODE = """
 # BasePage
 # =================================================================================
 import allure
+import atexit
+import functools
+import json
 import logging
+import os
+import time
 from allure_commons.types import AttachmentType
 from selenium.common.exceptions import (
     NoSuchElementException,
     TimeoutException,
     StaleElementReferenceException,
-    ElementNotInteractableException
+    ElementNotInteractableException,
+    ElementClickInterceptedException,
+    InvalidSelectorException,
+    WebDriverException
 )
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
@@ -23,31 +47,427 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.action_chains import ActionChains
 
+try:
+    import fcntl  # Блокировка общего файла рейтинга локаторов; на Windows недоступна
+except ImportError:
+    fcntl = None
+
 # Рекомендуется вынести в отдельный файл или настроить в conftest.py
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Настройки (значения подставляются генератором из опций) ---
+# Один файл рейтинга локаторов на все воркеры pytest-xdist; иначе у каждого воркера свой файл
+LOCATOR_CACHE_SHARED = False
+# Файл рейтинга локаторов. Пустая строка - рейтинг только в памяти текущего запуска
+LOCATOR_CACHE_PATH = os.environ.get("LOCATOR_CACHE_PATH", ".locator_cache.json")
+# Переиспользовать найденные элементы внутри объекта страницы вместо повторного поиска
+ELEMENT_CACHE_ENABLED = False
+# Искать похожий элемент по отпечатку из POM, когда все локаторы сломались
+SIMILARITY_HEALING_ENABLED = False
+# Минимальная оценка сходства (0..1), ниже которой похожий элемент не принимается
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.6"))
+# Замерять время действий: поиск, ожидания, скролл, повторы и запасные пути
+STEP_TIMINGS_ENABLED = False
+# JSON с замерами за запуск (у воркера xdist - с суффиксом воркера)
+STEP_TIMINGS_PATH = os.environ.get("STEP_TIMINGS_PATH", "step_timings.json")
+# Перед действием ждать затишья страницы (fetch/XHR и изменения DOM) вместо опроса document.readyState
+IDLE_WAIT_ENABLED = False
+# Сколько миллисекунд без запросов и изменений DOM считается затишьем
+IDLE_QUIET_MS = 300
+# Предел ожидания затишья; после него действие выполняется с предупреждением в логе
+IDLE_TIMEOUT_MS = 10000
+# Запросы дольше этого (long polling, стриминг) не мешают затишью
+IDLE_LONG_REQUEST_MS = 5000
+
+
+class LocatorRankingCache:
+    \"\"\"
+    Запоминает, какой из локаторов элемента сработал последним, чтобы в следующих запусках пробовать его первым.
+    Ключ - "<класс страницы>::<основной локатор>". Изменения сливаются с файлом при завершении процесса.
+    \"\"\"
+    def __init__(self, path: str, shared: bool):
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        if path and worker and not shared:
+            path = f"{path}.{worker}"
+        self.path = path
+        self.shared = shared
+        self._winners = self._read() if path else {}
+        self._changed = {}
+        if path:
+            atexit.register(self.save)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def rank(self, key: str, locators: list) -> list:
+        \"\"\"Возвращает локаторы в порядке опроса: последний сработавший - первым, остальные как записаны.\"\"\"
+        winner = self._winners.get(key)
+        if not winner:
+            return list(locators)
+        return sorted(locators, key=lambda locator: list(locator) != winner)
+
+    def remember(self, key: str, locator) -> None:
+        locator = list(locator)
+        if self._winners.get(key) != locator:
+            self._winners[key] = locator
+            self._changed[key] = locator
+
+    def save(self):
+        \"\"\"Сливает изменения с файлом. В общем режиме - под блокировкой, чтобы воркеры не затирали друг друга.\"\"\"
+        if not self.path or not self._changed:
+            return
+        lock = open(f"{self.path}.lock", "w") if self.shared and fcntl else None
+        try:
+            if lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            data.update(self._changed)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._changed = {}
+        except OSError as e:
+            logging.warning(f"Не удалось сохранить рейтинг локаторов в {self.path}: {e}")
+        finally:
+            if lock:
+                lock.close()
+
+
+LOCATOR_RANKING = LocatorRankingCache(LOCATOR_CACHE_PATH, LOCATOR_CACHE_SHARED)
+
+# Счетчики кэша элементов за весь запуск: попадания, промахи и устаревшие (StaleElementReference) элементы
+ELEMENT_CACHE_STATS = {"hits": 0, "misses": 0, "stale": 0}
+
+
+def _log_element_cache_stats():
+    # Счетчики растут только у страниц с включенным кэшем (глобально или element_cache_enabled в POM)
+    if ELEMENT_CACHE_STATS["hits"] or ELEMENT_CACHE_STATS["misses"]:
+        logging.info(f"Кэш элементов: {ELEMENT_CACHE_STATS}")
+
+
+atexit.register(_log_element_cache_stats)
+
+# Оценивает все элементы с тем же тегом по отпечатку за один вызов и возвращает лучший не ниже порога.
+# Вес признака учитывается, только если признак есть в отпечатке; итог нормируется на сумму таких весов.
+SIMILARITY_JS = r\"\"\"
+var fp = arguments[0], threshold = arguments[1];
+function words(text) { return (text || '').toLowerCase().split(/\\s+/).filter(Boolean); }
+function overlap(a, b) {
+    if (!a.length || !b.length) return 0;
+    var set = {}, common = 0, union = {};
+    a.forEach(function (x) { set[x] = true; union[x] = true; });
+    b.forEach(function (x) { if (set[x]) { common++; delete set[x]; } union[x] = true; });
+    return common / Object.keys(union).length;
+}
+var candidates = document.getElementsByTagName(fp.tag), best = null, bestScore = 0;
+for (var i = 0; i < candidates.length; i++) {
+    var el = candidates[i], score = 0, total = 0;
+    var attrs = fp.attrs || {};
+    for (var name in attrs) {
+        var weight = (name === 'id' || name.indexOf('data-') === 0) ? 3 : (name === 'href' ? 1 : 2);
+        total += weight;
+        if (el.getAttribute(name) === attrs[name]) score += weight;
+    }
+    if (fp.text) {
+        total += 3;
+        var text = (el.innerText || el.getAttribute('title') || el.getAttribute('aria-label') || '').trim().replace(/\\s+/g, ' ');
+        // Отпечаток хранит не больше 80 символов текста
+        score += text.substring(0, 80) === fp.text ? 3 : 2 * overlap(words(fp.text), words(text));
+    }
+    if (fp.classes) {
+        total += 1.5;
+        score += 1.5 * overlap(fp.classes, (typeof el.className === 'string' ? el.className : '').split(/\\s+/).filter(Boolean));
+    }
+    var rect = el.getBoundingClientRect();
+    if (fp.rect) {
+        // fp.rect - координаты на странице (viewport + прокрутка при записи), приводим к ним и кандидата
+        total += 1;
+        var dx = Math.abs(rect.x + window.scrollX - fp.rect[0]), dy = Math.abs(rect.y + window.scrollY - fp.rect[1]);
+        score += Math.max(0, 1 - (dx + dy) / 500);
+    }
+    if (!total) continue;
+    score = score / total;
+    if (!rect.width && !rect.height) score *= 0.8;  // невидимые элементы - в последнюю очередь
+    if (score > bestScore) { best = el; bestScore = score; }
+}
+return best && bestScore >= threshold ? {element: best, score: bestScore} : null;
+\"\"\"
+
+
+# Ставит на страницу счетчик fetch/XHR и MutationObserver (один раз на документ: после навигации - заново),
+# при необходимости скроллит к элементу и ждет затишья внутри браузера. Один execute_async_script на вызов.
+IDLE_WAIT_JS = \"\"\"
+var element = arguments[0], quietMs = arguments[1], timeoutMs = arguments[2], longRequestMs = arguments[3];
+var done = arguments[arguments.length - 1];
+var idle = window.__autotestIdle;
+if (!idle) {
+    idle = window.__autotestIdle = {requests: {}, nextId: 0, lastActivity: Date.now()};
+    var touch = function () { idle.lastActivity = Date.now(); };
+    var start = function () { var id = idle.nextId++; idle.requests[id] = Date.now(); touch(); return id; };
+    var finish = function (id) { delete idle.requests[id]; touch(); };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            var id = start();
+            try {
+                return originalFetch.apply(this, arguments).finally(function () { finish(id); });
+            } catch (e) { finish(id); throw e; }
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        var id = start();
+        this.addEventListener('loadend', function () { finish(id); });
+        try { return originalSend.apply(this, arguments); } catch (e) { finish(id); throw e; }
+    };
+    new MutationObserver(function (mutations) {
+        // Анимации через style не считаются активностью страницы
+        for (var i = 0; i < mutations.length; i++) {
+            if (mutations[i].type !== 'attributes' || mutations[i].attributeName !== 'style') { touch(); return; }
+        }
+    }).observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+if (element) element.scrollIntoView({block: 'center', inline: 'nearest'});
+var started = Date.now();
+(function check() {
+    var now = Date.now(), pending = 0;
+    for (var id in idle.requests) { if (now - idle.requests[id] < longRequestMs) pending++; }
+    if (document.readyState === 'complete' && !pending && now - idle.lastActivity >= quietMs) {
+        return done({idle: true, waited: now - started});
+    }
+    if (now - started >= timeoutMs) return done({idle: false, pending: pending, waited: now - started});
+    setTimeout(check, Math.min(50, quietMs || 50));
+})();
+\"\"\"
+
+
+class StepTimings:
+    \"\"\"Замеры действий BasePage: записи текущего теста (для Allure) и всего процесса (для JSON за запуск).\"\"\"
+    def __init__(self):
+        self.test_name = None
+        self.current = []
+        self.records = []
+
+    def add(self, entry: dict):
+        entry["test"] = self.test_name
+        for key, value in entry.items():
+            if isinstance(value, float):
+                entry[key] = round(value, 4)
+        self.current.append(entry)
+        self.records.append(entry)
+
+    def start_test(self, name: str):
+        self.test_name = name
+        self.current = []
+
+    def finish_test(self):
+        \"\"\"Прикрепляет замеры завершившегося теста к отчету Allure.\"\"\"
+        entries, self.current = self.current, []
+        if entries:
+            allure.attach(json.dumps(entries, ensure_ascii=False, indent=1), name="step_timings", attachment_type=AttachmentType.JSON)
+
+    def save(self, path: str):
+        if not self.records:
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "worker": os.environ.get("PYTEST_XDIST_WORKER"),
+                "records": self.records,
+            }, f, ensure_ascii=False, indent=1)
+
+
+STEP_TIMINGS = StepTimings()
+
+
+def timed_action(method):
+    \"\"\"
+    Замеряет действие страницы целиком и собирает в одну запись то, что отметили вложенные вызовы (_note).
+    Действия, вызванные из другого действия, отдельной записи не получают.
+    \"\"\"
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not STEP_TIMINGS_ENABLED or self._timing is not None:
+            return method(self, *args, **kwargs)
+        locators = args[0] if args and isinstance(args[0], list) and args[0] else None
+        self._timing = {
+            "page": type(self).__name__,
+            "action": method.__name__,
+            "locator": f"{locators[0][0]}={locators[0][1]}" if locators else None,
+            "retries": 0,
+        }
+        started = time.perf_counter()
+        status = "passed"
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            entry, self._timing = self._timing, None
+            entry["seconds"] = time.perf_counter() - started
+            entry["status"] = status
+            STEP_TIMINGS.add(entry)
+    return wrapper
+
 
 class BasePage:
+    # Кэш элементов (см. find_element_with_healing): POM-класс может включить его только для своей страницы
+    element_cache_enabled = ELEMENT_CACHE_ENABLED
+
     def __init__(self, driver, timeout=10):
         self.driver = driver
         self.timeout = timeout
+        # Запись замеров текущего действия (см. timed_action)
+        self._timing = None
+        # Кэш элементов страницы: кортеж локаторов -> WebElement. При попадании элемент проверяется одним
+        # запросом (_cached_element): отсоединенный элемент или смена URL сбрасывают кэш. Элемент, устаревший
+        # между проверкой и действием, выдает себя StaleElementReferenceException, и запись сбрасывается.
+        self._element_cache = {}
+        self._element_cache_url = None  # URL, на котором заполнялся кэш
+
+    def invalidate_element_cache(self, locators: list = None):
+        \"\"\"Сбрасывает кэш элементов целиком или запись для одного списка локаторов.\"\"\"
+        if locators is None:
+            self._element_cache.clear()
+            self._element_cache_url = None
+        else:
+            self._element_cache.pop(tuple(map(tuple, locators)), None)
+
+    def _drop_stale_element(self, locators: list):
+        if self.element_cache_enabled:
+            ELEMENT_CACHE_STATS["stale"] += 1
+        self.invalidate_element_cache(locators)
+
+    def _cached_element(self, cache_key: tuple):
+        \"\"\"
+        Элемент из кэша, если он все еще в документе и страница не сменилась; иначе None.
+        Проверка - один вызов WebDriver; элемент из другого окна или фрейма дает исключение.
+        \"\"\"
+        cached = self._element_cache.get(cache_key)
+        if cached is None:
+            return None
+        try:
+            url = self.driver.execute_script("return arguments[0].isConnected ? location.href : null;", cached)
+        except WebDriverException:
+            url = None
+        if url is None:
+            self._drop_stale_element(list(cache_key))
+            return None
+        if url != self._element_cache_url:
+            # Навигация (в том числе без перезагрузки в SPA): все сохраненные элементы относятся к прошлой странице
+            self.invalidate_element_cache()
+            return None
+        return cached
+
+    def _note(self, **values):
+        \"\"\"Дописывает замеры в запись текущего действия: *_seconds и retries суммируются, остальное заменяется.\"\"\"
+        if self._timing is None:
+            return
+        for key, value in values.items():
+            if key.endswith("_seconds") or key == "retries":
+                self._timing[key] = self._timing.get(key, 0) + value
+            else:
+                self._timing[key] = value
+
+    def _ranking_key(self, locators: list) -> str:
+        return f"{type(self).__name__}::{locators[0][0]}={locators[0][1]}"
 
     def find_element_with_healing(self, locators: list, timeout: int = None) -> WebElement:
         \"\"\"
-        Ищет элемент по списку локаторов. Если по одному не нашел, пробует следующий.
+        Ищет элемент сразу по всем локаторам в одном цикле ожидания: на каждой итерации опрашиваются
+        все локаторы (первым - сработавший в прошлый раз), и первый найденный элемент возвращается сразу.
+        Сломанный основной локатор больше не стоит целого timeout.
         \"\"\"
         if timeout is None:
             timeout = self.timeout
-        last_exception = None
-        for locator in locators:
-            try:
-                # Ожидаем просто присутствия элемента, чтобы можно было с ним работать
-                return WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located(locator))
-            except TimeoutException as e:
-                last_exception = e
-                continue
-        # Если ни один локатор не сработал, вызываем ошибку
-        raise NoSuchElementException(f"Элемент не найден ни по одному из локаторов: {locators}. Последняя ошибка: {last_exception}")
+        if self.element_cache_enabled:
+            cache_key = tuple(map(tuple, locators))
+            cached = self._cached_element(cache_key)
+            if cached is not None:
+                ELEMENT_CACHE_STATS["hits"] += 1
+                self._note(cache_hit=True)
+                return cached
+            ELEMENT_CACHE_STATS["misses"] += 1
+        ranking_key = self._ranking_key(locators)
+        ordered = LOCATOR_RANKING.rank(ranking_key, locators)
+
+        def any_locator_present(driver):
+            for locator in ordered:
+                try:
+                    found = driver.find_elements(*locator)
+                except InvalidSelectorException:
+                    continue
+                if found:
+                    return locator, found[0]
+            return False
+
+        started = time.perf_counter()
+        try:
+            locator, element = WebDriverWait(self.driver, timeout).until(any_locator_present)
+        except TimeoutException as e:
+            element = self._find_similar_element(locators) if SIMILARITY_HEALING_ENABLED else None
+            self._note(find_seconds=time.perf_counter() - started, healed_by_similarity=element is not None)
+            if element is None:
+                # Если ни один локатор не сработал, вызываем ошибку
+                raise NoSuchElementException(f"Элемент не найден ни по одному из локаторов: {locators}. Последняя ошибка: {e}")
+            return element
+        self._note(find_seconds=time.perf_counter() - started, locator_index=locators.index(locator))
+        LOCATOR_RANKING.remember(ranking_key, locator)
+        if self.element_cache_enabled:
+            if not self._element_cache:
+                self._element_cache_url = self.driver.current_url
+            self._element_cache[cache_key] = element
+        return element
+
+    def _fingerprint_for(self, locators: list):
+        \"\"\"Отпечаток из POM: атрибут <имя>_fingerprint рядом с тем <имя>_locators, который передан в метод.\"\"\"
+        page_class = type(self)
+        for name in dir(page_class):
+            if name.endswith("_locators") and getattr(page_class, name) is locators:
+                return getattr(page_class, name[:-len("_locators")] + "_fingerprint", None)
+        return None
+
+    def _find_similar_element(self, locators: list):
+        \"\"\"Ищет похожий элемент по отпечатку одним execute_script. None - отпечатка нет или ничего не набрало порог.\"\"\"
+        fingerprint = self._fingerprint_for(locators)
+        if not fingerprint:
+            return None
+        try:
+            match = self.driver.execute_script(SIMILARITY_JS, fingerprint, SIMILARITY_THRESHOLD)
+        except WebDriverException as e:
+            logging.warning(f"Поиск по сходству не выполнен: {e.__class__.__name__}")
+            return None
+        if not match:
+            return None
+        logging.warning(f"Локаторы {locators[0]} сломаны, элемент найден по сходству (оценка {match['score']:.2f}). Обновите локаторы.")
+        return match["element"]
+
+    def wait_for_idle(self, element: WebElement = None, quiet_ms: int = None) -> bool:
+        \"\"\"
+        Ждет затишья страницы одним вызовом execute_async_script: нет незавершенных fetch/XHR и изменений DOM
+        дольше quiet_ms. Если передан element, сначала скроллит к нему в том же вызове.
+        Возвращает False, если затишье не наступило за IDLE_TIMEOUT_MS (действие все равно продолжается).
+        \"\"\"
+        quiet_ms = IDLE_QUIET_MS if quiet_ms is None else quiet_ms
+        started = time.perf_counter()
+        try:
+            result = self.driver.execute_async_script(IDLE_WAIT_JS, element, quiet_ms, IDLE_TIMEOUT_MS, IDLE_LONG_REQUEST_MS)
+        except WebDriverException as e:
+            logging.warning(f"Ожидание затишья страницы не выполнено: {e.__class__.__name__}")
+            return False
+        finally:
+            self._note(idle_seconds=time.perf_counter() - started)
+        if not result or not result.get("idle"):
+            logging.warning(f"Страница не затихла за {IDLE_TIMEOUT_MS} мс: {result}")
+            return False
+        return True
 
     def take_screenshot(self, name: str):
         \"\"\"Делает скриншот и прикрепляет к Allure отчету.\"\"\"
@@ -60,6 +480,13 @@ class BasePage:
         Плавно прокручивает страницу, чтобы элемент оказался в центре видимой области.
         Это значительно повышает стабильность кликов и других взаимодействий.
         \"\"\"
+        if IDLE_WAIT_ENABLED:
+            # Скролл и ожидание затишья (вместо опроса readyState) - одним вызовом
+            started = time.perf_counter()
+            self.wait_for_idle(element)
+            self._note(scroll_seconds=time.perf_counter() - started)
+            return
+        started = time.perf_counter()
         try:
             # JavaScript-команда для скролла. 'block: "center"' гарантирует,
             # что элемент будет по центру, что помогает избежать перекрытия плавающими хедерами/футерами.
@@ -68,6 +495,7 @@ class BasePage:
             WebDriverWait(self.driver, 2).until(lambda d: self.driver.execute_script('return document.readyState') == 'complete')
         except Exception as e:
             logging.warning(f"Не удалось выполнить скролл к элементу: {e}")
+        self._note(scroll_seconds=time.perf_counter() - started)
 
 
     # =================================================================================
@@ -90,16 +518,29 @@ class BasePage:
                 return action(element, **kwargs)
             except (StaleElementReferenceException, ElementNotInteractableException) as e:
                 logging.warning(f"Попытка {i + 1}/{retries} не удалась: {e.__class__.__name__}. Повторяем...")
+                if isinstance(e, StaleElementReferenceException):
+                    self._drop_stale_element(locators)
+                self._note(retries=1)
                 last_exception = e
                 if i == retries - 1:
                     self.take_screenshot(f"action_failed_on_{locators[0]}")
                     raise last_exception
 
+    @timed_action
     def do_click_with_healing(self, locators: list):
         \"\"\"
         САМЫЙ НАДЕЖНЫЙ МЕТОД КЛИКА С АВТОСКРОЛЛОМ.
         Использует ActionChains для максимально точной имитации клика пользователя.
         \"\"\"
+        try:
+            self._click_with_healing(locators)
+        except StaleElementReferenceException:
+            # Элемент перерисовался или страница сменилась: один повтор с новым поиском
+            self._drop_stale_element(locators)
+            self._note(retries=1)
+            self._click_with_healing(locators)
+
+    def _click_with_healing(self, locators: list):
         element = self.find_element_with_healing(locators)
         self.scroll_into_view(element) # Сначала скроллим к элементу
 
@@ -107,11 +548,16 @@ class BasePage:
             # 1. ОСНОВНАЯ ПОПЫТКА: Клик через ActionChains. Это самый надежный способ.
             logging.info(f"Выполняем клик через ActionChains по локатору: {locators[0]}")
             # Ждем, пока элемент станет кликабельным, перед действием
-            WebDriverWait(self.driver, self.timeout).until(EC.element_to_be_clickable(element))
+            started = time.perf_counter()
+            try:
+                WebDriverWait(self.driver, self.timeout).until(EC.element_to_be_clickable(element))
+            finally:
+                self._note(wait_seconds=time.perf_counter() - started)
             ActionChains(self.driver).move_to_element(element).click().perform()
 
         except (TimeoutException, ElementNotInteractableException) as e:
             logging.warning(f"Клик через ActionChains не удался: {e.__class__.__name__}. Пробуем клик через JS как последний вариант.")
+            self._note(fallback="js_click")
             try:
                 # 2. ЗАПАСНОЙ ВАРИАНТ: Клик через JavaScript.
                 self.driver.execute_script("arguments[0].click();", element)
@@ -121,24 +567,28 @@ class BasePage:
                 # Перевыбрасываем исходную, более информативную ошибку
                 raise e
 
+    @timed_action
     def do_right_click_with_healing(self, locators: list):
         \"\"\"Кликает правой кнопкой мыши.\"\"\"
         def right_click_action(element):
             ActionChains(self.driver).context_click(element).perform()
         self._execute_action_with_healing(right_click_action, locators)
 
+    @timed_action
     def do_double_click_with_healing(self, locators: list):
         \"\"\"Делает двойной клик.\"\"\"
         def double_click_action(element):
             ActionChains(self.driver).double_click(element).perform()
         self._execute_action_with_healing(double_click_action, locators)
 
+    @timed_action
     def do_hover_with_healing(self, locators: list):
         \"\"\"Наводит курсор на элемент.\"\"\"
         def hover_action(element):
             ActionChains(self.driver).move_to_element(element).perform()
         self._execute_action_with_healing(hover_action, locators)
 
+    @timed_action
     def do_clear_and_send_keys_with_healing(self, locators: list, value: str):
         \"\"\"Очищает поле и вводит текст.\"\"\"
         def clear_and_send_action(element):
@@ -146,12 +596,14 @@ class BasePage:
             element.send_keys(value)
         self._execute_action_with_healing(clear_and_send_action, locators)
 
+    @timed_action
     def select_option_by_visible_text(self, locators: list, text: str):
         \"\"\"Выбирает опцию из КЛАССИЧЕСКОГО <select> списка.\"\"\"
         def select_action(element):
             Select(element).select_by_visible_text(text)
         self._execute_action_with_healing(select_action, locators)
 
+    @timed_action
     def select_from_custom_dropdown(self, trigger_locators: list, option_text: str):
         \"\"\"
         Универсальный метод для работы с кастомными выпадающими списками (React, etc.).
@@ -180,14 +632,17 @@ class BasePage:
     # МЕТОДЫ ПРОВЕРОК (Asserts) И ОЖИДАНИЙ (Waits)
     # =================================================================================
 
+    @timed_action
     def get_text_with_healing(self, locators: list) -> str:
         # Для получения текста скролл также важен
         return self._execute_action_with_healing(lambda el: el.text, locators)
 
+    @timed_action
     def get_attribute_with_healing(self, locators: list, attribute: str) -> str:
         # И для атрибутов
         return self._execute_action_with_healing(lambda el: el.get_attribute(attribute), locators)
 
+    @timed_action
     def is_visible_with_healing(self, locators: list, timeout: int = 5) -> bool:
         \"\"\"
         Проверяет видимость элемента. 
@@ -199,6 +654,7 @@ class BasePage:
         except TimeoutException:
             return False
 
+    @timed_action
     def is_not_visible_with_healing(self, locators: list, timeout: int = 5) -> bool:
         try:
             WebDriverWait(self.driver, timeout).until(EC.invisibility_of_element_located(locators[0]))
@@ -206,6 +662,7 @@ class BasePage:
         except TimeoutException:
             return False
 
+    @timed_action
     def is_clickable_with_healing(self, locators: list, timeout: int = 5) -> bool:
         \"\"\"
         Проверяет кликабельность.
@@ -219,6 +676,7 @@ class BasePage:
         except (TimeoutException, NoSuchElementException):
             return False
 
+    @timed_action
     def is_enabled_with_healing(self, locators: list) -> bool:
         return self._execute_action_with_healing(lambda el: el.is_enabled(), locators)
 
@@ -226,44 +684,541 @@ class BasePage:
     # МЕТОДЫ ДЛЯ РАБОТЫ С ФРЕЙМАМИ
     # =================================================================================
 
+    @timed_action
     def switch_to_iframe(self, locators: list):
         \"\"\"Переключается в iframe.\"\"\"
         iframe = self.find_element_with_healing(locators)
         # --- ДОБАВЛЕНО: Скроллим к фрейму перед переключением ---
         self.scroll_into_view(iframe)
-        self.driver.switch_to.frame(iframe)
+        try:
+            self.driver.switch_to.frame(iframe)
+        except StaleElementReferenceException:
+            self._drop_stale_element(locators)
+            self.driver.switch_to.frame(self.find_element_with_healing(locators))
+        # Элементы из кэша принадлежат другому контексту
+        self.invalidate_element_cache()
 
     def switch_to_default_content(self):
         \"\"\"Возвращается из iframe в основной контекст страницы.\"\"\"
         self.driver.switch_to.default_content()
+        self.invalidate_element_cache()
+
+    # =================================================================================
+    # СНИМКИ СОСТОЯНИЯ БРАУЗЕРА (фикстуры общих первых шагов)
+    # =================================================================================
+
+    def capture_browser_state(self) -> dict:
+        \"\"\"Снимок состояния текущей вкладки: URL, cookies текущего домена, localStorage и sessionStorage.\"\"\"
+        storages = self.driver.execute_script(
+            "return [Object.assign({}, localStorage), Object.assign({}, sessionStorage)];"
+        )
+        return {
+            "url": self.driver.current_url,
+            "cookies": self.driver.get_cookies(),
+            "local_storage": storages[0],
+            "session_storage": storages[1],
+        }
+
+    def restore_browser_state(self, state: dict) -> bool:
+        \"\"\"
+        Восстанавливает снимок capture_browser_state. False - восстановить не удалось
+        (страница не по http, ошибка WebDriver), и шаги нужно выполнить заново.
+        Cookies других доменов (например, после SSO) в снимок не попадают.
+        \"\"\"
+        if not state["url"].startswith(("http://", "https://")):
+            return False
+        try:
+            self.driver.get(state["url"])
+            for cookie in state["cookies"]:
+                self.driver.add_cookie(cookie)
+            self.driver.execute_script(
+                "for (const [k, v] of Object.entries(arguments[0])) localStorage.setItem(k, v);"
+                "for (const [k, v] of Object.entries(arguments[1])) sessionStorage.setItem(k, v);",
+                state["local_storage"], state["session_storage"],
+            )
+            self.driver.get(state["url"])
+        except WebDriverException as e:
+            logging.warning(f"Не удалось восстановить состояние браузера, шаги выполнятся заново: {e.__class__.__name__}")
+            return False
+        self.invalidate_element_cache()
+        return True
 """
 
+# Быстрый вариант BasePage (опция fastActions): дописывается к BASE_PAGE_PYTHON_CODE
+FAST_BASE_PAGE_PYTHON_CODE = """
 
-# --- Вспомогательные функции, портированные из JS ---
+# =================================================================================
+# FastBasePage - действия за один запрос к WebDriver
+# =================================================================================
+# Поиск по локаторам (в порядке рейтинга), скролл и проверки за один вызов execute_script.
+# mode "interact" дополнительно требует видимости, отсутствия перекрытия в центре элемента и disabled=false.
+FAST_PREPARE_JS = \"\"\"
+var locators = arguments[0], mode = arguments[1];
+function find(by, value) {
+    switch (by) {
+        case 'id': return document.getElementById(value);
+        case 'name': return document.getElementsByName(value)[0] || null;
+        case 'css selector': return document.querySelector(value);
+        case 'class name': return document.getElementsByClassName(value)[0] || null;
+        case 'tag name': return document.getElementsByTagName(value)[0] || null;
+        case 'xpath': return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    return undefined;
+}
+if (document.readyState !== 'complete') return {status: 'loading'};
+for (var i = 0; i < locators.length; i++) {
+    var el;
+    try { el = find(locators[i][0], locators[i][1]); } catch (e) { continue; }
+    if (el === undefined) return {status: 'unsupported_locator'};
+    if (!el) continue;
+    el.scrollIntoView({block: 'center', inline: 'nearest', behavior: 'instant'});
+    if (mode === 'interact') {
+        var rect = el.getBoundingClientRect(), style = window.getComputedStyle(el);
+        if (!rect.width || !rect.height || style.visibility === 'hidden' || style.display === 'none') return {status: 'not_visible'};
+        var target = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+        if (!target || !(target === el || el.contains(target))) return {status: 'obscured'};
+        if (el.disabled) return {status: 'disabled'};
+    }
+    return {status: 'ok', index: i, element: el, enabled: !el.disabled};
+}
+return {status: 'not_found'};
+\"\"\"
+
+
+class FastBasePage(BasePage):
+    \"\"\"
+    BasePage для удаленного Grid, где время теста съедают сетевые запросы к WebDriver.
+    Поиск, скролл и проверки выполняются одним execute_script, затем само действие - одной командой
+    (чтения вроде is_enabled - прямо в скрипте). Если быстрый путь не удался до действия
+    (элемента еще нет, он перекрыт, страница грузится), выполняется обычный путь BasePage с ожиданиями.
+    \"\"\"
+    def _fast_prepare(self, locators: list, mode: str = "interact"):
+        \"\"\"Возвращает ответ FAST_PREPARE_JS (element, enabled) или None, если нужен обычный путь.\"\"\"
+        ranking_key = self._ranking_key(locators)
+        ordered = LOCATOR_RANKING.rank(ranking_key, locators)
+        started = time.perf_counter()
+        try:
+            response = self.driver.execute_script(FAST_PREPARE_JS, [list(locator) for locator in ordered], mode)
+        except WebDriverException as e:
+            logging.info(f"Быстрый путь не выполнен для {locators[0]}: {e.__class__.__name__}. Используем обычный.")
+            self._note(find_seconds=time.perf_counter() - started, fallback=f"fast_path_{e.__class__.__name__}")
+            return None
+        self._note(find_seconds=time.perf_counter() - started)
+        if not response or response.get("status") != "ok":
+            logging.info(f"Быстрый путь недоступен для {locators[0]}: {response and response.get('status')}. Используем обычный.")
+            self._note(fallback=f"fast_path_{response and response.get('status')}")
+            return None
+        locator = ordered[response["index"]]
+        self._note(locator_index=locators.index(locator))
+        LOCATOR_RANKING.remember(ranking_key, locator)
+        return response
+
+    def _fast_or_fallback(self, locators: list, action, fallback, mode: str = "interact"):
+        response = self._fast_prepare(locators, mode)
+        if response is not None:
+            try:
+                return action(response)
+            except (StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException) as e:
+                logging.info(f"Быстрое действие не удалось: {e.__class__.__name__}. Используем обычный путь.")
+                self._note(fallback=f"fast_action_{e.__class__.__name__}")
+        return fallback()
 
-def _generate_element_name(data: Dict[str, Any]) -> str:
-    """Генерирует имя переменной для элемента на основе его данных."""
-    if not data:
-        return "element"
-    s = data.get("selectors", {})
-    if not s:
-        return "page_context"
-
-    attributes = data.get("attributes", {})
-    name_source = (
-            attributes.get("data-testid")
-            or s.get("id")
-            or s.get("name")
-            or s.get("placeholder")
-            or data.get("text")
-            or data.get("tag")
-            or "element"
-    )
-    # Очистка имени
-    clean_name = re.sub(r"[^a-zA-Z0-9\s]", "", str(name_source))
-    snake_case_name = re.sub(r"\s+", "_", clean_name).lower()
-    return snake_case_name[:40] if snake_case_name else "element"
+    @timed_action
+    def do_click_with_healing(self, locators: list):
+        self._fast_or_fallback(
+            locators, lambda r: r["element"].click(), lambda: super(FastBasePage, self).do_click_with_healing(locators)
+        )
+
+    @timed_action
+    def do_right_click_with_healing(self, locators: list):
+        self._fast_or_fallback(
+            locators, lambda r: ActionChains(self.driver).context_click(r["element"]).perform(),
+            lambda: super(FastBasePage, self).do_right_click_with_healing(locators)
+        )
+
+    @timed_action
+    def do_double_click_with_healing(self, locators: list):
+        self._fast_or_fallback(
+            locators, lambda r: ActionChains(self.driver).double_click(r["element"]).perform(),
+            lambda: super(FastBasePage, self).do_double_click_with_healing(locators)
+        )
+
+    @timed_action
+    def do_hover_with_healing(self, locators: list):
+        self._fast_or_fallback(
+            locators, lambda r: ActionChains(self.driver).move_to_element(r["element"]).perform(),
+            lambda: super(FastBasePage, self).do_hover_with_healing(locators)
+        )
+
+    @timed_action
+    def do_clear_and_send_keys_with_healing(self, locators: list, value: str):
+        def clear_and_send(response):
+            # Ввод остается нативным: установка value из JS не вызывает обработчики фреймворков
+            response["element"].clear()
+            response["element"].send_keys(value)
+        self._fast_or_fallback(
+            locators, clear_and_send, lambda: super(FastBasePage, self).do_clear_and_send_keys_with_healing(locators, value)
+        )
+
+    @timed_action
+    def get_text_with_healing(self, locators: list) -> str:
+        return self._fast_or_fallback(
+            locators, lambda r: r["element"].text,
+            lambda: super(FastBasePage, self).get_text_with_healing(locators), mode="read"
+        )
+
+    @timed_action
+    def get_attribute_with_healing(self, locators: list, attribute: str) -> str:
+        return self._fast_or_fallback(
+            locators, lambda r: r["element"].get_attribute(attribute),
+            lambda: super(FastBasePage, self).get_attribute_with_healing(locators, attribute), mode="read"
+        )
+
+    @timed_action
+    def is_enabled_with_healing(self, locators: list) -> bool:
+        return self._fast_or_fallback(
+            locators, lambda r: r["enabled"], lambda: super(FastBasePage, self).is_enabled_with_healing(locators), mode="read"
+        )
+"""
+
+# conftest.py для экспортируемого проекта: фикстура driver, которую ожидают сгенерированные тесты.
+# Собирается из заголовка, одной из фикстур driver и плагинов (см. render_conftest).
+CONFTEST_PYTHON_CODE = """import os
+
+import pytest
+from selenium import webdriver
+
+
+def create_driver():
+    \"\"\"Запускает Chrome. HEADLESS=0 - запуск с окном браузера.\"\"\"
+    options = webdriver.ChromeOptions()
+    if os.environ.get("HEADLESS", "1") == "1":
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    return webdriver.Chrome(options=options)
+"""
+
+# Фикстура по умолчанию: новый браузер на каждый тест
+CONFTEST_DRIVER_FIXTURE_CODE = """
+
+@pytest.fixture
+def driver():
+    \"\"\"Новый браузер на каждый тест.\"\"\"
+    driver = create_driver()
+    yield driver
+    driver.quit()
+"""
+
+# Фикстура с пулом сессий (опция driverPool): браузер переиспользуется тестами одного воркера
+CONFTEST_DRIVER_POOL_CODE = """
+
+# --- Пул сессий WebDriver ---
+import logging
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+try:
+    import fcntl  # Общий для воркеров xdist лимит сессий; на Windows недоступен
+except ImportError:
+    fcntl = None
+
+# После скольких тестов сессия пересоздается, даже если тесты проходят
+DRIVER_POOL_MAX_TESTS = int(os.environ.get("DRIVER_POOL_MAX_TESTS", "50"))
+# Сколько браузеров одновременно могут держать все воркеры xdist вместе (0 - без лимита)
+DRIVER_POOL_MAX_SESSIONS = int(os.environ.get("DRIVER_POOL_MAX_SESSIONS", "0"))
+DRIVER_POOL_SLOTS_DIR = os.environ.get("DRIVER_POOL_SLOTS_DIR", ".driver_slots")
+# Сколько секунд ждать свободного слота, прежде чем упасть
+DRIVER_POOL_SLOT_TIMEOUT = int(os.environ.get("DRIVER_POOL_SLOT_TIMEOUT", "600"))
+
+
+def _acquire_session_slot():
+    \"\"\"Занимает один из DRIVER_POOL_MAX_SESSIONS слотов: файловые блокировки общие для всех процессов.\"\"\"
+    if DRIVER_POOL_MAX_SESSIONS <= 0 or fcntl is None:
+        return None
+    os.makedirs(DRIVER_POOL_SLOTS_DIR, exist_ok=True)
+    deadline = time.monotonic() + DRIVER_POOL_SLOT_TIMEOUT
+    while True:
+        for index in range(DRIVER_POOL_MAX_SESSIONS):
+            handle = open(os.path.join(DRIVER_POOL_SLOTS_DIR, f"slot-{index}.lock"), "w")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Нет свободной сессии WebDriver из {DRIVER_POOL_MAX_SESSIONS} за {DRIVER_POOL_SLOT_TIMEOUT} сек.")
+        time.sleep(0.5)
+
+
+class DriverPool:
+    \"\"\"
+    Сессия WebDriver процесса (у xdist - своя у каждого воркера). Между тестами состояние сбрасывается;
+    после DRIVER_POOL_MAX_TESTS тестов, падения теста или неудачного сброса сессия пересоздается.
+    \"\"\"
+    def __init__(self, factory, max_tests: int):
+        self.factory = factory
+        self.max_tests = max_tests
+        self.driver = None
+        self.slot = None
+        self.tests = 0
+
+    def acquire(self):
+        if self.driver is None:
+            self.slot = _acquire_session_slot()
+            self.driver = self.factory()
+            self.tests = 0
+        self.tests += 1
+        return self.driver
+
+    def release(self, failed: bool):
+        if failed or self.tests >= self.max_tests or not self._reset():
+            self.discard()
+
+    def _reset(self) -> bool:
+        \"\"\"Закрывает лишние окна, чистит cookies и storage, уходит на about:blank. False - сессию не переиспользовать.\"\"\"
+        driver = self.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+            if hasattr(driver, "execute_cdp_cmd"):
+                # Chrome: cookies всех доменов и данные текущего origin, а не только текущего домена
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                origin = driver.execute_script("return location.origin")
+                if origin and origin != "null":
+                    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            else:
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except WebDriverException as e:
+            logging.warning(f"Не удалось сбросить сессию WebDriver, пересоздаем: {e.__class__.__name__}")
+            return False
 
+    def discard(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+            self.driver = None
+        if self.slot is not None:
+            self.slot.close()  # Закрытие файла снимает блокировку слота
+            self.slot = None
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    # Результат вызова теста нужен фикстуре driver, чтобы пересоздать сессию после падения
+    outcome = yield
+    report = outcome.get_result()
+    if report.when == "call":
+        item.driver_pool_failed = report.failed
+
+
+@pytest.fixture(scope="session")
+def driver_pool():
+    pool = DriverPool(create_driver, DRIVER_POOL_MAX_TESTS)
+    yield pool
+    pool.discard()
+
+
+@pytest.fixture
+def driver(driver_pool, request):
+    \"\"\"Браузер из пула воркера. Упавший тест получает сессию, которая после него будет пересоздана.\"\"\"
+    driver = driver_pool.acquire()
+    yield driver
+    driver_pool.release(failed=getattr(request.node, "driver_pool_failed", True))
+"""
+
+# Снимки состояния после общих первых шагов (опции sharedPrefixFixtures + prefixStateSnapshot)
+CONFTEST_PREFIX_SNAPSHOTS_CODE = """
+
+
+@pytest.fixture(scope="session")
+def prefix_state_snapshots():
+    \"\"\"
+    Снимки состояния браузера после общих первых шагов: имя фикстуры -> снимок.
+    Первый тест с фикстурой выполняет шаги и делает снимок, следующие тесты процесса восстанавливают его.
+    У каждого воркера pytest-xdist свои снимки.
+    \"\"\"
+    return {}
+"""
+
+# Плагин для conftest.py (опция stepTimings): замеры шагов в Allure и сводка самых медленных шагов/локаторов
+CONFTEST_STEP_TIMINGS_CODE = """
+
+# --- Замеры шагов BasePage ---
+import glob
+import json
+
+from pages.base_page import STEP_TIMINGS, STEP_TIMINGS_PATH
+
+# Сколько самых медленных шагов и локаторов показать в итоговой сводке
+STEP_TIMINGS_TOP = int(os.environ.get("STEP_TIMINGS_TOP", "10"))
+STEP_TIMINGS_SUMMARY_PATH = os.environ.get("STEP_TIMINGS_SUMMARY_PATH", "step_timings_summary.json")
+
+
+def _step_timings_path(worker=None):
+    base, ext = os.path.splitext(STEP_TIMINGS_PATH)
+    return f"{base}.{worker}{ext}" if worker else STEP_TIMINGS_PATH
+
+
+def _step_timings_files():
+    base, ext = os.path.splitext(STEP_TIMINGS_PATH)
+    return glob.glob(STEP_TIMINGS_PATH) + glob.glob(f"{base}.gw*{ext}")
+
+
+def summarize_step_timings(records, top):
+    \"\"\"Сводка за запуск: самые медленные шаги (страница + действие + локатор) и локаторы по времени поиска.\"\"\"
+    steps, locators = {}, {}
+    for record in records:
+        key = (record["page"], record["action"], record.get("locator"))
+        step = steps.setdefault(key, {
+            "page": key[0], "action": key[1], "locator": key[2],
+            "count": 0, "failed": 0, "total_seconds": 0.0, "max_seconds": 0.0, "retries": 0, "fallbacks": 0,
+        })
+        step["count"] += 1
+        step["failed"] += record["status"] == "failed"
+        step["total_seconds"] += record["seconds"]
+        step["max_seconds"] = max(step["max_seconds"], record["seconds"])
+        step["retries"] += record.get("retries", 0)
+        step["fallbacks"] += bool(record.get("fallback"))
+        if record.get("locator"):
+            locator = locators.setdefault((record["page"], record["locator"]), {
+                "page": record["page"], "locator": record["locator"], "lookups": 0, "find_seconds": 0.0,
+                "cache_hits": 0, "secondary_locator_hits": 0, "similarity_heals": 0,
+            })
+            locator["lookups"] += 1
+            locator["find_seconds"] += record.get("find_seconds", 0.0)
+            locator["cache_hits"] += bool(record.get("cache_hit"))
+            locator["secondary_locator_hits"] += bool(record.get("locator_index"))
+            locator["similarity_heals"] += bool(record.get("healed_by_similarity"))
+    return {
+        "tests": len({record["test"] for record in records}),
+        "actions": len(records),
+        "total_seconds": round(sum(record["seconds"] for record in records), 3),
+        "slowest_steps": sorted(steps.values(), key=lambda item: -item["total_seconds"])[:top],
+        "slowest_locators": sorted(locators.values(), key=lambda item: -item["find_seconds"])[:top],
+    }
+
+
+def pytest_sessionstart(session):
+    # Обычный запуск или контроллер xdist удаляет замеры прошлого запуска до старта воркеров
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        for path in _step_timings_files():
+            os.remove(path)
+
+
+@pytest.fixture(autouse=True)
+def _step_timings(request):
+    STEP_TIMINGS.start_test(request.node.nodeid)
+    yield
+    STEP_TIMINGS.finish_test()
+
+
+def pytest_sessionfinish(session):
+    STEP_TIMINGS.save(_step_timings_path(os.environ.get("PYTEST_XDIST_WORKER")))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        return
+    records = []
+    for path in _step_timings_files():
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.load(f)["records"])
+    if not records:
+        return
+    summary = summarize_step_timings(records, STEP_TIMINGS_TOP)
+    with open(STEP_TIMINGS_SUMMARY_PATH, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1)
+
+    terminalreporter.section("slowest steps")
+    for step in summary["slowest_steps"]:
+        terminalreporter.write_line(
+            f"{step['total_seconds']:9.2f}s total {step['count']:5}x {step['max_seconds']:7.2f}s max "
+            f"{step['retries']:3} retries {step['fallbacks']:3} fallbacks  {step['page']}.{step['action']} {step['locator'] or ''}"
+        )
+    terminalreporter.section("slowest locators")
+    for locator in summary["slowest_locators"]:
+        terminalreporter.write_line(
+            f"{locator['find_seconds']:9.2f}s find {locator['lookups']:5}x  {locator['secondary_locator_hits']:3} secondary "
+            f"{locator['similarity_heals']:3} similarity  {locator['page']} {locator['locator']}"
+        )
+    terminalreporter.write_line(f"Step timings: {STEP_TIMINGS_SUMMARY_PATH}")
+"""
+
+# Версия генератора входит в ключ кэша, ETag и манифест CLI: после изменения шаблонов или эмиттеров
+# старые результаты не переиспользуются. Хеш шаблонов меняет версию без ручного шага.
+GENERATOR_VERSION = GENERATOR_REVISION + "-" + canonical_hash([
+    BASE_PAGE_PYTHON_CODE,
+    FAST_BASE_PAGE_PYTHON_CODE,
+    CONFTEST_PYTHON_CODE,
+    CONFTEST_DRIVER_FIXTURE_CODE,
+    CONFTEST_DRIVER_POOL_CODE,
+    CONFTEST_PREFIX_SNAPSHOTS_CODE,
+    CONFTEST_STEP_TIMINGS_CODE,
+])[:12]
+
+
+# Опции генератора, управляющие настройками BasePage: опция -> (константа в шаблоне, тип значения)
+BASE_PAGE_SETTINGS = {
+    "sharedLocatorCache": ("LOCATOR_CACHE_SHARED", bool),
+    "elementCache": ("ELEMENT_CACHE_ENABLED", bool),
+    "similarityHealing": ("SIMILARITY_HEALING_ENABLED", bool),
+    "stepTimings": ("STEP_TIMINGS_ENABLED", bool),
+    "idleWait": ("IDLE_WAIT_ENABLED", bool),
+    "idleQuietMs": ("IDLE_QUIET_MS", int),
+    "idleTimeoutMs": ("IDLE_TIMEOUT_MS", int),
+}
+
+
+def base_page_class_name(options: Dict) -> str:
+    """Класс, от которого наследуются сгенерированные POM-классы."""
+    return "FastBasePage" if options.get("fastActions") else "BasePage"
+
+
+def render_base_page(options: Dict, used_names: Optional[Set[str]] = None) -> str:
+    """
+    Возвращает код BasePage, в котором значения настроек подставлены из опций генерации.
+    С опцией treeShakeBasePage и переданным used_names (идентификаторы сгенерированных POM и тестов)
+    в коде остаются только методы и помощники, достижимые из этих имен, а импорты урезаются под них.
+    """
+    code = BASE_PAGE_PYTHON_CODE
+    if options.get("fastActions"):
+        code += FAST_BASE_PAGE_PYTHON_CODE
+    for option, (constant, value_type) in BASE_PAGE_SETTINGS.items():
+        if option in options:
+            try:
+                value = value_type(options[option])
+            except (TypeError, ValueError):
+                continue  # Некорректное значение - остается значение по умолчанию из шаблона
+            code = re.sub(rf"^{constant} = .*$", lambda _: f"{constant} = {value!r}", code, count=1, flags=re.M)
+    if options.get("treeShakeBasePage") and used_names is not None:
+        roots = set(used_names) | {"BasePage", base_page_class_name(options)}
+        if options.get("stepTimings"):
+            roots |= {"STEP_TIMINGS", "STEP_TIMINGS_PATH"}  # Импортируются плагином замеров в conftest.py
+        code = shake_module(code, roots, {"BasePage", "FastBasePage"})
+    return code
+
+
+def render_conftest(options: Dict) -> str:
+    """Возвращает conftest.py экспортируемого проекта с плагинами, включенными опциями генерации."""
+    code = CONFTEST_PYTHON_CODE
+    code += CONFTEST_DRIVER_POOL_CODE if options.get("driverPool") else CONFTEST_DRIVER_FIXTURE_CODE
+    if options.get("sharedPrefixFixtures") and options.get("prefixStateSnapshot"):
+        code += CONFTEST_PREFIX_SNAPSHOTS_CODE
+    if options.get("stepTimings"):
+        code += CONFTEST_STEP_TIMINGS_CODE
+    return code
+
+
+# --- Вспомогательные функции, портированные из JS ---
 
 def _sanitize_for_function_name(name: str) -> str:
     """Очищает имя тест-кейса для использования в качестве имени функции Python."""
@@ -276,6 +1231,165 @@ def _sanitize_for_function_name(name: str) -> str:
     return f"test_{sanitized}"
 
 
+def page_module_name(page_class_name: str) -> str:
+    """LoginPage -> login_page. Имя модуля, в который попадает класс страницы."""
+    snake = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", page_class_name or "MyPage").lower()
+    snake = re.sub(r"[^a-z0-9_]", "_", snake).strip("_")
+    return snake or "my_page"
+
+
+def _relevant_state_data(state_data: Dict) -> Dict:
+    """Выбирает из stateData только то, что реально влияет на сгенерированный код."""
+    active_env_name = state_data.get("activeEnvironment", "dev")
+    return {
+        "collectionName": state_data.get("collections", {}).get(state_data.get("activeCollectionId"), {}).get("name"),
+        "activeEnvironment": active_env_name,
+        "environment": state_data.get("environments", {}).get(active_env_name, {}),
+    }
+
+
+def generation_cache_key(license_id: Hashable, content_digest: str, state_data: Dict, options: Dict) -> str:
+    """
+    Ключ кэша генерации, он же ETag ответа. Строится из дешевых входов, без повторной сериализации
+    тест-кейсов: content_digest - отпечаток тест-кейсов запроса (хеши манифеста или SHA-256 тела).
+    Лицензия входит в ключ: кэш общий для процесса, а по ETag отдается diff от прошлого кода.
+    """
+    return canonical_hash({
+        "version": GENERATOR_VERSION,
+        "license": license_id,
+        "content": content_digest,
+        "stateData": _relevant_state_data(state_data),
+        "options": options,
+    })
+
+
+# --- Эмиттеры кода из IR ---
+
+def _emit_pom_class(page_class_name: str, compiled_test_cases: List[CompiledTestCase], options: Dict) -> str:
+    """
+    Собирает POM-класс из локаторов и методов всех скомпилированных тест-кейсов страницы.
+    С опцией similarityHealing рядом с локаторами элемента встраивается его отпечаток <имя>_fingerprint.
+    """
+    base_class = base_page_class_name(options)
+    with_fingerprints = options.get("similarityHealing")
+    # После минимизации подряд идущие шаги с одним элементом (клик по полю, ввод в него) ищут его из кэша
+    cache_elements = options.get("minimizeSteps") and any(compiled.repeated_lookups for compiled in compiled_test_cases)
+    locators_map = {}
+    pom_methods = []
+    for compiled in compiled_test_cases:
+        for element_name, locators, data in compiled.locator_entries:
+            if element_name and element_name not in locators_map:
+                locators_str = ",\n        ".join(locators)
+                definition = f"    {element_name}_locators = [\n        {locators_str}\n    ]"
+                fingerprint = element_fingerprint(data) if with_fingerprints else None
+                if fingerprint:
+                    definition += f"\n    {element_name}_fingerprint = {fingerprint!r}"
+                locators_map[element_name] = definition
+        pom_methods.extend(compiled.method_definitions)
+
+    imports = f"import allure\nfrom selenium.webdriver.common.by import By\n\nfrom pages.base_page import {base_class}\n\n"
+    class_header = f"class {page_class_name}({base_class}):\n"
+    if cache_elements:
+        class_header += "    element_cache_enabled = True\n\n"
+    locator_definitions = "\n\n".join(locators_map.values())
+
+    # Убираем дубликаты методов, сохраняя порядок
+    unique_pom_methods = list(dict.fromkeys(pom_methods))
+
+    pom_code = f"{imports}{class_header}{locator_definitions}\n\n" + "\n\n".join(unique_pom_methods)
+    if not unique_pom_methods:
+        pom_code += "    pass"
+    return pom_code
+
+
+def _emit_method_calls(steps: List[StepNode], indent_level: int) -> List[str]:
+    """Рекурсивно генерирует вызовы методов для тела теста."""
+    calls = []
+    indent = "    " * indent_level
+    for node in steps:
+        if isinstance(node, ConditionalNode):
+            if node.boolean_check:
+                method, locators = node.boolean_check
+                then_calls = _emit_method_calls(node.then_steps, indent_level + 1)
+                else_calls = _emit_method_calls(node.else_steps, indent_level + 1)
+                calls.append(f"{indent}if page.{method}(page.{locators}):")
+                # Ветка без вызовов (пустая запись или все шаги убраны минимизацией) - иначе блок не скомпилируется
+                calls.extend(then_calls or [f"{indent}    pass"])
+
+                if else_calls:
+                    calls.append(f"{indent}else:")
+                    calls.extend(else_calls)
+        elif node.method_call:
+            calls.append(f'{indent}{node.method_call}')
+    return calls
+
+
+def _emit_prefix_fixture(page_class_name: str, prefix: SharedPrefix, snapshot: bool) -> str:
+    """
+    Фикстура общих первых шагов: возвращает объект страницы после них.
+    Со snapshot шаги выполняются один раз на процесс, дальше восстанавливается снимок состояния браузера.
+    """
+    tests = ", ".join(_sanitize_for_function_name(name) for name in prefix.test_case_names)
+    header = (
+        f"@pytest.fixture\n"
+        f"def {prefix.fixture_name}(driver{', prefix_state_snapshots' if snapshot else ''}):\n"
+        f'    """Общие первые шаги ({len(prefix.calls)}) тестов: {tests}."""\n'
+        f"    page = {page_class_name}(driver)\n"
+    )
+    if not snapshot:
+        calls = "\n".join(f"    {call}" for call in prefix.calls)
+        return f"{header}{calls}\n    return page"
+    calls = "\n".join(f"        {call}" for call in prefix.calls)
+    return (
+        f'{header}    snapshot = prefix_state_snapshots.get("{prefix.fixture_name}")\n'
+        f"    if snapshot is None or not page.restore_browser_state(snapshot):\n"
+        f"{calls}\n"
+        f'        prefix_state_snapshots["{prefix.fixture_name}"] = page.capture_browser_state()\n'
+        f"    return page"
+    )
+
+
+def _emit_test_function(compiled: CompiledTestCase, state_data: Dict, prefix: Optional[SharedPrefix] = None) -> str:
+    """
+    Собирает тестовую функцию pytest для скомпилированного тест-кейса.
+    С prefix первые шаги выполняет фикстура prefix.fixture_name, и тест начинается после них.
+    """
+    collection_name = state_data.get("collections", {}).get(state_data.get("activeCollectionId"), {}).get("name",
+                                                                                                          "Default Feature")
+    test_case_name = compiled.name
+    function_name = _sanitize_for_function_name(test_case_name)
+
+    allure_decorators = f'@allure.feature("{collection_name}")\n@allure.title("{test_case_name}")'
+    fixture = prefix.fixture_name if prefix else "driver"
+    test_header = f'# --- Тест для сценария: "{test_case_name}" ---\n{allure_decorators}\ndef {function_name}({fixture}):\n'
+
+    page_instance = f'    page = {prefix.fixture_name}\n' if prefix else f'    page = {compiled.page_class_name}(driver)\n'
+    if compiled.removed_steps:
+        reasons = ", ".join(f"{REMOVAL_REASONS[reason]}: {count}" for reason, count in compiled.removed_steps.items())
+        page_instance += f"    # Минимизация записи: удалено шагов - {sum(compiled.removed_steps.values())} ({reasons})\n"
+
+    # Переменные окружения и DDT
+    variable_definitions = []
+    active_env_name = state_data.get("activeEnvironment", "dev")
+    active_env_vars = state_data.get("environments", {}).get(active_env_name, {})
+
+    if active_env_vars:
+        variable_definitions.append(f'    # Переменные для окружения: {active_env_name}')
+        for key, value in active_env_vars.items():
+            variable_definitions.append(f'    {key} = "{value}"')
+
+    if compiled.ddt_variables:
+        variable_definitions.append('    # Переменные для DDT')
+        for key, value in compiled.ddt_variables.items():
+            variable_definitions.append(f'    {key} = "{value}"')
+
+    variable_section = "\n".join(variable_definitions) + "\n" if variable_definitions else ""
+
+    steps = compiled.steps[len(prefix.calls):] if prefix else compiled.steps
+    method_calls_str = "\n".join(_emit_method_calls(steps, 1))
+    return f"{test_header}{page_instance}\n{variable_section}{method_calls_str}"
+
+
 # --- Основная функция генерации ---
 
 async def generate_full_code_on_server(
@@ -283,125 +1397,155 @@ async def generate_full_code_on_server(
         all_test_cases_for_page: List[Dict],
         state_data: Dict,
         options: Dict
+) -> str:
+    """
+    Асинхронная обертка над generate_full_code для вызова из корутин.
+    Сама генерация синхронная (CPU-bound), в API она выполняется в пуле из app.executor.
+    """
+    return generate_full_code(active_test_case, all_test_cases_for_page, state_data, options)
+
+
+def generate_full_code(
+        active_test_case: Dict,
+        all_test_cases_for_page: List[Dict],
+        state_data: Dict,
+        options: Dict,
+        compiled_test_cases: Optional[List[CompiledTestCase]] = None,
+        with_prefix_fixtures: bool = True
 ) -> str:
     """
     Собирает финальный Python код на основе данных, полученных от расширения.
+    compiled_test_cases - уже готовый IR для all_test_cases_for_page (по позициям), например из test_case_store.
+    С опцией sharedPrefixFixtures тест начинается после общих с другими тест-кейсами страницы первых шагов;
+    фикстура для них добавляется перед тестом, если with_prefix_fixtures (модули тестов с несколькими
+    тестами добавляют фикстуры один раз через generate_prefix_fixtures).
     """
     if not active_test_case:
         return "# Ошибка: Нет активного тест-кейса для генерации кода."
 
     code_parts = []
-    locators_map = {}
-    pom_methods = []
 
-    def process_steps_for_pom(steps: List[Dict]):
-        """Рекурсивно обходит дерево шагов для сбора локаторов и методов POM."""
-        if not steps:
-            return
-        for step in steps:
-            step_type = step.get("type")
-            if step_type == "conditional":
-                process_steps_for_pom([step.get("condition")])
-                process_steps_for_pom(step.get("then_steps"))
-                process_steps_for_pom(step.get("else_steps"))
-            else:
-                element_name = _generate_element_name(step.get("data"))
-                if element_name and element_name not in locators_map and step.get("locators"):
-                    locators_str = ",\n        ".join(step["locators"])
-                    locators_map[element_name] = f"    {element_name}_locators = [\n        {locators_str}\n    ]"
+    # Каждый тест-кейс компилируется в IR один раз; активный тест-кейс, переданный
+    # тем же объектом в списке страницы, повторно не компилируется.
+    compiled_by_id: Dict[int, CompiledTestCase] = {}
+    for test_case, compiled_test_case in zip(all_test_cases_for_page, compiled_test_cases or ()):
+        compiled_by_id[id(test_case)] = compiled_test_case
 
-                method_def = step.get("code", {}).get("methodDefinition")
-                if method_def:
-                    pom_methods.append(method_def)
+    def compiled(test_case: Dict) -> CompiledTestCase:
+        if id(test_case) not in compiled_by_id:
+            compiled_by_id[id(test_case)] = compile_test_case(test_case)
+        if options.get("minimizeSteps"):
+            return minimize(compiled_by_id[id(test_case)])
+        return compiled_by_id[id(test_case)]
 
     # --- Сборка POM ---
-    if options.get("generatePom"):
-        for test_case in all_test_cases_for_page:
-            process_steps_for_pom(test_case.get("recordedSteps", []))
-    else:
-        # Если POM не нужен, все равно обработаем шаги для получения вызовов в тесте
-        process_steps_for_pom(active_test_case.get("recordedSteps", []))
-
     if options.get("generatePom"):
         page_class_name = active_test_case.get("pageClassName", "MyPage")
-        imports = "import allure\nfrom selenium.webdriver.common.by import By\n\nfrom pages.base_page import BasePage\n\n"
-        class_header = f"class {page_class_name}(BasePage):\n"
-        locator_definitions = "\n\n".join(locators_map.values())
-
-        # Убираем дубликаты методов, сохраняя порядок
-        unique_pom_methods = list(dict.fromkeys(pom_methods))
-
-        pom_code = f"{imports}{class_header}{locator_definitions}\n\n" + "\n\n".join(unique_pom_methods)
-        if not unique_pom_methods:
-            pom_code += "    pass"
-
-        code_parts.append(pom_code)
+        code_parts.append(_emit_pom_class(page_class_name, [compiled(tc) for tc in all_test_cases_for_page], options))
 
     # --- Сборка Теста ---
     if options.get("generateTest") and active_test_case.get("recordedSteps"):
-        collection_name = state_data.get("collections", {}).get(state_data.get("activeCollectionId"), {}).get("name",
-                                                                                                              "Default Feature")
-        test_case_name = active_test_case.get("name", "Unnamed Test")
-        function_name = _sanitize_for_function_name(test_case_name)
-
-        allure_decorators = f'@allure.feature("{collection_name}")\n@allure.title("{test_case_name}")'
-        test_header = f'# --- Тест для сценария: "{test_case_name}" ---\n{allure_decorators}\ndef {function_name}(driver):\n'
-
-        page_instance = f'    page = {active_test_case.get("pageClassName", "MyPage")}(driver)\n'
-
-        # Переменные окружения и DDT
-        variable_definitions = []
-        active_env_name = state_data.get("activeEnvironment", "dev")
-        active_env_vars = state_data.get("environments", {}).get(active_env_name, {})
-
-        if active_env_vars:
-            variable_definitions.append(f'    # Переменные для окружения: {active_env_name}')
-            for key, value in active_env_vars.items():
-                variable_definitions.append(f'    {key} = "{value}"')
-
-        ddt_variables = {}
-        for step in active_test_case.get("recordedSteps", []):
-            if step.get("variableName") and step.get("type") != "getText" and not step.get("variableForValue"):
-                value = step.get("data", {}).get("value", step.get("expectedText", ""))
-                ddt_variables[step["variableName"]] = value
-
-        if ddt_variables:
-            variable_definitions.append('    # Переменные для DDT')
-            for key, value in ddt_variables.items():
-                variable_definitions.append(f'    {key} = "{value}"')
-
-        variable_section = "\n".join(variable_definitions) + "\n" if variable_definitions else ""
-
-        def generate_method_calls(steps: List[Dict], indent_level: int) -> List[str]:
-            """Рекурсивно генерирует вызовы методов для тела теста."""
-            calls = []
-            indent = "    " * indent_level
-            for step in steps:
-                if step.get("type") == "conditional":
-                    condition = step.get("condition", {})
-                    boolean_check = condition.get("booleanCheck")
-                    if boolean_check:
-                        method = boolean_check['methodName']
-                        locators = boolean_check['locatorVarName']
-                        calls.append(f"{indent}if page.{method}(page.{locators}):")
-                        calls.extend(generate_method_calls(step.get("then_steps", []), indent_level + 1))
-
-                        else_steps = step.get("else_steps", [])
-                        if else_steps:
-                            calls.append(f"{indent}else:")
-                            calls.extend(generate_method_calls(else_steps, indent_level + 1))
-                else:
-                    method_call = step.get("code", {}).get("methodCall")
-                    if method_call:
-                        calls.append(f'{indent}{method_call}')
-            return calls
-
-        method_calls_str = "\n".join(generate_method_calls(active_test_case.get("recordedSteps", []), 1))
-        test_code = f"{test_header}{page_instance}\n{variable_section}{method_calls_str}"
-        code_parts.append(test_code)
+        prefix = None
+        if options.get("sharedPrefixFixtures"):
+            page_class_name = active_test_case.get("pageClassName", "MyPage")
+            _, assigned = shared_prefixes(
+                [compiled(tc) for tc in all_test_cases_for_page], page_module_name(page_class_name)
+            )
+            prefix = _active_prefix(active_test_case, all_test_cases_for_page, assigned)
+            if prefix and with_prefix_fixtures:
+                snapshot = bool(options.get("prefixStateSnapshot"))
+                code_parts.append("import pytest\n\n\n" + _emit_prefix_fixture(page_class_name, prefix, snapshot))
+        code_parts.append(_emit_test_function(compiled(active_test_case), state_data, prefix))
 
     # --- Добавление BasePage ---
     if options.get("generateBasePage"):
-        code_parts.append(BASE_PAGE_PYTHON_CODE)
+        used_names = None
+        if options.get("treeShakeBasePage"):
+            used_names = set()
+            for part in code_parts:
+                used_names |= code_identifiers(part)
+        code_parts.append(render_base_page(options, used_names))
+
+    return "\n\n".join(code_parts)
+
+
+def _active_prefix(
+        active_test_case: Dict, all_test_cases_for_page: List[Dict], assigned: List[Optional[SharedPrefix]]
+) -> Optional[SharedPrefix]:
+    """Префикс активного тест-кейса; в списке страницы он ищется сначала как тот же объект, затем по равенству."""
+    for test_case, prefix in zip(all_test_cases_for_page, assigned):
+        if test_case is active_test_case:
+            return prefix
+    for test_case, prefix in zip(all_test_cases_for_page, assigned):
+        if test_case == active_test_case:
+            return prefix
+    return None
+
+
+def generate_prefix_fixtures(
+        test_cases_for_page: List[Dict], options: Dict, compiled_test_cases: Optional[List[CompiledTestCase]] = None
+) -> str:
+    """
+    Фикстуры общих первых шагов тест-кейсов страницы (опция sharedPrefixFixtures) - один раз на модуль тестов.
+    Без опции или общих шагов - пустая строка. Модулю нужен import pytest.
+    """
+    if not options.get("sharedPrefixFixtures") or not test_cases_for_page:
+        return ""
+    page_class_name = test_cases_for_page[0].get("pageClassName", "MyPage")
+    if compiled_test_cases is None:
+        compiled_test_cases = [compile_test_case(tc) for tc in test_cases_for_page]
+    if options.get("minimizeSteps"):
+        compiled_test_cases = [minimize(compiled) for compiled in compiled_test_cases]
+    prefixes, _ = shared_prefixes(compiled_test_cases, page_module_name(page_class_name))
+    snapshot = bool(options.get("prefixStateSnapshot"))
+    return "\n\n\n".join(_emit_prefix_fixture(page_class_name, prefix, snapshot) for prefix in prefixes)
+
+
+def code_diff(previous_code: str, code: str, previous_name: str = "previous", name: str = "current") -> str:
+    """Построчный unified diff между прошлой и новой версией сгенерированного кода ("" - без изменений)."""
+    return "\n".join(difflib.unified_diff(
+        previous_code.splitlines(), code.splitlines(), fromfile=previous_name, tofile=name, lineterm=""
+    ))
+
+
+def pom_only_options(options: Dict) -> Dict:
+    """Опции для генерации только POM-класса, с сохранением остальных настроек генератора."""
+    return {**options, "generatePom": True, "generateTest": False, "generateBasePage": False}
 
-    return "\n\n".join(code_parts)
\ No newline at end of file
+
+def test_only_options(options: Dict) -> Dict:
+    """Опции для генерации только теста, с сохранением остальных настроек генератора."""
+    return {**options, "generatePom": False, "generateTest": True, "generateBasePage": False}
+
+
+def group_test_cases_by_page(test_cases: List[Dict]) -> Dict[str, List[Dict]]:
+    """Группирует тест-кейсы коллекции по классу страницы, сохраняя порядок появления."""
+    pages: Dict[str, List[Dict]] = {}
+    for test_case in test_cases:
+        pages.setdefault(test_case.get("pageClassName", "MyPage"), []).append(test_case)
+    return pages
+
+
+def generate_page_code(test_cases_for_page: List[Dict], state_data: Dict, options: Dict) -> str:
+    """
+    Генерирует код одного класса страницы: POM (один раз на страницу) и тесты для каждого тест-кейса.
+    BasePage сюда не входит - он общий для всех страниц коллекции.
+    """
+    code_parts = []
+    if options.get("generatePom"):
+        code_parts.append(generate_full_code(
+            test_cases_for_page[0], test_cases_for_page, state_data, pom_only_options(options)
+        ))
+    if options.get("generateTest"):
+        compiled_test_cases = [compile_test_case(tc) for tc in test_cases_for_page]
+        fixtures_code = generate_prefix_fixtures(test_cases_for_page, options, compiled_test_cases)
+        if fixtures_code:
+            code_parts.append(f"import pytest\n\n\n{fixtures_code}")
+        for test_case in test_cases_for_page:
+            test_code = generate_full_code(
+                test_case, test_cases_for_page, state_data, test_only_options(options),
+                compiled_test_cases=compiled_test_cases, with_prefix_fixtures=False,
+            )
+            if test_code:
+                code_parts.append(test_code)
+    return "\n\n".join(code_parts)
@@ -0,0 +1,52 @@
+# app/core/config.py
+import os
+
+# --- Хранилище ассетов (скриншоты шагов), адресуемое хешем содержимого ---
+ASSET_STORE_DIR = os.getenv("ASSET_STORE_DIR", "./assets")
+MAX_ASSET_BYTES = int(os.getenv("MAX_ASSET_BYTES", 5 * 1024 * 1024))
+MAX_ASSET_CHECK_HASHES = int(os.getenv("MAX_ASSET_CHECK_HASHES", 5000))
+
+# --- Кэш результатов генерации ---
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", 512))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+GENERATION_CACHE_TTL_SECONDS = float(os.getenv("GENERATION_CACHE_TTL_SECONDS", 3600))
+
+# --- Лицензии: подписанные токены и кэш состояния ---
+# Ключ подписи токенов. Если не задан, каждый процесс генерирует случайный (см. security.py): токены
+# не переживают перезапуск и не принимаются другими воркерами uvicorn. В продакшене задавать обязательно.
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+TOKEN_ALGORITHM = "HS256"
+LICENSE_TOKEN_TTL_SECONDS = int(os.getenv("LICENSE_TOKEN_TTL_SECONDS", 15 * 60))
+LICENSE_CACHE_MAX_ENTRIES = int(os.getenv("LICENSE_CACHE_MAX_ENTRIES", 10000))
+LICENSE_CACHE_TTL_SECONDS = float(os.getenv("LICENSE_CACHE_TTL_SECONDS", 60))
+
+# --- Тест-кейсы на сервере для дельта-синхронизации /generate (манифест id + hash) ---
+TEST_CASE_STORE_MAX_LICENSES = int(os.getenv("TEST_CASE_STORE_MAX_LICENSES", 1000))
+TEST_CASE_STORE_MAX_CASES_PER_LICENSE = int(os.getenv("TEST_CASE_STORE_MAX_CASES_PER_LICENSE", 2000))
+TEST_CASE_STORE_MAX_BYTES_PER_LICENSE = int(os.getenv("TEST_CASE_STORE_MAX_BYTES_PER_LICENSE", 16 * 1024 * 1024))
+TEST_CASE_STORE_TTL_SECONDS = float(os.getenv("TEST_CASE_STORE_TTL_SECONDS", 24 * 3600))
+
+# --- Пул для генерации кода (CPU-bound работа вне event loop) ---
+GENERATION_EXECUTOR = os.getenv("GENERATION_EXECUTOR", "thread")  # "thread" или "process"
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", 4))
+GENERATION_QUEUE_LIMIT = int(os.getenv("GENERATION_QUEUE_LIMIT", 32))
+GENERATION_PER_LICENSE_LIMIT = int(os.getenv("GENERATION_PER_LICENSE_LIMIT", 4))
+GENERATION_RETRY_AFTER_SECONDS = int(os.getenv("GENERATION_RETRY_AFTER_SECONDS", 2))
+
+# --- Фоновые задания генерации для целых коллекций ---
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", 3600))
+MAX_ACTIVE_JOBS_PER_LICENSE = int(os.getenv("MAX_ACTIVE_JOBS_PER_LICENSE", 2))
+JOB_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", 15))
+
+# --- Формат и сжатие тела запросов ---
+# Лимит применяется и к сжатому телу, и к результату распаковки (защита от zip-бомб)
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", 64 * 1024 * 1024))
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", 1024))
+
+# --- Имена шагов Allure через LLM (Ollama на стороне сервера) ---
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")  # Пустая строка - только шаблонные имена
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 20))  # Общий срок на все запросы к LLM в одном вызове
+LLM_NAMING_BATCH_SIZE = int(os.getenv("LLM_NAMING_BATCH_SIZE", 40))  # Шагов в одном промпте
+STEP_NAMING_MAX_ITEMS = int(os.getenv("STEP_NAMING_MAX_ITEMS", 500))
+STEP_NAME_CACHE_MAX_ENTRIES = int(os.getenv("STEP_NAME_CACHE_MAX_ENTRIES", 20000))
@@ -12,4 +12,12 @@ def is_license_valid(license: models.License):
         return False
     if license.expires_at < datetime.utcnow():
         return False
-    return True
\ No newline at end of file
+    return True
+
+def deactivate_license(db: Session, key: str):
+    license = get_license_by_key(db, key)
+    if license:
+        license.is_active = False
+        db.commit()
+        db.refresh(license)
+    return license
@@ -1,7 +1,11 @@
-from fastapi import Header, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from . import crud, models
+from fastapi import Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from . import crud, metrics, security
+from .cache import LRUCache
+from .core import config
 from .database import SessionLocal
+from .security import LicenseState
 
 
 def get_db():
@@ -12,21 +16,93 @@ def get_db():
         db.close()
 
 
-async def get_valid_license(
-        authorization: str = Header(...), db: Session = Depends(get_db)
-):
+# Кэш состояния лицензий для запросов с "сырым" ключом: key -> LicenseState (или False, если ключа нет в БД)
+license_cache = LRUCache(
+    max_entries=config.LICENSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.LICENSE_CACHE_TTL_SECONDS,
+    sizeof=lambda _: 1,
+)
+# Лицензии, деактивированные в этом процессе: их еще не истекшие токены больше не принимаются.
+# Список живет только в памяти процесса: другие воркеры и процесс после перезапуска принимают токен
+# деактивированной лицензии, пока он не истечет (не дольше LICENSE_TOKEN_TTL_SECONDS); обмен ключа
+# на новый токен всегда идет через БД и для деактивированной лицензии не удается.
+revoked_license_ids: set = set()
+
+
+def load_license_state(key: str) -> LicenseState | None:
+    """Синхронно читает лицензию из БД. Вызывается из пула потоков, чтобы не блокировать event loop."""
+    db = SessionLocal()
+    try:
+        license_obj = crud.get_license_by_key(db, key=key)
+        return LicenseState.from_model(license_obj) if license_obj else None
+    finally:
+        db.close()
+
+
+def invalidate_license(license: LicenseState) -> None:
+    """Сбрасывает закэшированное состояние лицензии (вызывается при деактивации)."""
+    if license.key:
+        license_cache.invalidate(license.key)
+    if not license.is_active:
+        revoked_license_ids.add(license.id)
+
+
+async def get_license_state(license_key: str) -> LicenseState | None:
+    cached = license_cache.get(license_key)
+    if cached is None:
+        cached = await run_in_threadpool(load_license_state, license_key) or False
+        license_cache.set(license_key, cached)
+    return cached or None
+
+
+def _get_bearer_credential(authorization: str) -> str:
     if not authorization.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication scheme",
         )
+    return authorization.split(" ")[1]
+
+
+async def get_valid_license(authorization: str = Header(...)) -> LicenseState:
+    """
+    Принимает либо подписанный токен (проверяется без БД), либо лицензионный ключ
+    (проверяется по кэшу, а при промахе - по БД в пуле потоков).
+    """
+    with metrics.stage_timer("license"):
+        return await _check_license(authorization)
+
+
+async def _check_license(authorization: str) -> LicenseState:
+    credential = _get_bearer_credential(authorization)
+
+    if security.looks_like_token(credential):
+        license_state = security.decode_license_token(credential)
+        if license_state is None or license_state.id in revoked_license_ids:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+    else:
+        license_state = await get_license_state(credential)
+
+    if not crud.is_license_valid(license_state):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired license key",
+        )
+    return license_state
+
 
-    license_key = authorization.split(" ")[1]
-    license_obj = crud.get_license_by_key(db, key=license_key)
+async def get_license_for_token_exchange(authorization: str = Header(...)) -> LicenseState:
+    """Для обмена ключа на токен всегда читаем свежее состояние из БД, минуя кэш."""
+    license_key = _get_bearer_credential(authorization)
+    license_state = await run_in_threadpool(load_license_state, license_key)
+    license_cache.set(license_key, license_state or False)
 
-    if not crud.is_license_valid(license_obj):
+    if not crud.is_license_valid(license_state):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid or expired license key",
         )
-    return license_obj
\ No newline at end of file
+    return license_state
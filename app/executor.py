@@ -0,0 +1,158 @@
+# app/executor.py
+import asyncio
+import functools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+from .core import config
+
+
+class ExecutorSaturated(Exception):
+    """Очередь генерации переполнена (глобально или для конкретной лицензии)."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    # Выполняется внутри воркера: возвращаем момент старта, чтобы посчитать время ожидания в очереди.
+    # time.time(), а не monotonic, т.к. в режиме process часы должны быть общими для процессов.
+    return time.time(), fn(*args, **kwargs)
+
+
+class GenerationExecutor:
+    """
+    Ограниченный пул для CPU-bound генерации кода с контролем допуска:
+    не больше max_workers + max_queue задач в полете и не больше per_license_limit на одну лицензию.
+    Методы run()/stats() вызываются из event loop, поэтому счетчики не требуют блокировок.
+    """
+
+    def __init__(
+            self,
+            kind: str = "thread",
+            max_workers: int = 4,
+            max_queue: int = 32,
+            per_license_limit: int = 4,
+            retry_after: int = 2,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.per_license_limit = per_license_limit
+        self.retry_after = retry_after
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._per_license = defaultdict(int)
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_pool(self) -> Executor:
+        # Пул создается лениво, чтобы импорт модуля не порождал процессы
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="codegen")
+        return self._pool
+
+    def check_admission(self, license_id: Optional[Hashable]) -> None:
+        """Бросает ExecutorSaturated, если задачу для license_id сейчас не приняли бы. Место не занимает."""
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated("Generation queue is full", self.retry_after)
+        if license_id is not None and self._per_license.get(license_id, 0) >= self.per_license_limit:
+            self.rejected += 1
+            raise ExecutorSaturated("Too many concurrent generations for this license", self.retry_after)
+
+    def _admit(self, license_id: Optional[Hashable]) -> None:
+        self.check_admission(license_id)
+        self._in_flight += 1
+        if license_id is not None:
+            self._per_license[license_id] += 1
+
+    def _release(self, license_id: Optional[Hashable]) -> None:
+        self._in_flight -= 1
+        if license_id is not None:
+            self._per_license[license_id] -= 1
+            if not self._per_license[license_id]:
+                del self._per_license[license_id]
+
+    @contextmanager
+    def reservation(self, license_id: Optional[Hashable]) -> Iterator[None]:
+        """
+        Занимает место на время блока: все CPU-шаги одного запроса (хеширование, сборка тест-кейсов,
+        генерация) идут через run_reserved/run_local под одним допуском. Бросает ExecutorSaturated.
+        """
+        self._admit(license_id)
+        try:
+            yield
+        finally:
+            self._release(license_id)
+
+    async def run(self, fn: Callable, *args, license_id: Optional[Hashable] = None, **kwargs) -> Any:
+        """Выполняет fn(*args, **kwargs) в пуле. Бросает ExecutorSaturated, если места нет."""
+        with self.reservation(license_id):
+            return await self.run_reserved(fn, *args, **kwargs)
+
+    async def run_reserved(self, fn: Callable, *args, **kwargs) -> Any:
+        """Выполняет fn в пуле без проверки допуска: место уже занято через reservation()."""
+        submitted_at = time.time()
+        loop = asyncio.get_running_loop()
+        started_at, result = await loop.run_in_executor(
+            self._get_pool(), functools.partial(_timed_call, fn, args, kwargs)
+        )
+        wait = max(started_at - submitted_at, 0.0)
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_run += time.time() - started_at
+        return result
+
+    async def run_local(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Выполняет fn в потоке этого процесса, не в event loop. Для шагов, которым нужна память процесса
+        (хранилище тест-кейсов, итераторы экспорта): в режиме thread - в том же пуле, в режиме process -
+        в пуле потоков event loop. Допуск не проверяется: вызывать под reservation().
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool() if self.kind == "thread" else None
+        return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue,
+            "per_license_limit": self.per_license_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(self.total_wait / self.completed, 6) if self.completed else 0.0,
+            "max_wait_seconds": round(self.max_wait, 6),
+            "avg_run_seconds": round(self.total_run / self.completed, 6) if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+generation_executor = GenerationExecutor(
+    kind=config.GENERATION_EXECUTOR,
+    max_workers=config.GENERATION_WORKERS,
+    max_queue=config.GENERATION_QUEUE_LIMIT,
+    per_license_limit=config.GENERATION_PER_LICENSE_LIMIT,
+    retry_after=config.GENERATION_RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,114 @@
+# app/export.py
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from .code_generator import (
+    generate_full_code,
+    generate_prefix_fixtures,
+    group_test_cases_by_page,
+    page_module_name,
+    pom_only_options,
+    render_base_page,
+    render_conftest,
+    test_only_options,
+)
+from .step_ir import compile_test_case
+from .tree_shaker import code_identifiers
+
+PROJECT_REQUIREMENTS = "selenium\npytest\nallure-pytest\n"
+
+# Файл проекта: путь внутри архива и содержимое, отдаваемое кусками (чтобы не держать модуль целиком)
+ProjectFile = Tuple[str, Iterable[str]]
+
+
+def _test_module_chunks(
+        page_class_name: str, module: str, test_cases: List[Dict], state_data: Dict, options: Dict, used_names: Set[str]
+) -> Iterator[str]:
+    compiled_test_cases = [compile_test_case(tc) for tc in test_cases]
+    fixtures_code = generate_prefix_fixtures(test_cases, options, compiled_test_cases)
+    if fixtures_code:
+        used_names |= code_identifiers(fixtures_code)
+        yield f"import allure\nimport pytest\n\nfrom pages.{module} import {page_class_name}\n\n\n{fixtures_code}\n"
+    else:
+        yield f"import allure\n\nfrom pages.{module} import {page_class_name}\n"
+    for test_case in test_cases:
+        test_code = generate_full_code(
+            test_case, test_cases, state_data, test_only_options(options),
+            compiled_test_cases=compiled_test_cases, with_prefix_fixtures=False,
+        )
+        if test_code:
+            used_names |= code_identifiers(test_code)
+            yield f"\n\n{test_code}\n"
+
+
+def _base_page_chunks(options: Dict, used_names: Set[str]) -> Iterator[str]:
+    # Рендерится при чтении, когда модули страниц и тестов уже сгенерированы и used_names заполнен
+    yield render_base_page(options, used_names).lstrip()
+
+
+def iter_project_files(test_cases: List[Dict], state_data: Dict, options: Dict = None) -> Iterator[ProjectFile]:
+    """
+    Раскладывает коллекцию по структуре готового pytest-проекта:
+    pages/base_page.py, pages/<страница>.py, tests/test_<страница>.py и conftest.py.
+    Код генерируется лениво, по мере записи файлов в архив. options управляют настройками BasePage.
+    pages/base_page.py отдается последним: с опцией treeShakeBasePage в нем остается только то,
+    что используют уже сгенерированные страницы и тесты, поэтому файлы нужно читать по порядку.
+    """
+    options = options or {}
+    yield "conftest.py", [render_conftest(options)]
+    yield "requirements.txt", [PROJECT_REQUIREMENTS]
+    yield "pages/__init__.py", [""]
+    yield "tests/__init__.py", [""]
+
+    used_names: Set[str] = set()
+    used_modules = set()
+    for page_class_name, page_test_cases in group_test_cases_by_page(test_cases).items():
+        module = page_module_name(page_class_name)
+        while module in used_modules:
+            module += "_"
+        used_modules.add(module)
+
+        pom_code = generate_full_code(page_test_cases[0], page_test_cases, state_data, pom_only_options(options))
+        used_names |= code_identifiers(pom_code)
+        yield f"pages/{module}.py", [pom_code, "\n"]
+        yield f"tests/test_{module}.py", _test_module_chunks(
+            page_class_name, module, page_test_cases, state_data, options, used_names
+        )
+
+    yield "pages/base_page.py", _base_page_chunks(options, used_names)
+
+
+class _ChunkSink:
+    """Файлоподобный приемник для zipfile без seek/tell: копит записанные байты до выгрузки."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def stream_zip(files: Iterable[ProjectFile]) -> Iterator[bytes]:
+    """
+    Потоково упаковывает файлы в zip. Архив отдается кусками по мере готовности,
+    поэтому память не растет с размером коллекции.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, chunks in files:
+            with archive.open(path, mode="w") as entry:
+                for chunk in chunks:
+                    entry.write(chunk.encode("utf-8"))
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
@@ -0,0 +1,125 @@
+# app/jobs.py
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional
+
+from .code_generator import generate_page_code, group_test_cases_by_page, render_base_page
+from .core import config
+from .executor import ExecutorSaturated, generation_executor
+from .tree_shaker import code_identifiers
+
+
+@dataclass
+class GenerationJob:
+    """Фоновое задание генерации кода для коллекции. Прогресс считается в страницах."""
+    id: str
+    license_id: Hashable
+    total: int
+    status: str = "pending"
+    completed: int = 0
+    results: Dict[str, str] = field(default_factory=dict)
+    base_page: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def notify(self) -> None:
+        """Будит всех, кто ждет изменения прогресса (SSE-подписчиков), и готовит новое событие."""
+        event, self.changed = self.changed, asyncio.Event()
+        event.set()
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """Реестр заданий в памяти процесса. Результаты удаляются через result_ttl секунд после завершения."""
+
+    def __init__(self, result_ttl: float, max_active_per_license: int):
+        self.result_ttl = result_ttl
+        self.max_active_per_license = max_active_per_license
+        self._jobs: Dict[str, GenerationJob] = {}
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def active_count(self, license_id: Hashable) -> int:
+        return sum(1 for job in self._jobs.values() if job.license_id == license_id and not job.is_finished)
+
+    def create(self, license_id: Hashable, total: int) -> GenerationJob:
+        self.purge_expired()
+        job = GenerationJob(id=uuid.uuid4().hex, license_id=license_id, total=total)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str, license_id: Hashable) -> Optional[GenerationJob]:
+        """Возвращает задание, только если оно принадлежит этой лицензии."""
+        self.purge_expired()
+        job = self._jobs.get(job_id)
+        if job is None or job.license_id != license_id:
+            return None
+        return job
+
+    def finish(self, job: GenerationJob, error: Optional[str] = None) -> None:
+        job.status = "failed" if error else "done"
+        job.error = error
+        job.finished_at = time.monotonic()
+        job.notify()
+
+
+job_registry = JobRegistry(
+    result_ttl=config.JOB_RESULT_TTL_SECONDS,
+    max_active_per_license=config.MAX_ACTIVE_JOBS_PER_LICENSE,
+)
+
+
+async def _run_in_executor_when_free(fn, *args, license_id: Hashable):
+    """В отличие от /generate, задание не отклоняется при переполненной очереди, а ждет."""
+    while True:
+        try:
+            return await generation_executor.run(fn, *args, license_id=license_id)
+        except ExecutorSaturated as e:
+            await asyncio.sleep(e.retry_after)
+
+
+async def run_generation_job(job: GenerationJob, test_cases: list, state_data: dict, options: dict) -> None:
+    """Генерирует код страница за страницей, обновляя прогресс задания."""
+    job.status = "running"
+    job.notify()
+    try:
+        for page_class_name, page_test_cases in group_test_cases_by_page(test_cases).items():
+            job.results[page_class_name] = await _run_in_executor_when_free(
+                generate_page_code, page_test_cases, state_data, options, license_id=job.license_id
+            )
+            job.completed += 1
+            job.notify()
+        if options.get("generateBasePage"):
+            used_names = set()
+            for page_code in job.results.values():
+                used_names |= code_identifiers(page_code)
+            job.base_page = render_base_page(options, used_names)
+        job_registry.finish(job)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        job_registry.finish(job, error=f"Code generation failed: {e.__class__.__name__}")
@@ -1,13 +1,27 @@
 # app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware  # <-- 1. ИМПОРТИРУЙТЕ ЭТО
+from fastapi.middleware.gzip import GZipMiddleware
+from .core import config
 from .database import engine, Base
 from .api.v1 import endpoints
+from .executor import generation_executor
+from .metrics import CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
 
 # Создаем таблицы в БД при первом запуске
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Selenium CodeGen API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Останавливаем пул генерации при завершении сервера
+    generation_executor.shutdown()
+
+
+app = FastAPI(title="Selenium CodeGen API", lifespan=lifespan)
 
 # --- 2. ДОБАВЬТЕ ЭТОТ БЛОК ДЛЯ НАСТРОЙКИ CORS ---
 origins = [
@@ -22,11 +36,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Разрешает все методы (GET, POST, etc.)
     allow_headers=["*"],  # Разрешает все заголовки
+    expose_headers=["ETag", "Retry-After"],  # Расширение читает ETag, чтобы слать If-None-Match
 )
 # --- КОНЕЦ БЛОКА CORS ---
 
+# Сжимаем ответы (сгенерированный код хорошо жмется), если клиент прислал Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=config.RESPONSE_GZIP_MIN_BYTES)
+
+# Метрики подключаются последними: самый внешний слой видит полное время и размеры тел на проводе
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(endpoints.router, prefix="/api/v1", tags=["v1"])
 
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Метрики процесса в текстовом формате Prometheus."""
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Selenium CodeGen API"}
\ No newline at end of file
@@ -0,0 +1,213 @@
+# app/metrics.py
+"""
+Метрики сервера в текстовом формате Prometheus (GET /metrics) без внешних зависимостей.
+
+Счетчики и гистограммы живут в памяти процесса: запись - это поиск корзины и пара сложений
+под локом. При нескольких воркерах uvicorn у каждого процесса свои значения,
+Prometheus собирает их как отдельные экземпляры.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+STEP_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Метка маршрута для запросов, не попавших ни в один маршрут (иначе число меток не ограничено)
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value))
+
+
+class Counter:
+    """Монотонный счетчик с метками."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами; корзины хранятся не накопленными и суммируются при выдаче."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self._series: Dict[Tuple[str, ...], list] = {}  # метки -> [счетчики корзин (+Inf последней), сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                labels = _format_labels(self.label_names + ("le",), label_values + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float], label_names: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, documentation, buckets, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "codegen_http_request_duration_seconds", "Время обработки HTTP-запроса.",
+    LATENCY_BUCKETS, ("method", "route", "status"),
+)
+REQUEST_BYTES = registry.histogram(
+    "codegen_http_request_size_bytes", "Размер тела запроса как он пришел по сети (до распаковки).",
+    SIZE_BUCKETS, ("route",),
+)
+RESPONSE_BYTES = registry.histogram(
+    "codegen_http_response_size_bytes", "Размер тела ответа как он ушел по сети (после сжатия).",
+    SIZE_BUCKETS, ("route",),
+)
+ERRORS = registry.counter(
+    "codegen_http_errors_total", "Ответы со статусом 4xx/5xx, включая необработанные исключения.",
+    ("route", "status"),
+)
+STAGE_SECONDS = registry.histogram(
+    "codegen_stage_duration_seconds",
+    "Время стадий обработки: receive, decode, validate, license, generate, serialize, llm.",
+    LATENCY_BUCKETS, ("stage",),
+)
+REQUEST_STEPS = registry.histogram(
+    "codegen_request_steps", "Число записанных шагов (включая вложенные в IF/ELSE) в запросе.",
+    STEP_BUCKETS, ("route",),
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Замеряет стадию обработки запроса; время пишется и при исключении."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+
+def route_label(scope: dict) -> str:
+    """Шаблон пути маршрута (/api/v1/generate/jobs/{job_id}), а не сам путь - чтобы метки не плодились."""
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    # Для маршрутов из include_router FastAPI кладет в scope путь без префикса (/generate вместо /api/v1/generate):
+    # префикс восстанавливается из пути запроса по числу сегментов шаблона
+    path = scope["path"]
+    prefix = "/".join(path.split("/")[:path.count("/") - template.count("/") + 1])
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: время запроса, размеры тел запроса и ответа, ошибки.
+    Подключается последним (самым внешним), поэтому видит размеры тел на проводе.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_bytes = response_bytes = 0
+        status_code = 500  # Если ответ так и не начался - это необработанное исключение
+
+        async def receive_with_size():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_with_size(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_with_size, send_with_size)
+        finally:
+            route = route_label(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route, str(status_code))
+            REQUEST_BYTES.observe(request_bytes, route)
+            RESPONSE_BYTES.observe(response_bytes, route)
+            if status_code >= 400:
+                ERRORS.inc(route, str(status_code))
@@ -26,4 +26,13 @@ class License(Base):
     is_active = Column(Boolean, default=True)
     expires_at = Column(DateTime, default=lambda: datetime.utcnow() + timedelta(days=30))
 
-    owner = relationship("User", back_populates="licenses")
\ No newline at end of file
+    owner = relationship("User", back_populates="licenses")
+
+
+class StepName(Base):
+    """Кэш имен шагов Allure, сгенерированных LLM. key - хеш (модель, действие, элемент, значение)."""
+    __tablename__ = "step_names"
+    key = Column(String, primary_key=True)
+    model = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
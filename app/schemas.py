@@ -1,5 +1,25 @@
-from pydantic import BaseModel, Field
-from typing import List, Any, Dict
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Any, Dict, Union
+
+# Поля шага с бинарными данными (base64-скриншоты). Генератору они не нужны,
+# поэтому отбрасываются до валидации, а на скриншот шаг ссылается через screenshotHash.
+BINARY_STEP_FIELDS = ("screenshot",)
+
+# Опции генератора: флаги (generatePom, fastActions...) и числовые настройки BasePage (idleQuietMs...)
+GeneratorOptions = Dict[str, Union[bool, int, float, str]]
+
+
+def strip_binary_fields(steps: List[Any]) -> None:
+    """Рекурсивно (включая IF/ELSE блоки) удаляет из шагов бинарные поля."""
+    for step in steps or []:
+        if not isinstance(step, dict):
+            continue
+        for field in BINARY_STEP_FIELDS:
+            step.pop(field, None)
+        if step.get("type") == "conditional":
+            strip_binary_fields([step.get("condition")])
+            strip_binary_fields(step.get("then_steps"))
+            strip_binary_fields(step.get("else_steps"))
 
 
 # Схема для получения "сырых" шагов от расширения
@@ -22,18 +42,102 @@ class GenerationRequest(BaseModel):
 # Схема для ответа с кодом
 class GenerationResponse(BaseModel):
     code: str
+    diff: str | None = None  # unified diff от версии previousEtag; нет, если ее не просили или она уже не в кэше
+    # id тест-кейсов манифеста, которые сервер не сохранил (больше квоты): клиент присылает их целиком каждый раз
+    notStoredTestCases: List[str] | None = None
 
 
 class TestCaseData(BaseModel):
     """Схема для данных одного тест-кейса."""
+    id: str | None = None  # Нужен для дельта-синхронизации по testCaseManifest, в генерацию не передается
     name: str
     recordedSteps: List[Dict[str, Any]] # Используем Dict, т.к. структура шага сложная
     pageClassName: str
     # Добавьте другие поля, если они понадобятся, например, переменные
 
+    def to_generator_dict(self) -> Dict[str, Any]:
+        """
+        Те же данные, что model_dump(), но без глубокого копирования шагов:
+        после валидации recordedSteps уже состоят из обычных словарей.
+        """
+        return {"name": self.name, "recordedSteps": self.recordedSteps, "pageClassName": self.pageClassName}
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_binary_fields(cls, data: Any) -> Any:
+        if isinstance(data, dict) and isinstance(data.get("recordedSteps"), list):
+            strip_binary_fields(data["recordedSteps"])
+        return data
+
+class TestCaseRef(BaseModel):
+    """Элемент манифеста: id тест-кейса и его версия (хеш, вычисленный клиентом)."""
+    id: str
+    hash: str = Field(max_length=128)
+
+
 class GenerationRequest(BaseModel):
-    """Основная схема запроса на генерацию."""
+    """
+    Основная схема запроса на генерацию.
+    Если передан testCaseManifest, то тест-кейсы страницы - это тест-кейсы манифеста, а в allTestCasesForPage
+    приходят только те из них, которых нет на сервере (activeTestCase считается присланным всегда).
+    previousEtag - ETag прошлого ответа: если тот код еще в кэше генерации, в ответ добавляется diff от него.
+    """
     activeTestCase: TestCaseData
     allTestCasesForPage: List[TestCaseData]
     stateData: Dict[str, Any] # Для переменных окружения, имени коллекции и т.д.
-    options: Dict[str, bool] = Field(default_factory=dict)
\ No newline at end of file
+    options: GeneratorOptions = Field(default_factory=dict)
+    testCaseManifest: List[TestCaseRef] | None = None
+    previousEtag: str | None = Field(default=None, max_length=132)
+
+class AssetCheckRequest(BaseModel):
+    """Список хешей ассетов, наличие которых нужно проверить на сервере."""
+    hashes: List[str]
+
+
+class AssetCheckResponse(BaseModel):
+    missing: List[str]
+
+
+class StepNameItem(BaseModel):
+    """Шаг для именования: действие (subType или type), имя элемента и введенное/ожидаемое значение."""
+    action: str
+    element: str
+    value: str = ""
+
+
+class StepNamingRequest(BaseModel):
+    steps: List[StepNameItem]
+
+
+class StepNamingResponse(BaseModel):
+    names: List[str]  # В порядке шагов запроса
+    cached: int  # Уникальных шагов, взятых из кэша
+    generated: int  # Уникальных шагов, названных LLM в этом запросе
+    fallback: int  # Уникальных шагов с шаблонным именем (LLM недоступна или не ответила)
+
+
+class TokenResponse(BaseModel):
+    """Короткоживущий подписанный токен, которым можно заменить лицензионный ключ в Authorization."""
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class CollectionGenerationRequest(BaseModel):
+    """Запрос на генерацию для всей коллекции: тест-кейсы всех ее страниц."""
+    testCases: List[TestCaseData]
+    stateData: Dict[str, Any]
+    options: GeneratorOptions = Field(default_factory=dict)
+
+
+class JobStatusResponse(BaseModel):
+    id: str
+    status: str  # pending | running | done | failed
+    total: int
+    completed: int
+    error: str | None = None
+
+
+class JobResultResponse(BaseModel):
+    pages: Dict[str, str]  # pageClassName -> код POM и тестов страницы
+    basePage: str | None = None
@@ -0,0 +1,77 @@
+# app/security.py
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from jose import JWTError, jwt
+
+from . import models
+from .core import config
+
+
+if config.SECRET_KEY:
+    _SIGNING_KEY = config.SECRET_KEY
+else:
+    # Известный всем ключ по умолчанию позволил бы выпустить себе любую лицензию; случайный ключ безопасен,
+    # но действует только в этом процессе
+    _SIGNING_KEY = secrets.token_urlsafe(32)
+    print("WARNING: SECRET_KEY is not set, license tokens are signed with a random per-process key")
+
+
+@dataclass(frozen=True)
+class LicenseState:
+    """Снимок лицензии, достаточный для проверки доступа без обращения к БД."""
+    id: int
+    is_active: bool
+    expires_at: datetime  # naive UTC, как в models.License
+    key: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, license: models.License) -> "LicenseState":
+        return cls(id=license.id, is_active=license.is_active, expires_at=license.expires_at, key=license.key)
+
+
+def _to_timestamp(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_timestamp(value: int) -> datetime:
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+def looks_like_token(credential: str) -> bool:
+    """JWT состоит из трех частей через точку, лицензионный ключ (UUID) - нет."""
+    return credential.count(".") == 2
+
+
+def create_license_token(license: LicenseState) -> Tuple[str, int]:
+    """
+    Выпускает короткоживущий подписанный токен с состоянием лицензии.
+    Возвращает (токен, срок жизни в секундах). Токен не живет дольше самой лицензии.
+    """
+    now = int(time.time())
+    exp = min(now + config.LICENSE_TOKEN_TTL_SECONDS, _to_timestamp(license.expires_at))
+    claims = {
+        "sub": str(license.id),
+        "act": license.is_active,
+        "lexp": _to_timestamp(license.expires_at),
+        "iat": now,
+        "exp": exp,
+    }
+    token = jwt.encode(claims, _SIGNING_KEY, algorithm=config.TOKEN_ALGORITHM)
+    return token, max(exp - now, 0)
+
+
+def decode_license_token(token: str) -> Optional[LicenseState]:
+    """Проверяет подпись и срок действия токена. Возвращает None, если токен недействителен."""
+    try:
+        claims = jwt.decode(token, _SIGNING_KEY, algorithms=[config.TOKEN_ALGORITHM])
+        return LicenseState(
+            id=int(claims["sub"]),
+            is_active=bool(claims["act"]),
+            expires_at=_from_timestamp(claims["lexp"]),
+        )
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,211 @@
+# app/step_ir.py
+"""
+Промежуточное представление (IR) записанных шагов.
+
+Дерево шагов от расширения (вложенные словари) один раз за запрос компилируется
+в компактные узлы. Из них затем собираются и POM-класс, и тело теста,
+без повторных обходов словарей и повторного вычисления имен элементов.
+"""
+import re
+import sys
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+# --- Имена элементов, портированные из JS ---
+
+@lru_cache(maxsize=8192)
+def _clean_element_name(name_source: str) -> str:
+    """Превращает исходную строку (testid, id, текст...) в snake_case имя. Мемоизируется."""
+    clean_name = re.sub(r"[^a-zA-Z0-9\s]", "", name_source)
+    snake_case_name = re.sub(r"\s+", "_", clean_name).lower()
+    return snake_case_name[:40] if snake_case_name else "element"
+
+
+def _generate_element_name(data: Dict[str, Any]) -> str:
+    """Генерирует имя переменной для элемента на основе его данных."""
+    if not data:
+        return "element"
+    s = data.get("selectors", {})
+    if not s:
+        return "page_context"
+
+    attributes = data.get("attributes", {})
+    name_source = (
+            attributes.get("data-testid")
+            or s.get("id")
+            or s.get("name")
+            or s.get("placeholder")
+            or data.get("text")
+            or data.get("tag")
+            or "element"
+    )
+    return _clean_element_name(str(name_source))
+
+
+# --- Отпечаток элемента для лечения по сходству ---
+
+FINGERPRINT_TEXT_LIMIT = 80
+FINGERPRINT_MAX_CLASSES = 8
+FINGERPRINT_MAX_DATA_ATTRIBUTES = 5
+
+
+def element_fingerprint(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Компактный отпечаток элемента из данных записи: тег, текст, устойчивые атрибуты, классы и положение.
+    Встраивается в POM, чтобы BasePage мог найти похожий элемент, когда все локаторы сломались.
+    """
+    if not data or not data.get("tag"):
+        return {}
+    selectors = data.get("selectors") or {}
+    attributes = data.get("attributes") or {}
+    fingerprint: Dict[str, Any] = {"tag": data["tag"]}
+
+    text = " ".join(str(data.get("text") or "").split())
+    if text:
+        fingerprint["text"] = text[:FINGERPRINT_TEXT_LIMIT]
+
+    attrs = {}
+    for name, value in (
+            ("id", selectors.get("id")),
+            ("name", selectors.get("name")),
+            ("placeholder", attributes.get("placeholder")),
+            ("aria-label", attributes.get("aria-label")),
+            ("title", attributes.get("title")),
+            ("href", attributes.get("href")),
+    ):
+        if value:
+            attrs[name] = str(value)[:FINGERPRINT_TEXT_LIMIT]
+    data_attributes = [(k, v) for k, v in (data.get("dataAttributes") or {}).items() if v]
+    for name, value in data_attributes[:FINGERPRINT_MAX_DATA_ATTRIBUTES]:
+        attrs[name] = str(value)[:FINGERPRINT_TEXT_LIMIT]
+    if attrs:
+        fingerprint["attrs"] = attrs
+
+    classes = str(attributes.get("class") or "").split()
+    if classes:
+        fingerprint["classes"] = classes[:FINGERPRINT_MAX_CLASSES]
+
+    # rect записан во viewport-координатах (по нему обрезается скриншот), а SIMILARITY_JS сравнивает
+    # положение на странице: добавляем прокрутку в момент записи (в старых записях ее нет - считаем 0)
+    rect = data.get("rect") or {}
+    scroll = data.get("scroll") or {}
+    values = [rect.get(k) for k in ("x", "y", "width", "height")] + [scroll.get("x", 0), scroll.get("y", 0)]
+    if all(isinstance(v, (int, float)) for v in values):
+        x, y, width, height, scroll_x, scroll_y = values
+        fingerprint["rect"] = [round(x + scroll_x), round(y + scroll_y), round(width), round(height)]
+    return fingerprint
+
+
+# --- Узлы IR ---
+
+@dataclass(slots=True)
+class ActionNode:
+    """Обычный шаг: действие, проверка, ожидание или переключение фрейма."""
+    element_name: str
+    locators: Tuple[str, ...]
+    method_definition: Optional[str]
+    method_call: Optional[str]
+    action: str = ""  # subType или type шага: click, input, waitVisible, switch_to_iframe...
+    recorded_at: Optional[float] = None  # Время записи шага (мс), если id шага - отметка Date.now()
+
+
+@dataclass(slots=True)
+class ConditionalNode:
+    """Блок IF/ELSE. boolean_check - (имя метода проверки, переменная локаторов) или None."""
+    condition: Optional[ActionNode]
+    boolean_check: Optional[Tuple[str, str]]
+    then_steps: List["StepNode"]
+    else_steps: List["StepNode"]
+
+
+StepNode = Union[ActionNode, ConditionalNode]
+
+
+@dataclass(slots=True)
+class CompiledTestCase:
+    """
+    Результат компиляции тест-кейса. Помимо дерева узлов хранит то, что нужно POM-эмиттеру,
+    в порядке обхода: локаторы элементов (с исходными данными шага для отпечатка)
+    и определения методов (включая шаги внутри IF/ELSE).
+    """
+    name: str
+    page_class_name: str
+    steps: List[StepNode]
+    locator_entries: List[Tuple[str, Tuple[str, ...], Optional[Dict[str, Any]]]] = field(default_factory=list)
+    method_definitions: List[str] = field(default_factory=list)
+    ddt_variables: Dict[str, Any] = field(default_factory=dict)
+    # Заполняются проходом минимизации (step_minimizer) в его результате
+    removed_steps: Dict[str, int] = field(default_factory=dict)
+    repeated_lookups: int = 0
+    minimized: Optional["CompiledTestCase"] = field(default=None, repr=False, compare=False)  # Кэш результата минимизации
+
+
+class _Compiler:
+    def __init__(self, compiled: CompiledTestCase):
+        self.compiled = compiled
+
+    def action(self, step: Dict) -> ActionNode:
+        code = step.get("code") or {}
+        step_id = step.get("id")
+        node = ActionNode(
+            element_name=_generate_element_name(step.get("data")),
+            locators=tuple(sys.intern(locator) for locator in step.get("locators") or ()),
+            method_definition=code.get("methodDefinition"),
+            method_call=code.get("methodCall"),
+            action=step.get("subType") or step.get("type") or "",
+            recorded_at=step_id if isinstance(step_id, (int, float)) and not isinstance(step_id, bool) else None,
+        )
+        if node.locators:
+            self.compiled.locator_entries.append((node.element_name, node.locators, step.get("data")))
+        if node.method_definition:
+            self.compiled.method_definitions.append(node.method_definition)
+        return node
+
+    def steps(self, steps: Optional[List[Dict]], top_level: bool = False) -> List[StepNode]:
+        nodes: List[StepNode] = []
+        for step in steps or []:
+            if not step:
+                continue
+            if top_level:
+                self._collect_ddt_variable(step)
+            if step.get("type") == "conditional":
+                condition = step.get("condition") or {}
+                boolean_check = condition.get("booleanCheck")
+                nodes.append(ConditionalNode(
+                    condition=self.action(condition) if condition else None,
+                    boolean_check=(boolean_check["methodName"], boolean_check["locatorVarName"]) if boolean_check else None,
+                    then_steps=self.steps(step.get("then_steps")),
+                    else_steps=self.steps(step.get("else_steps")),
+                ))
+            else:
+                nodes.append(self.action(step))
+        return nodes
+
+    def _collect_ddt_variable(self, step: Dict) -> None:
+        # DDT-переменные исторически берутся только из шагов верхнего уровня
+        if step.get("variableName") and step.get("type") != "getText" and not step.get("variableForValue"):
+            value = step.get("data", {}).get("value", step.get("expectedText", ""))
+            self.compiled.ddt_variables[step["variableName"]] = value
+
+
+def count_steps(steps: Optional[List[Dict]]) -> int:
+    """Число шагов, включая шаги внутри IF/ELSE."""
+    count = 0
+    for step in steps or []:
+        count += 1
+        if step.get("type") == "conditional":
+            count += count_steps(step.get("then_steps")) + count_steps(step.get("else_steps"))
+    return count
+
+
+def compile_test_case(test_case: Dict) -> CompiledTestCase:
+    """Компилирует тест-кейс в IR за один рекурсивный обход дерева шагов."""
+    compiled = CompiledTestCase(
+        name=test_case.get("name", "Unnamed Test"),
+        page_class_name=test_case.get("pageClassName", "MyPage"),
+        steps=[],
+    )
+    compiled.steps = _Compiler(compiled).steps(test_case.get("recordedSteps", []), top_level=True)
+    return compiled
@@ -0,0 +1,152 @@
+# app/step_minimizer.py
+"""
+Минимизация записи перед генерацией (опция minimizeSteps): удаление шагов, которые не меняют результат теста,
+но стоят запросов к WebDriver.
+
+- подряд идущие вводы в одно поле: остается последний (ввод очищает поле);
+- повторный клик по тому же элементу в пределах DUPLICATE_CLICK_WINDOW_MS от предыдущего (двойная запись);
+- серии переключений фреймов сводятся к итоговому переходу; переход в тот фрейм, где тест уже находится, убирается;
+- ожидание видимости/кликабельности прямо перед кликом по тому же элементу (клик сам ждет кликабельности).
+
+Шаги не переносятся через границы IF/ELSE: ветки минимизируются по отдельности, а после блока фрейм
+считается неизвестным. Блок, из обеих веток которого убраны все шаги, убирается целиком. Исходный IR
+не изменяется (он разделяется между запросами через test_case_store): результат - новый CompiledTestCase
+с теми же узлами, без удаленных.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from .step_ir import ActionNode, CompiledTestCase, ConditionalNode, StepNode
+
+DUPLICATE_CLICK_WINDOW_MS = 500
+
+INPUT_ACTIONS = {"input"}
+CLICK_ACTIONS = {"click"}
+FRAME_ACTIONS = {"switch_to_iframe", "switch_to_default_content"}
+# Ожидания, которые перекрывает следующий за ними клик: do_click_with_healing ждет element_to_be_clickable
+CLICK_COVERED_WAITS = {"waitVisible", "waitClickable"}
+
+# Причины удаления -> подписи для отчета в тесте
+REMOVAL_REASONS = {
+    "input": "повторный ввод",
+    "click": "дубли кликов",
+    "frame": "переключения фреймов",
+    "wait": "лишние ожидания",
+}
+
+Frame = Optional[Tuple[Tuple[str, ...], ...]]  # Путь из локаторов фреймов от страницы; () - страница, None - неизвестно
+
+
+def _is_action(node: StepNode, actions) -> bool:
+    return isinstance(node, ActionNode) and node.action in actions and bool(node.method_call)
+
+
+def _minimize_frames(run: List[ActionNode], frame: Frame) -> Tuple[List[ActionNode], Frame]:
+    """Серия переключений фреймов -> минимальная серия с тем же итоговым фреймом."""
+    last_default = max((i for i, node in enumerate(run) if node.action == "switch_to_default_content"), default=-1)
+    tail = run[last_default + 1:]
+    if last_default < 0:
+        # Без выхода на страницу каждый вход - во вложенный фрейм, все они нужны
+        return run, None if frame is None else frame + tuple(node.locators for node in tail)
+    target = tuple(node.locators for node in tail)
+    if frame is not None and target[:len(frame)] == frame:
+        return tail[len(frame):], target  # Уже в этом фрейме или в его предке: выход на страницу не нужен
+    return [run[last_default]] + tail, target
+
+
+def _minimize_block(nodes: List[StepNode], frame: Frame, removed: Dict[str, int]) -> Tuple[List[StepNode], Frame]:
+    result: List[StepNode] = []
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        if isinstance(node, ConditionalNode):
+            then_steps, _ = _minimize_block(node.then_steps, frame, removed)
+            else_steps, _ = _minimize_block(node.else_steps, frame, removed)
+            if (node.then_steps or node.else_steps) and not then_steps and not else_steps:
+                # Все шаги обеих веток убраны: проверка условия ни на что не влияет, фрейм не изменился
+                i += 1
+                continue
+            result.append(ConditionalNode(node.condition, node.boolean_check, then_steps, else_steps))
+            frame = None  # Ветки могли оставить тест в разных фреймах
+            i += 1
+            continue
+
+        if _is_action(node, FRAME_ACTIONS):
+            end = i
+            while end < len(nodes) and _is_action(nodes[end], FRAME_ACTIONS):
+                end += 1
+            kept, frame = _minimize_frames(nodes[i:end], frame)
+            result.extend(kept)
+            if end - i > len(kept):
+                removed["frame"] = removed.get("frame", 0) + end - i - len(kept)
+            i = end
+            continue
+
+        following = nodes[i + 1] if i + 1 < len(nodes) else None
+        if _is_action(node, INPUT_ACTIONS) and _is_action(following, INPUT_ACTIONS) and following.locators == node.locators:
+            removed["input"] = removed.get("input", 0) + 1
+        elif _is_action(node, CLICK_COVERED_WAITS) and _is_action(following, CLICK_ACTIONS) and following.locators == node.locators:
+            removed["wait"] = removed.get("wait", 0) + 1
+        elif (
+                _is_action(node, CLICK_ACTIONS) and result and _is_action(result[-1], CLICK_ACTIONS)
+                and result[-1].method_call == node.method_call and result[-1].locators == node.locators
+                and node.recorded_at is not None and result[-1].recorded_at is not None
+                and abs(node.recorded_at - result[-1].recorded_at) < DUPLICATE_CLICK_WINDOW_MS
+        ):
+            removed["click"] = removed.get("click", 0) + 1
+        else:
+            result.append(node)
+        i += 1
+    return result, frame
+
+
+def _count_repeated_lookups(nodes: List[StepNode]) -> int:
+    """Сколько раз подряд идущие шаги ищут один и тот же элемент (клик по полю, затем ввод в него)."""
+    count = 0
+    previous = None
+    for node in nodes:
+        if isinstance(node, ConditionalNode):
+            count += _count_repeated_lookups(node.then_steps) + _count_repeated_lookups(node.else_steps)
+            previous = None
+        elif node.locators and node.method_call and node.action not in FRAME_ACTIONS:
+            if previous == node.locators:
+                count += 1
+            previous = node.locators
+    return count
+
+
+def _walk(nodes: List[StepNode]):
+    """Узлы-действия в порядке компиляции (условие блока, затем THEN, затем ELSE)."""
+    for node in nodes:
+        if isinstance(node, ConditionalNode):
+            if node.condition is not None:
+                yield node.condition
+            yield from _walk(node.then_steps)
+            yield from _walk(node.else_steps)
+        else:
+            yield node
+
+
+def minimize(compiled: CompiledTestCase) -> CompiledTestCase:
+    """Минимизированная копия тест-кейса. Результат кэшируется в compiled.minimized."""
+    if compiled.minimized is not None:
+        return compiled.minimized
+
+    removed: Dict[str, int] = {}
+    steps, _ = _minimize_block(compiled.steps, (), removed)
+
+    # Локаторы и методы POM собираются заново только из оставшихся шагов, в исходном порядке
+    entries = iter(compiled.locator_entries)
+    entry_by_node = {id(node): next(entries) for node in _walk(compiled.steps) if node.locators}
+    kept = list(_walk(steps))
+    result = CompiledTestCase(
+        name=compiled.name,
+        page_class_name=compiled.page_class_name,
+        steps=steps,
+        locator_entries=[entry_by_node[id(node)] for node in kept if node.locators],
+        method_definitions=[node.method_definition for node in kept if node.method_definition],
+        ddt_variables=compiled.ddt_variables,
+        removed_steps=removed,
+        repeated_lookups=_count_repeated_lookups(steps),
+    )
+    compiled.minimized = result
+    return result
@@ -0,0 +1,180 @@
+# app/step_naming.py
+"""
+Имена шагов Allure через LLM (Ollama) на сервере.
+
+Шаги приходят пачкой, одинаковые (действие, элемент, значение) именуются один раз.
+Имена, уже придуманные LLM, берутся из кэша: LRU в памяти перед таблицей step_names.
+Промахи уходят в LLM одним промптом на LLM_NAMING_BATCH_SIZE шагов с общим сроком LLM_TIMEOUT_SECONDS;
+если LLM недоступна, не уложилась в срок или ответила не по формату, используется шаблонное имя
+(то же, что строит расширение). Шаблонные имена не кэшируются, чтобы LLM могла назвать шаг позже.
+
+Для локальной проверки без Ollama: python tools/fake_ollama.py и OLLAMA_URL=http://127.0.0.1:11435
+"""
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import metrics, models
+from .cache import LRUCache
+from .core import config
+from .database import SessionLocal
+
+StepKey = Tuple[str, str, str]  # (действие, имя элемента, значение)
+
+MAX_STEP_NAME_LENGTH = 200
+
+
+def template_step_name(action: str, element: str, value: str) -> str:
+    """Шаблонное имя шага - та же логика, что fallback в generateAllureStepName расширения."""
+    if action == "wait":
+        return f"Ожидаем, пока элемент '{element}' станет невидимым"
+    if action == "click":
+        action_text = "Кликаем по элементу"
+    elif action == "input":
+        action_text = f"Вводим значение '{value}' в"
+    elif action == "assertVisible":
+        action_text = "Проверяем видимость элемента"
+    else:
+        action_text = f"Выполняем '{action}' на элементе"
+    return f"{action_text} '{element}'"
+
+
+def _clean_llm_name(name) -> Optional[str]:
+    """Имя попадает в @allure.step("...") как есть, поэтому кавычки убираются, как и в расширении."""
+    if not isinstance(name, str):
+        return None
+    name = name.strip().splitlines()[0] if name.strip() else ""
+    name = name.replace('"', "").replace("'", "").replace("`", "").replace("\\", "").strip()
+    return name[:MAX_STEP_NAME_LENGTH] or None
+
+
+def _cache_key(model: str, key: StepKey) -> str:
+    return hashlib.sha256(json.dumps([model, *key], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def build_prompt(keys: Sequence[StepKey]) -> str:
+    steps = [{"action": action, "element": element, "value": value} for action, element, value in keys]
+    return (
+        "Generate short, human-readable Allure step names in Russian for UI test steps.\n"
+        "Examples: \"Кликаем по кнопке 'Войти'\", \"Вводим '{login}' в поле 'Имя пользователя'\". "
+        "Use placeholders like {variable_name} if the value is parameterized.\n"
+        f'Answer with JSON only: {{"names": [...]}} with exactly {len(steps)} strings, in the order of the steps.\n'
+        f"Steps: {json.dumps(steps, ensure_ascii=False)}"
+    )
+
+
+def request_llm_names(keys: Sequence[StepKey], timeout: float) -> List[Optional[str]]:
+    """Один запрос к Ollama на пачку шагов. Для шагов без пригодного ответа возвращает None."""
+    try:
+        response = requests.post(
+            f"{config.OLLAMA_URL.rstrip('/')}/api/generate",
+            json={"model": config.LLM_MODEL, "prompt": build_prompt(keys), "stream": False, "format": "json"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        names = json.loads(response.json()["response"])["names"]
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        print(f"LLM step naming failed: {e.__class__.__name__}: {e}")
+        return [None] * len(keys)
+    if not isinstance(names, list) or len(names) != len(keys):
+        print(f"LLM step naming returned {len(names) if isinstance(names, list) else 'no'} names for {len(keys)} steps")
+        return [None] * len(keys)
+    return [_clean_llm_name(name) for name in names]
+
+
+class StepNameStore:
+    """Постоянный кэш имен: LRU в памяти процесса перед таблицей step_names."""
+
+    def __init__(self, max_entries: int):
+        self._memory = LRUCache(max_entries=max_entries, sizeof=lambda _: 1)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found = {}
+        missing = []
+        for key in keys:
+            name = self._memory.get(key)
+            if name is None:
+                missing.append(key)
+            else:
+                found[key] = name
+        if missing:
+            db = SessionLocal()
+            try:
+                rows = db.query(models.StepName).filter(models.StepName.key.in_(missing)).all()
+            except SQLAlchemyError as e:
+                # Без постоянного кэша шаги просто именуются заново (LLM или шаблоном)
+                print(f"Step name cache read failed: {e.__class__.__name__}: {e}")
+                rows = []
+            finally:
+                db.close()
+            for row in rows:
+                found[row.key] = row.name
+                self._memory.set(row.key, row.name)
+        return found
+
+    def put_many(self, model: str, names: Dict[str, str]) -> None:
+        if not names:
+            return
+        db = SessionLocal()
+        try:
+            for key, name in names.items():
+                db.merge(models.StepName(key=key, model=model, name=name))
+            db.commit()
+        except SQLAlchemyError as e:
+            # Например, параллельный запрос уже вставил тот же ключ: имена все равно возвращаются и кэшируются в памяти
+            db.rollback()
+            print(f"Step name cache write failed: {e.__class__.__name__}: {e}")
+        finally:
+            db.close()
+        for key, name in names.items():
+            self._memory.set(key, name)
+
+
+step_name_store = StepNameStore(config.STEP_NAME_CACHE_MAX_ENTRIES)
+
+
+def name_steps(keys: Sequence[StepKey]) -> Dict:
+    """
+    Имена для шагов в порядке keys. Синхронная: ходит в БД и в LLM, вызывается из пула потоков.
+    Возвращает словарь в формате StepNamingResponse.
+    """
+    unique = list(dict.fromkeys(keys))
+    names: Dict[StepKey, str] = {}
+    stats = {"cached": 0, "generated": 0, "fallback": 0}
+
+    misses = unique
+    if config.OLLAMA_URL:
+        model = config.LLM_MODEL
+        cache_keys = {key: _cache_key(model, key) for key in unique}
+        cached = step_name_store.get_many(list(cache_keys.values()))
+        misses = []
+        for key in unique:
+            if cache_keys[key] in cached:
+                names[key] = cached[cache_keys[key]]
+                stats["cached"] += 1
+            else:
+                misses.append(key)
+
+        generated: Dict[str, str] = {}
+        deadline = time.monotonic() + config.LLM_TIMEOUT_SECONDS
+        with metrics.stage_timer("llm"):
+            for start in range(0, len(misses), config.LLM_NAMING_BATCH_SIZE):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break  # Срок вышел - остальные шаги получат шаблонные имена
+                batch = misses[start:start + config.LLM_NAMING_BATCH_SIZE]
+                for key, name in zip(batch, request_llm_names(batch, remaining)):
+                    if name:
+                        names[key] = generated[cache_keys[key]] = name
+                        stats["generated"] += 1
+        step_name_store.put_many(model, generated)
+
+    for key in misses:
+        if key not in names:
+            names[key] = template_step_name(*key)
+            stats["fallback"] += 1
+    return {"names": [names[key] for key in keys], **stats}
@@ -0,0 +1,82 @@
+# app/step_prefix.py
+"""
+Общие первые шаги тест-кейсов страницы (логин, переход в раздел) для выноса в pytest-фикстуры.
+
+По вызовам верхнего уровня всех тест-кейсов страницы строится префиксное дерево. Каждому тест-кейсу
+достается самый длинный префикс, который он делит хотя бы с одним другим тест-кейсом; одинаковые
+префиксы становятся одной фикстурой. В префикс попадают только вызовы без аргументов и без присваивания
+(page.click_login()): вызовы с переменными окружения и DDT зависят от тела теста и остаются в нем.
+Префикс заканчивается перед первым входом во фрейм: снимок состояния браузера восстанавливается на странице.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .step_ir import ActionNode, CompiledTestCase
+
+# Префикс короче этого числа шагов в фикстуру не выносится
+SHARED_PREFIX_MIN_STEPS = 2
+
+_PLAIN_CALL_RE = re.compile(r"page\.[A-Za-z_][A-Za-z0-9_]*\(\)")
+
+
+@dataclass
+class SharedPrefix:
+    """Общие первые шаги нескольких тест-кейсов и фикстура, которая их выполняет."""
+    fixture_name: str
+    calls: List[str]
+    test_case_names: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _TrieNode:
+    children: Dict[str, "_TrieNode"] = field(default_factory=dict)
+    count: int = 0  # Сколько тест-кейсов проходит через узел
+    prefix: Optional[SharedPrefix] = None
+
+
+def _leading_calls(compiled: CompiledTestCase) -> List[str]:
+    calls = []
+    for node in compiled.steps:
+        if not isinstance(node, ActionNode) or not node.method_call or not _PLAIN_CALL_RE.fullmatch(node.method_call):
+            break
+        if node.action == "switch_to_iframe":
+            break
+        calls.append(node.method_call)
+    return calls
+
+
+def shared_prefixes(
+        compiled_test_cases: List[CompiledTestCase], fixture_name_base: str, min_steps: int = SHARED_PREFIX_MIN_STEPS
+) -> Tuple[List[SharedPrefix], List[Optional[SharedPrefix]]]:
+    """
+    Возвращает (фикстуры в порядке первого использования, префикс каждого тест-кейса или None).
+    Префикс i-го тест-кейса - это первые len(prefix.calls) узлов его compiled.steps.
+    """
+    leading = [_leading_calls(compiled) for compiled in compiled_test_cases]
+    root = _TrieNode()
+    for calls in leading:
+        node = root
+        for call in calls:
+            node = node.children.setdefault(call, _TrieNode())
+            node.count += 1
+
+    prefixes: List[SharedPrefix] = []
+    assigned: List[Optional[SharedPrefix]] = []
+    for compiled, calls in zip(compiled_test_cases, leading):
+        node, deepest, length = root, None, 0
+        for depth, call in enumerate(calls, 1):
+            node = node.children[call]
+            if node.count < 2:
+                break
+            if depth >= min_steps:
+                deepest, length = node, depth
+        if deepest is None:
+            assigned.append(None)
+            continue
+        if deepest.prefix is None:
+            deepest.prefix = SharedPrefix(f"{fixture_name_base}_prefix_{len(prefixes) + 1}", calls[:length])
+            prefixes.append(deepest.prefix)
+        deepest.prefix.test_case_names.append(compiled.name)
+        assigned.append(deepest.prefix)
+    return prefixes, assigned
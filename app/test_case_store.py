@@ -0,0 +1,97 @@
+# app/test_case_store.py
+"""
+Хранилище тест-кейсов для дельта-синхронизации /generate.
+
+Расширение присылает манифест страницы - пары (id, hash) всех ее тест-кейсов - и полностью
+только те тест-кейсы, которых, по его данным, на сервере нет. hash для сервера непрозрачен:
+это версия тест-кейса, которую вычисляет клиент. Если чего-то из манифеста в хранилище
+не оказалось (вытеснено, перезапуск сервера, другой воркер), /generate отвечает 409
+со списком id, и клиент досылает их. Тест-кейс больше квоты лицензии не сохраняется:
+его id возвращается в ответе (notStoredTestCases), и клиент присылает его целиком каждый раз.
+
+Хранилище живет в памяти процесса: LRU лицензий, у каждой - свой LRU тест-кейсов с TTL
+и квотой по числу и суммарному размеру. Вместе с тест-кейсом хранится его IR (step_ir): при правке
+одного тест-кейса страницы остальные при повторной генерации заново не компилируются.
+"""
+import json
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from . import schemas
+from .cache import LRUCache
+from .core import config
+from .step_ir import CompiledTestCase, compile_test_case
+
+
+class TestCaseStore:
+    __test__ = False  # Не тестовый класс для pytest, несмотря на имя
+
+    def __init__(self, max_licenses: int, max_cases_per_license: int, max_bytes_per_license: int, ttl_seconds: float):
+        self.max_cases_per_license = max_cases_per_license
+        self.max_bytes_per_license = max_bytes_per_license
+        self.ttl_seconds = ttl_seconds
+        self._licenses = LRUCache(max_entries=max_licenses, sizeof=lambda _: 1)
+
+    def _bucket(self, license_id: Hashable, create: bool) -> Optional[LRUCache]:
+        bucket = self._licenses.get(license_id)
+        if bucket is None and create:
+            bucket = LRUCache(
+                max_entries=self.max_cases_per_license,
+                max_bytes=self.max_bytes_per_license,
+                ttl_seconds=self.ttl_seconds,
+            )
+            self._licenses.set(license_id, bucket)
+        return bucket
+
+    def put(self, license_id: Hashable, test_case_id: str, content_hash: str, test_case: Dict) -> Tuple[CompiledTestCase, bool]:
+        """
+        Сохраняет тест-кейс вместе с его IR. Возвращает (IR, сохранен ли): тест-кейс больше квоты
+        лицензии не сохраняется. Синхронный и CPU-bound (размер, компиляция) - вызывать вне event loop.
+        """
+        size = len(json.dumps(test_case, ensure_ascii=False, separators=(",", ":"), default=str))
+        compiled = compile_test_case(test_case)
+        stored = self._bucket(license_id, create=True).set(test_case_id, (content_hash, test_case, compiled), size=size)
+        return compiled, stored
+
+    def get(self, license_id: Hashable, test_case_id: str, content_hash: str) -> Optional[Tuple[Dict, CompiledTestCase]]:
+        """(тест-кейс, IR) при совпадении hash, иначе None."""
+        bucket = self._bucket(license_id, create=False)
+        entry = bucket.get(test_case_id) if bucket is not None else None
+        if entry is None or entry[0] != content_hash:
+            return None
+        return entry[1], entry[2]
+
+    def resolve(
+            self, license_id: Hashable, manifest: Sequence[schemas.TestCaseRef], uploaded: Dict[str, Dict]
+    ) -> Tuple[List[Dict], List[CompiledTestCase], List[str], List[str]]:
+        """
+        Собирает тест-кейсы страницы в порядке манифеста: присланные в запросе сохраняются и берутся как есть,
+        остальные - из хранилища при совпадении hash.
+        Возвращает (тест-кейсы, их IR, id недостающих, id присланных, но не сохраненных).
+        """
+        test_cases, compiled, missing, not_stored = [], [], [], []
+        for ref in manifest:
+            test_case = uploaded.get(ref.id)
+            if test_case is not None:
+                test_case_ir, stored = self.put(license_id, ref.id, ref.hash, test_case)
+                entry = test_case, test_case_ir
+                if not stored:
+                    not_stored.append(ref.id)
+            else:
+                entry = self.get(license_id, ref.id, ref.hash)
+            if entry is None:
+                missing.append(ref.id)
+            else:
+                test_cases.append(entry[0])
+                compiled.append(entry[1])
+        return test_cases, compiled, missing, not_stored
+
+    def stats(self) -> Dict:
+        return {"licenses": len(self._licenses)}
+
+
+test_case_store = TestCaseStore(
+    max_licenses=config.TEST_CASE_STORE_MAX_LICENSES,
+    max_cases_per_license=config.TEST_CASE_STORE_MAX_CASES_PER_LICENSE,
+    max_bytes_per_license=config.TEST_CASE_STORE_MAX_BYTES_PER_LICENSE,
+    ttl_seconds=config.TEST_CASE_STORE_TTL_SECONDS,
+)
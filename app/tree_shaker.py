@@ -0,0 +1,181 @@
+# app/tree_shaker.py
+"""
+Удаление неиспользуемого кода из шаблона модуля (BasePage).
+
+Модуль разбирается через ast на фрагменты: инструкции верхнего уровня и методы выбранных классов.
+Каждый фрагмент - это исходные строки вместе с комментариями перед ним, поэтому оставшийся код
+выглядит так же, как в шаблоне. Из корней (имен, которые использует сгенерированный код)
+по ссылкам на имена и атрибуты собирается замыкание; импорты урезаются до используемых имен.
+"""
+import ast
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def code_identifiers(code: str) -> Set[str]:
+    """Все идентификаторы в тексте кода (с запасом: включая строки и комментарии)."""
+    return set(_IDENTIFIER_RE.findall(code))
+
+
+@dataclass
+class _Fragment:
+    text: str
+    node: ast.stmt
+    defines: Set[str]
+    references: Set[str]
+    class_name: Optional[str] = None   # для методов и прочих инструкций тела класса
+    method_name: Optional[str] = None
+    kept: bool = False
+    members: List["_Fragment"] = field(default_factory=list)  # тело разбираемого по методам класса
+
+
+def _references(nodes: Iterable[ast.AST]) -> Set[str]:
+    names = set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                names.add(child.id)
+            elif isinstance(child, ast.Attribute):
+                names.add(child.attr)
+    return names
+
+
+def _defined_names(node: ast.stmt) -> Set[str]:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {node.name}
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return {alias.asname or alias.name.split(".")[0] for alias in node.names}
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+            names.add(child.id)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            names |= _defined_names(child)
+    return names
+
+
+def _first_line(node: ast.stmt) -> int:
+    decorators = getattr(node, "decorator_list", None)
+    return min([node.lineno] + [d.lineno for d in decorators or []])
+
+
+def _split(body: List[ast.stmt], start: int) -> List[Tuple[ast.stmt, int, int]]:
+    """Режет строки на куски (инструкция, начало, конец): каждой инструкции достаются и комментарии/пустые строки перед ней."""
+    chunks = []
+    for node in body:
+        chunks.append((node, start, node.end_lineno))
+        start = node.end_lineno
+    return chunks
+
+
+def _render_import(node: ast.stmt, text: str, used: Set[str]) -> str:
+    kept = [alias for alias in node.names if (alias.asname or alias.name.split(".")[0]) in used]
+    if len(kept) == len(node.names):
+        return text
+    if not kept:
+        return ""
+    leading = text[:len(text) - len(text.lstrip("\n"))]
+    names = [f"{alias.name} as {alias.asname}" if alias.asname else alias.name for alias in kept]
+    if isinstance(node, ast.Import):
+        return f"{leading}import {', '.join(names)}\n"
+    module = "." * node.level + (node.module or "")
+    if "(" in text:
+        return f"{leading}from {module} import (\n" + ",\n".join(f"    {name}" for name in names) + "\n)\n"
+    return f"{leading}from {module} import {', '.join(names)}\n"
+
+
+def shake_module(source: str, roots: Set[str], split_classes: Iterable[str]) -> str:
+    """
+    Возвращает source только с фрагментами, достижимыми из roots.
+    Классы split_classes разбираются по методам: метод остается, если на его имя есть ссылка
+    (self.x, super().x, obj.x); у оставшегося класса всегда остается __init__.
+    Инструкции-выражения верхнего уровня (logging.basicConfig, atexit.register...) остаются всегда.
+    """
+    split_classes = set(split_classes)
+    tree = ast.parse(source)
+    lines = source.splitlines(keepends=True)
+    if not tree.body:
+        return source
+
+    preamble = "".join(lines[:_first_line(tree.body[0]) - 1])
+    fragments: List[_Fragment] = []
+    for node, start, end in _split(tree.body, _first_line(tree.body[0]) - 1):
+        if isinstance(node, ast.ClassDef) and node.name in split_classes:
+            # Заголовок класса - от комментариев перед ним до первой инструкции тела
+            body_start = _first_line(node.body[0]) - 1
+            header = _Fragment(
+                text="".join(lines[start:body_start]), node=node, defines={node.name},
+                references=_references(node.bases + node.decorator_list),
+            )
+            for member, member_start, member_end in _split(node.body, body_start):
+                is_method = isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef))
+                header.members.append(_Fragment(
+                    text="".join(lines[member_start:member_end]), node=member, defines=set(),
+                    references=_references([member]), class_name=node.name,
+                    method_name=member.name if is_method else None,
+                ))
+            fragments.append(header)
+        else:
+            fragments.append(_Fragment(
+                text="".join(lines[start:end]), node=node, defines=_defined_names(node), references=_references([node]),
+            ))
+
+    by_name: Dict[str, List[_Fragment]] = {}
+    methods_by_name: Dict[str, List[_Fragment]] = {}
+    for fragment in fragments:
+        for name in fragment.defines:
+            by_name.setdefault(name, []).append(fragment)
+        for member in fragment.members:
+            if member.method_name:
+                methods_by_name.setdefault(member.method_name, []).append(member)
+
+    pending: List[_Fragment] = []
+
+    def keep(fragment: _Fragment) -> None:
+        if not fragment.kept:
+            fragment.kept = True
+            pending.append(fragment)
+
+    def keep_name(name: str) -> None:
+        for fragment in by_name.get(name, ()):
+            keep(fragment)
+        for member in methods_by_name.get(name, ()):
+            keep(member)
+            keep_name(member.class_name)
+
+    for name in roots:
+        keep_name(name)
+    for fragment in fragments:
+        if isinstance(fragment.node, ast.Expr) and not fragment.members:
+            keep(fragment)
+
+    while pending:
+        fragment = pending.pop()
+        if fragment.members:
+            # У класса остаются __init__ и все инструкции тела, кроме методов
+            for member in fragment.members:
+                if member.method_name in (None, "__init__"):
+                    keep(member)
+        for name in fragment.references:
+            keep_name(name)
+
+    used = set()
+    for fragment in fragments:
+        if fragment.kept and not isinstance(fragment.node, (ast.Import, ast.ImportFrom)):
+            used |= fragment.references
+            for member in fragment.members:
+                if member.kept:
+                    used |= member.references
+
+    output = [preamble]
+    for fragment in fragments:
+        if isinstance(fragment.node, (ast.Import, ast.ImportFrom)):
+            output.append(_render_import(fragment.node, fragment.text, used))
+        elif fragment.kept:
+            output.append(fragment.text)
+            output.extend(member.text for member in fragment.members if member.kept)
+    output.append("".join(lines[tree.body[-1].end_lineno:]))
+    return "".join(output)
@@ -0,0 +1,151 @@
+# app/wire.py
+"""
+Декодирование тела запросов: распаковка gzip/deflate/zstd (Content-Encoding)
+и разбор JSON или MessagePack (Content-Type) сразу в Pydantic-модель.
+"""
+import hashlib
+import io
+import re
+import zlib
+from typing import Optional, Type, TypeVar
+
+from fastapi import HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from . import metrics, schemas
+from .core import config
+from .step_ir import count_steps
+
+try:
+    import msgpack
+except ImportError:  # Есть в requirements.txt; без нее принимается только JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # Есть в requirements.txt; без нее zstd-тела отклоняются (415)
+    zstandard = None
+
+_DECOMPRESS_ERRORS = (zlib.error, ValueError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+MSGPACK_CONTENT_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="Request body is too large")
+
+
+def decompress_body(body: bytes, content_encoding: Optional[str], max_bytes: int) -> bytes:
+    """Распаковывает тело по Content-Encoding, не давая результату превысить max_bytes."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return body
+    try:
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            wbits = 16 + zlib.MAX_WBITS if encoding != "deflate" else zlib.MAX_WBITS
+            data = zlib.decompressobj(wbits).decompress(body, max_bytes + 1)
+        elif encoding == "zstd" and zstandard is not None:
+            data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)).read(max_bytes + 1)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported Content-Encoding: {encoding}",
+            )
+    except _DECOMPRESS_ERRORS as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed {encoding} body: {e}")
+    if len(data) > max_bytes:
+        raise _too_large()
+    return data
+
+
+def parse_body(body: bytes, content_type: Optional[str], model: Type[ModelT]) -> ModelT:
+    """
+    Разбирает тело сразу в модель. JSON валидируется pydantic-core напрямую из байтов,
+    без промежуточного json.loads; MessagePack распаковывается и валидируется.
+    """
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    try:
+        if media_type in MSGPACK_CONTENT_TYPES:
+            if msgpack is None:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail="MessagePack is not available on this server",
+                )
+            return model.model_validate(msgpack.unpackb(body, raw=False))
+        if media_type == "application/json" or media_type.endswith("+json"):
+            return model.model_validate_json(body)
+    except ValidationError as e:
+        # Тот же формат 422, что FastAPI отдает для обычных JSON-тел
+        raise RequestValidationError(e.errors(include_url=False, include_input=False))
+    except ValueError as e:  # Ошибки разбора msgpack - подклассы ValueError
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed body: {e}")
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Unsupported Content-Type: {media_type}")
+
+
+async def read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """Читает тело потоком и обрывает чтение, как только превышен лимит."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _too_large()
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large()
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+_CACHE_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def body_digest(body: bytes, previous_etag: Optional[str] = None) -> str:
+    """
+    SHA-256 распакованного тела запроса /generate - отпечаток его содержимого для ключа кэша.
+    previousEtag из тела вырезается: при том же содержимом он меняется от генерации к генерации.
+    Синхронная: для больших тел вызывать вне event loop.
+    """
+    previous_key = (previous_etag or "").removeprefix("W/").strip('"')
+    if _CACHE_KEY_RE.fullmatch(previous_key):
+        body = body.replace(previous_key.encode("ascii"), b"")
+    return hashlib.sha256(body).hexdigest()
+
+
+async def _read_decoded_body(request: Request) -> bytes:
+    with metrics.stage_timer("receive"):
+        body = await read_limited_body(request, config.MAX_REQUEST_BODY_BYTES)
+    with metrics.stage_timer("decode"):
+        return decompress_body(body, request.headers.get("content-encoding"), config.MAX_REQUEST_BODY_BYTES)
+
+
+async def read_model(request: Request, model: Type[ModelT]) -> ModelT:
+    body = await _read_decoded_body(request)
+    with metrics.stage_timer("validate"):
+        return parse_body(body, request.headers.get("content-type"), model)
+
+
+async def read_generation_request(request: Request) -> schemas.GenerationRequest:
+    """
+    Зависимость FastAPI для /generate: тело в JSON или MessagePack, опционально сжатое.
+    Распакованное тело остается в request.state.body для body_digest.
+    """
+    body = await _read_decoded_body(request)
+    with metrics.stage_timer("validate"):
+        generation_request = parse_body(body, request.headers.get("content-type"), schemas.GenerationRequest)
+    request.state.body = body
+    metrics.REQUEST_STEPS.observe(
+        count_steps(generation_request.activeTestCase.recordedSteps), metrics.route_label(request.scope)
+    )
+    return generation_request
+
+
+async def read_collection_request(request: Request) -> schemas.CollectionGenerationRequest:
+    """То же для запросов уровня коллекции (/generate/jobs, /export)."""
+    collection_request = await read_model(request, schemas.CollectionGenerationRequest)
+    metrics.REQUEST_STEPS.observe(
+        sum(count_steps(tc.recordedSteps) for tc in collection_request.testCases), metrics.route_label(request.scope)
+    )
+    return collection_request
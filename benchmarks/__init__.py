@@ -0,0 +1 @@
+"""Микробенчмарки генератора кода. Запуск: python -m benchmarks --help"""
@@ -0,0 +1,184 @@
+# benchmarks/__main__.py
+"""
+Микробенчмарки генератора по стадиям: декодирование JSON, валидация GenerationRequest,
+model_dump / to_generator_dict, компиляция IR, _generate_element_name и generate_full_code
+(в том числе с готовым IR тест-кейсов страницы, как при /generate с testCaseManifest).
+
+    python -m benchmarks                      # прогон и сравнение с baseline
+    python -m benchmarks --save-baseline      # сохранить текущие результаты как baseline
+    python -m benchmarks -s small_edit -r 10  # отдельный сценарий
+
+Время - медиана по повторам, память - пик tracemalloc в отдельном прогоне стадии.
+Если медиана стадии хуже baseline больше чем на --threshold, процесс завершается с кодом 1.
+Нагрузочный прогон HTTP API с воркерами uvicorn - python -m benchmarks.load.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app import schemas
+from app.code_generator import GENERATOR_VERSION, generate_full_code
+from app.step_ir import _clean_element_name, _generate_element_name, compile_test_case
+
+from .synthetic import SCENARIOS, make_generation_request
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# Разница меньше этой величины считается шумом, даже если в процентах она велика
+MIN_REGRESSION_SECONDS = 0.0005
+
+
+def _iter_step_data(steps: List[Dict]):
+    for step in steps:
+        if step.get("type") == "conditional":
+            yield from _iter_step_data([step["condition"]])
+            yield from _iter_step_data(step["then_steps"])
+            yield from _iter_step_data(step["else_steps"])
+        else:
+            yield step.get("data")
+
+
+def _stages(payload: bytes) -> Dict[str, Callable[[], object]]:
+    """Каждая стадия получает уже готовый результат предыдущей, чтобы мерить ее изолированно."""
+    raw = json.loads(payload)
+    request = schemas.GenerationRequest.model_validate_json(payload)
+    active = request.activeTestCase.model_dump()
+    all_cases = [tc.model_dump() for tc in request.allTestCasesForPage]
+    step_data = [data for tc in all_cases for data in _iter_step_data(tc["recordedSteps"])]
+    compiled = [compile_test_case(tc) for tc in all_cases]
+
+    def element_names():
+        _clean_element_name.cache_clear()
+        for data in step_data:
+            _generate_element_name(data)
+
+    return {
+        "json_decode": lambda: json.loads(payload),
+        "pydantic_validate": lambda: schemas.GenerationRequest.model_validate_json(payload),
+        "model_dump": lambda: [tc.model_dump() for tc in request.allTestCasesForPage],
+        "to_generator_dict": lambda: [tc.to_generator_dict() for tc in request.allTestCasesForPage],
+        "element_names": element_names,
+        "compile_ir": lambda: [compile_test_case(tc) for tc in all_cases],
+        "generate_full_code": lambda: generate_full_code(active, all_cases, raw["stateData"], raw["options"]),
+        # IR всех тест-кейсов уже лежит в test_case_store, активный - один из них
+        "generate_precompiled_ir": lambda: generate_full_code(
+            all_cases[0], all_cases, raw["stateData"], raw["options"], compiled_test_cases=compiled
+        ),
+    }
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # прогрев
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "peak_memory_bytes": peak,
+    }
+
+
+def run(scenario_names: List[str], repeat: int) -> Dict:
+    results = {}
+    for name in scenario_names:
+        payload = json.dumps(make_generation_request(**SCENARIOS[name])).encode("utf-8")
+        results[name] = {"payload_bytes": len(payload), "stages": {}}
+        for stage, fn in _stages(payload).items():
+            results[name]["stages"][stage] = _measure(fn, repeat)
+    return results
+
+
+def _print_results(results: Dict, baseline: Dict) -> None:
+    header = f"{'scenario':<22}{'stage':<20}{'median ms':>11}{'baseline ms':>13}{'change':>9}{'peak KiB':>11}"
+    print(header)
+    print("-" * len(header))
+    for name, scenario in results.items():
+        print(f"{name:<22}{'payload ' + format(scenario['payload_bytes'] / 1024, '.0f') + ' KiB':<20}")
+        for stage, stats in scenario["stages"].items():
+            base = baseline.get(name, {}).get("stages", {}).get(stage)
+            base_ms = f"{base['median_seconds'] * 1000:.2f}" if base else "-"
+            change = f"{(stats['median_seconds'] / base['median_seconds'] - 1) * 100:+.0f}%" if base and base["median_seconds"] else ""
+            print(
+                f"{'':<22}{stage:<20}{stats['median_seconds'] * 1000:>11.2f}{base_ms:>13}{change:>9}"
+                f"{stats['peak_memory_bytes'] / 1024:>11.0f}"
+            )
+
+
+def find_regressions(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for name, scenario in results.items():
+        for stage, stats in scenario["stages"].items():
+            base = baseline.get(name, {}).get("stages", {}).get(stage)
+            if not base:
+                continue
+            current, previous = stats["median_seconds"], base["median_seconds"]
+            if current > previous * (1 + threshold) and current - previous > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{name}/{stage}: {previous * 1000:.2f} ms -> {current * 1000:.2f} ms")
+    return regressions
+
+
+def _load_json(path: str) -> Dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path: str, data: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Микробенчмарки генератора кода.")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="Сценарий (можно несколько)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Число замеров на стадию")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Допустимое замедление относительно baseline (0.25 = 25%%)")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="Каталог для результатов и baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Записать результаты как новый baseline")
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.join(args.results_dir, "baseline.json")
+    baseline = _load_json(baseline_path).get("scenarios", {})
+    results = run(args.scenario or list(SCENARIOS), args.repeat)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "generator_version": GENERATOR_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scenarios": results,
+    }
+    _save_json(os.path.join(args.results_dir, "latest.json"), report)
+    _print_results(results, baseline)
+
+    if args.save_baseline:
+        _save_json(baseline_path, report)
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,447 @@
+# benchmarks/load.py
+"""
+Нагрузочный прогон HTTP API: сколько одновременных запросов /generate и /validate выдерживает
+один деплой app.main:app и как время запроса делится между стадиями сервера.
+
+    python -m benchmarks.load                               # все сценарии, 1 воркер uvicorn
+    python -m benchmarks.load -w 4 -c 32 -d 30 -s mixed     # 4 воркера, 32 соединения, 30 секунд
+    python -m benchmarks.load --save-baseline               # сохранить результаты как baseline
+    python -m benchmarks.load --url http://host:8000 --license-key KEY   # уже запущенный сервер
+
+Без --url сервер поднимается заново для каждого сценария (uvicorn --workers N) во временном
+каталоге: своя SQLite-база, свои ассеты, пустые кэши. Лицензии создаются через /dev/create-user-and-license
+и обмениваются на токены, как это делает расширение. Нагрузку дают --concurrency keep-alive соединений
+на asyncio (свой минимальный HTTP/1.1 клиент, без зависимостей); соединения распределены по --licenses
+лицензиям, чтобы не упираться в GENERATION_PER_LICENSE_LIMIT одной лицензии.
+
+Каждый запрос /generate по умолчанию уникален (меняется имя активного тест-кейса), поэтому меряется
+генерация, а не кэш; --cache-hits шлет одинаковые тела. Отчет: пропускная способность, p50/p95/p99
+и доля ошибок (статус не 2xx/304 или обрыв соединения) по сценарию и по типам запросов в нем,
+плюс среднее время стадий (license, receive, decode, validate, generate, serialize) из /metrics.
+Метрики живут в процессе воркера, поэтому при -w > 1 стадии - выборка с того воркера, что ответил на /metrics.
+Если p95 сценария хуже baseline больше чем на --threshold, процесс завершается с кодом 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.code_generator import GENERATOR_VERSION
+
+from .__main__ import RESULTS_DIR, _load_json, _save_json
+from .synthetic import SCENARIOS, make_generation_request
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_PREFIX = "/api/v1"
+
+# Сценарии нагрузки: имя -> [(запрос, сценарий тела из synthetic.SCENARIOS или None, вес)]
+LOAD_SCENARIOS = {
+    "validate": [("validate", None, 1)],
+    "small_edit": [("generate", "small_edit", 1)],
+    "screenshots": [("generate", "screenshots", 1)],
+    # Смесь от расширения: проверки лицензии при открытии панели, частые правки и изредка большая страница
+    "mixed": [("validate", None, 6), ("generate", "small_edit", 3), ("generate", "screenshots", 1)],
+}
+# Имя активного тест-кейса в теле synthetic - в него подставляется номер запроса
+ACTIVE_NAME_MARKER = b'"Scenario 0"'
+SERVER_START_TIMEOUT_SECONDS = 60
+_STAGE_LINE_RE = re.compile(r'^codegen_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+class HttpConnection:
+    """Keep-alive соединение HTTP/1.1: ровно то, что нужно для прогона (Content-Length и chunked ответы)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, headers: Dict[str, str] = None, body_parts: List[bytes] = ()) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=1024 * 1024)
+        length = sum(len(part) for part in body_parts)
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {length}"]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        try:
+            self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            self._writer.writelines(body_parts)
+            await self._writer.drain()
+            status, response_headers, body = await self._read_response()
+        except BaseException:
+            self.close()
+            raise
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, body
+
+    async def _read_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split(b" ", 2)[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            return status, headers, b"".join(chunks)
+        return status, headers, await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+# --- Сервер ---
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, work_dir: str, env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """Запускает uvicorn app.main:app в work_dir (там будут БД и ассеты) и ждет, пока он начнет отвечать."""
+    server_env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])), **env)
+    # Один ключ подписи на все воркеры: иначе токен, выданный одним воркером, отвергается другими
+    server_env.setdefault("SECRET_KEY", secrets.token_urlsafe(32))
+    # Таблицы создаются до старта: воркеры uvicorn иначе делают create_all наперегонки
+    subprocess.run(
+        [sys.executable, "-c", "from app import models; from app.database import Base, engine; Base.metadata.create_all(bind=engine)"],
+        cwd=work_dir, env=server_env, check=True,
+    )
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=work_dir, env=server_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"uvicorn did not start within {SERVER_START_TIMEOUT_SECONDS} s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _call_json(base_url: str, method: str, path: str, headers: Dict[str, str] = None) -> Dict:
+    url = urlsplit(base_url)
+    connection = HttpConnection(url.hostname, url.port or 80)
+    try:
+        status, body = await connection.request(method, API_PREFIX + path, headers)
+    finally:
+        connection.close()
+    if status != 200:
+        raise RuntimeError(f"{method} {path} -> {status}: {body[:200]!r}")
+    return json.loads(body)
+
+
+async def prepare_credentials(base_url: str, license_keys: List[str], licenses: int, use_tokens: bool) -> List[str]:
+    """Заголовки Authorization для соединений: новые dev-лицензии (если ключи не заданы), обмененные на токены."""
+    if not license_keys:
+        suffix = f"{os.getpid()}-{int(time.time())}"
+        license_keys = [
+            (await _call_json(base_url, "POST", f"/dev/create-user-and-license?email=load-{suffix}-{i}@example.com"))["license_key"]
+            for i in range(licenses)
+        ]
+    if not use_tokens:
+        return [f"Bearer {key}" for key in license_keys]
+    tokens = [await _call_json(base_url, "POST", "/token", {"Authorization": f"Bearer {key}"}) for key in license_keys]
+    return [f"Bearer {token['access_token']}" for token in tokens]
+
+
+async def scrape_stage_seconds(base_url: str) -> Dict[str, Dict[str, float]]:
+    """Среднее время стадий из /metrics ответившего воркера: stage -> {mean_seconds, count}."""
+    url = urlsplit(base_url)
+    connection = HttpConnection(url.hostname, url.port or 80)
+    try:
+        status, body = await connection.request("GET", "/metrics")
+    finally:
+        connection.close()
+    if status != 200:
+        return {}
+    totals: Dict[str, Dict[str, float]] = {}
+    for line in body.decode("utf-8").splitlines():
+        match = _STAGE_LINE_RE.match(line)
+        if match:
+            totals.setdefault(match.group(2), {})[match.group(1)] = float(match.group(3))
+    return {
+        stage: {"mean_seconds": values["sum"] / values["count"], "count": int(values["count"])}
+        for stage, values in totals.items() if values.get("count")
+    }
+
+
+# --- Нагрузка ---
+
+class RequestMix:
+    """Готовые тела запросов сценария и взвешенный выбор следующего запроса."""
+
+    def __init__(self, entries: List[Tuple[str, Optional[str], int]], cache_hits: bool):
+        self.cache_hits = cache_hits
+        self.kinds, self.weights, self._bodies = [], [], {}
+        for request, body_scenario, weight in entries:
+            kind = request if body_scenario is None else f"{request}:{body_scenario}"
+            if body_scenario is not None and body_scenario not in self._bodies:
+                payload = json.dumps(make_generation_request(**SCENARIOS[body_scenario])).encode("utf-8")
+                self._bodies[body_scenario] = payload.split(ACTIVE_NAME_MARKER)
+            self.kinds.append((kind, request, body_scenario))
+            self.weights.append(weight)
+        self._sequence = 0
+
+    def payload_bytes(self) -> Dict[str, int]:
+        return {name: sum(len(part) for part in parts) + len(ACTIVE_NAME_MARKER) * (len(parts) - 1) for name, parts in self._bodies.items()}
+
+    def next_request(self, rng: random.Random, authorization: str) -> Tuple[str, str, str, Dict[str, str], List[bytes]]:
+        kind, request, body_scenario = rng.choices(self.kinds, self.weights)[0]
+        headers = {"Authorization": authorization, "Accept-Encoding": "gzip"}
+        if request == "validate":
+            return kind, "GET", API_PREFIX + "/validate", headers, []
+        parts = self._bodies[body_scenario]
+        self._sequence += 1
+        name = ACTIVE_NAME_MARKER if self.cache_hits else f'"Scenario 0 #{self._sequence}"'.encode("utf-8")
+        body = [parts[0]]
+        for part in parts[1:]:
+            body.extend((name, part))
+        headers["Content-Type"] = "application/json"
+        return kind, "POST", API_PREFIX + "/generate", headers, body
+
+
+async def _connection_loop(
+        base_url: str, mix: RequestMix, authorization: str, seed: int, record_from: float, stop_at: float, samples: List
+) -> None:
+    url = urlsplit(base_url)
+    connection = HttpConnection(url.hostname, url.port or 80)
+    rng = random.Random(seed)
+    try:
+        while time.monotonic() < stop_at:
+            kind, method, path, headers, body = mix.next_request(rng, authorization)
+            started = time.monotonic()
+            try:
+                status, _ = await connection.request(method, path, headers, body)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                status = 0  # Обрыв соединения или нечитаемый ответ
+            finished = time.monotonic()
+            if started >= record_from:
+                samples.append((kind, status, finished - started, finished))
+    finally:
+        connection.close()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Tuple[str, int, float, float]], elapsed: float) -> Dict:
+    latencies = sorted(sample[2] for sample in samples)
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample[1])] = statuses.get(str(sample[1]), 0) + 1
+    errors = sum(count for status, count in statuses.items() if not (status.startswith("2") or status == "304"))
+    return {
+        "requests": len(samples),
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "p50_seconds": _percentile(latencies, 0.50),
+        "p95_seconds": _percentile(latencies, 0.95),
+        "p99_seconds": _percentile(latencies, 0.99),
+        "max_seconds": latencies[-1] if latencies else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+async def run_scenario(
+        base_url: str, mix: RequestMix, authorizations: List[str], concurrency: int, duration: float, warmup: float
+) -> Dict:
+    samples: List[Tuple[str, int, float, float]] = []
+    record_from = time.monotonic() + warmup
+    stop_at = record_from + duration
+    await asyncio.gather(*(
+        _connection_loop(base_url, mix, authorizations[i % len(authorizations)], i, record_from, stop_at, samples)
+        for i in range(concurrency)
+    ))
+    # Запросы, начатые до stop_at, дозавершаются: окно замера - до последнего ответа
+    elapsed = max((sample[3] for sample in samples), default=stop_at) - record_from
+    result = summarize(samples, elapsed)
+    kinds = sorted({sample[0] for sample in samples})
+    if len(kinds) > 1:
+        result["by_request"] = {kind: summarize([s for s in samples if s[0] == kind], elapsed) for kind in kinds}
+    result["server_stages"] = await scrape_stage_seconds(base_url)
+    return result
+
+
+def run(args) -> Dict:
+    results = {}
+    for name in args.scenario or list(LOAD_SCENARIOS):
+        mix = RequestMix(LOAD_SCENARIOS[name], cache_hits=args.cache_hits)
+        process = None
+        with tempfile.TemporaryDirectory(prefix="codegen-load-") as work_dir:
+            try:
+                base_url = args.url
+                if base_url is None:
+                    process, base_url = start_server(args.workers, work_dir, dict(env.split("=", 1) for env in args.env))
+                authorizations = asyncio.run(
+                    prepare_credentials(base_url, args.license_key if args.url else [], args.licenses, use_tokens=not args.raw_keys)
+                )
+                print(f"{name}: {args.concurrency} connections, {args.duration:.0f} s", flush=True)
+                result = asyncio.run(run_scenario(base_url, mix, authorizations, args.concurrency, args.duration, args.warmup))
+            finally:
+                if process is not None:
+                    stop_server(process)
+        result["payload_bytes"] = mix.payload_bytes()
+        results[name] = result
+    return results
+
+
+def _print_results(results: Dict, baseline: Dict) -> None:
+    header = (
+        f"{'scenario':<30}{'req/s':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'base p95':>10}{'change':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, scenario in results.items():
+        base = baseline.get(name)
+        rows = [(name, scenario, base)]
+        rows.extend(
+            (f"  {kind}", stats, (base or {}).get("by_request", {}).get(kind))
+            for kind, stats in scenario.get("by_request", {}).items()
+        )
+        for label, stats, base_stats in rows:
+            base_p95 = f"{base_stats['p95_seconds'] * 1000:.1f}" if base_stats else "-"
+            change = (
+                f"{(stats['p95_seconds'] / base_stats['p95_seconds'] - 1) * 100:+.0f}%"
+                if base_stats and base_stats["p95_seconds"] else ""
+            )
+            print(
+                f"{label:<30}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>8.1%}{stats['p50_seconds'] * 1000:>10.1f}"
+                f"{stats['p95_seconds'] * 1000:>10.1f}{stats['p99_seconds'] * 1000:>10.1f}{base_p95:>10}{change:>9}"
+            )
+        if scenario["server_stages"]:
+            stages = ", ".join(
+                f"{stage} {stats['mean_seconds'] * 1000:.2f}" for stage, stats in sorted(scenario["server_stages"].items())
+            )
+            print(f"{'':<4}server stages, mean ms: {stages}")
+        failed = {status: count for status, count in scenario["statuses"].items() if not (status.startswith("2") or status == "304")}
+        if failed:
+            print(f"{'':<4}failed statuses (0 = connection error): {failed}")
+
+
+def find_regressions(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for name, scenario in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        current, previous = scenario["p95_seconds"], base["p95_seconds"]
+        if previous and current > previous * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous * 1000:.1f} ms -> {current * 1000:.1f} ms")
+        if scenario["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: errors {base['error_rate']:.1%} -> {scenario['error_rate']:.1%}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="Нагрузочный прогон /generate и /validate.")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(LOAD_SCENARIOS), help="Сценарий (можно несколько)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Число воркеров uvicorn")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Число одновременных соединений")
+    parser.add_argument("-d", "--duration", type=float, default=15, help="Длительность замера сценария, секунд")
+    parser.add_argument("--warmup", type=float, default=3, help="Прогрев перед замером, секунд (в отчет не входит)")
+    parser.add_argument("--licenses", type=int, default=8, help="Сколько dev-лицензий создать для соединений")
+    parser.add_argument("--raw-keys", action="store_true", help="Слать лицензионные ключи вместо токенов (проверка по кэшу и БД)")
+    parser.add_argument("--cache-hits", action="store_true", help="Одинаковые тела /generate: мерить кэш генерации")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Переменная окружения сервера (GENERATION_EXECUTOR=process и т.п.)")
+    parser.add_argument("--url", help="Нагружать уже запущенный сервер вместо локального")
+    parser.add_argument("--license-key", action="append", default=[], help="Ключ лицензии для --url (можно несколько)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Допустимый рост p95 относительно baseline (0.5 = 50%%)")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="Каталог для результатов и baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Записать результаты как новый baseline")
+    args = parser.parse_args(argv)
+    if args.url and not args.license_key:
+        parser.error("--url requires --license-key")
+
+    baseline_path = os.path.join(args.results_dir, "load-baseline.json")
+    baseline = _load_json(baseline_path).get("scenarios", {})
+    results = run(args)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "generator_version": GENERATOR_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "workers": None if args.url else args.workers,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "licenses": len(args.license_key) or args.licenses,
+            "tokens": not args.raw_keys,
+            "cache_hits": args.cache_hits,
+            "env": args.env,
+        },
+        "scenarios": results,
+    }
+    _save_json(os.path.join(args.results_dir, "load-latest.json"), report)
+    _print_results(results, baseline)
+
+    if args.save_baseline:
+        _save_json(baseline_path, report)
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# benchmarks/synthetic.py
+"""
+Генератор синтетических записей, похожих на то, что присылает расширение:
+шаги с селекторами, локаторами, сгенерированным кодом, HTML-контекстом и
+base64-скриншотами, вложенные IF/ELSE блоки, DDT- и environment-переменные.
+"""
+import base64
+import random
+from typing import Dict, List, Optional
+
+_ACTIONS = ["click", "input", "hover", "double_click", "select", "getText", "assert", "wait"]
+_ASSERTS = ["assertVisible", "assertNotVisible", "assertTextEquals", "assertIsEnabled"]
+_WORDS = ["login", "password", "submit", "search", "user name", "email", "Далее", "menu", "profile", "cart"]
+
+
+class SyntheticRecording:
+    """Детерминированный (по seed) генератор шагов и тест-кейсов."""
+
+    def __init__(self, seed: int = 0, screenshot_bytes: int = 0, html_context_chars: int = 2000):
+        self.rng = random.Random(seed)
+        self.screenshot_bytes = screenshot_bytes
+        self.html_context_chars = html_context_chars
+        self._counter = 0
+        self._screenshot_cache: Dict[int, str] = {}
+
+    def _screenshot(self) -> Optional[str]:
+        if not self.screenshot_bytes:
+            return None
+        # Несколько разных "скриншотов", чтобы не все шаги ссылались на одну строку
+        variant = self.rng.randrange(8)
+        if variant not in self._screenshot_cache:
+            raw = random.Random(variant).randbytes(self.screenshot_bytes)
+            self._screenshot_cache[variant] = "data:image/png;base64," + base64.b64encode(raw).decode("ascii")
+        return self._screenshot_cache[variant]
+
+    def step(self, step_type: Optional[str] = None, variable_name: Optional[str] = None) -> Dict:
+        self._counter += 1
+        rng = self.rng
+        step_type = step_type or rng.choice(_ACTIONS)
+        sub_type = rng.choice(_ASSERTS) if step_type == "assert" else None
+        word = rng.choice(_WORDS)
+        element_id = f"{word.replace(' ', '-')}-{self._counter % 97}"
+        element_name = element_id.replace("-", "_")
+        locator_var = f"self.{element_name}_locators"
+        method_name = f"{sub_type or step_type}_{element_name}"
+        value = f"value {self._counter}" if step_type == "input" else None
+
+        body = {
+            "click": f"self.do_click_with_healing({locator_var})",
+            "input": f'self.do_clear_and_send_keys_with_healing({locator_var}, "{value}")',
+            "getText": f"return self.get_text_with_healing({locator_var})",
+        }.get(step_type, f"assert self.is_visible_with_healing({locator_var})")
+        step = {
+            "id": 1712000000000 + self._counter + rng.random(),
+            "type": step_type,
+            "subType": sub_type,
+            "data": {
+                "selectors": {
+                    "id": element_id,
+                    "name": word,
+                    "xpathText": f'//button[.="{word}"]',
+                    "fullXpath": f"./div[{self._counter % 7 + 1}]/form[1]/button[{self._counter % 3 + 1}]",
+                },
+                "tag": rng.choice(["button", "input", "a", "div"]),
+                "text": word.title(),
+                "value": value,
+                "isEnabled": True,
+                "isVisible": True,
+                "attributes": {"href": None, "placeholder": word, "class": "btn btn-primary", "title": "", "aria-label": word},
+                "dataAttributes": {"data-testid": element_id},
+                "iframeInfo": None,
+                "htmlContext": ("<div class='row'>" * 200)[: self.html_context_chars],
+                "targetOuterHtml": f'<button id="{element_id}" class="btn btn-primary">{word}</button>',
+                "rect": {"x": 10, "y": 20, "width": 120, "height": 32, "top": 20, "left": 10, "right": 130, "bottom": 52},
+            },
+            "screenshot": self._screenshot(),
+            "variableName": variable_name,
+            "variableForValue": None,
+            "locators": [f"(By.ID, '{element_id}')", f"(By.NAME, '{word}')", f"(By.XPATH, '//button[.=\"{word}\"]')"],
+            "allureStep": f"Выполняем '{step_type}' на элементе '{element_name}'",
+            "code": {
+                "methodDefinition": f'    @allure.step("{step_type} {element_name}")\n    def {method_name}(self):\n        {body}',
+                "methodCall": f"page.{method_name}()",
+            },
+        }
+        if step_type == "assert" and sub_type in ("assertVisible", "assertNotVisible", "assertIsEnabled"):
+            step["booleanCheck"] = {"methodName": "is_visible_with_healing", "locatorVarName": locator_var}
+        return step
+
+    def steps(self, count: int, conditional_ratio: float = 0.0, depth: int = 0, max_depth: int = 3) -> List[Dict]:
+        result = []
+        while len(result) < count:
+            if depth < max_depth and self.rng.random() < conditional_ratio:
+                result.append(self.conditional(depth=depth + 1, max_depth=max_depth, conditional_ratio=conditional_ratio))
+            else:
+                result.append(self.step())
+        return result
+
+    def conditional(self, depth: int = 1, max_depth: int = 3, conditional_ratio: float = 0.3) -> Dict:
+        condition = self.step("assert")
+        condition["subType"] = "assertVisible"
+        condition["booleanCheck"] = {"methodName": "is_visible_with_healing", "locatorVarName": "self.x_locators"}
+        return {
+            "id": 1712000000000 + self.rng.random(),
+            "type": "conditional",
+            "condition": condition,
+            "then_steps": self.steps(3, conditional_ratio, depth, max_depth),
+            "else_steps": self.steps(2, conditional_ratio, depth, max_depth),
+            "isFinalized": True,
+        }
+
+    def nested_conditional(self, depth: int) -> Dict:
+        """Цепочка из depth вложенных IF (then внутри then)."""
+        block = self.conditional(max_depth=0)
+        innermost = block
+        for _ in range(depth - 1):
+            inner = self.conditional(max_depth=0)
+            innermost["then_steps"].append(inner)
+            innermost = inner
+        return block
+
+    def test_case(self, name: str, page_class_name: str, steps: List[Dict]) -> Dict:
+        return {"id": f"tc_{name}", "name": name, "pageClassName": page_class_name, "collectionId": "bench", "recordedSteps": steps}
+
+
+def make_generation_request(
+        steps_per_test: int = 20,
+        test_cases: int = 1,
+        conditional_ratio: float = 0.0,
+        nested_depth: int = 0,
+        ddt_variables: int = 0,
+        env_variables: int = 0,
+        screenshot_bytes: int = 0,
+        seed: int = 0,
+) -> Dict:
+    """Собирает тело запроса /generate для страницы с заданными размерами."""
+    gen = SyntheticRecording(seed=seed, screenshot_bytes=screenshot_bytes)
+    cases = []
+    for index in range(test_cases):
+        steps = gen.steps(steps_per_test, conditional_ratio=conditional_ratio)
+        if nested_depth:
+            steps.append(gen.nested_conditional(nested_depth))
+        steps.extend(gen.step("input", variable_name=f"ddt_var_{i}") for i in range(ddt_variables))
+        cases.append(gen.test_case(f"Scenario {index}", "BenchPage", steps))
+    return {
+        "activeTestCase": cases[0],
+        "allTestCasesForPage": cases,
+        "stateData": {
+            "collections": {"bench": {"id": "bench", "name": "Benchmark Collection"}},
+            "activeCollectionId": "bench",
+            "environments": {"dev": {f"ENV_VAR_{i}": f"value-{i}" for i in range(env_variables)}},
+            "activeEnvironment": "dev",
+        },
+        "options": {"generatePom": True, "generateTest": True, "generateBasePage": True},
+    }
+
+
+# Сценарии бенчмарка: имя -> параметры make_generation_request
+SCENARIOS = {
+    "small_edit": dict(steps_per_test=20),
+    "thousands_of_steps": dict(steps_per_test=5000),
+    "many_test_cases": dict(steps_per_test=60, test_cases=40),
+    "deep_conditionals": dict(steps_per_test=200, conditional_ratio=0.25, nested_depth=40),
+    "large_ddt_and_env": dict(steps_per_test=50, ddt_variables=1000, env_variables=1000),
+    "screenshots": dict(steps_per_test=100, test_cases=10, screenshot_bytes=30 * 1024),
+}
@@ -3,6 +3,7 @@
 // ======================================================
 
 const STATE_KEY = 'autotestProState';
+const API_BASE_URL = 'http://127.0.0.1:8000/api/v1';
 
 async function getState() {
     const result = await chrome.storage.local.get(STATE_KEY);
@@ -551,20 +552,40 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
                 }
 
                 // 1. Получаем ключ из хранилища
-                chrome.storage.sync.get({licenseKey: ''}, async (settings) => {
+                chrome.storage.sync.get({licenseKey: '', ...GENERATOR_OPTION_DEFAULTS}, async (settings) => {
                     if (!settings.licenseKey) {
                         sendResponse({error: "Лицензионный ключ не найден. Пожалуйста, введите его в настройках."});
                         return;
                     }
 
-                    // 2. Формируем тело запроса
-                    const allTestCasesForPage = Object.values(state.testCases).filter(
-                        tc => tc.pageClassName === activeTestCase.pageClassName
-                    );
+                    // 2. Формируем тело запроса. Скриншоты загружаются отдельно,
+                    // а в запрос попадают только их хеши.
+                    let allTestCasesForPage;
+                    try {
+                        allTestCasesForPage = await prepareTestCasesForServer(
+                            Object.values(state.testCases).filter(
+                                tc => tc.pageClassName === activeTestCase.pageClassName
+                            ),
+                            settings.licenseKey
+                        );
+                    } catch (e) {
+                        console.error("Screenshot upload failed:", e);
+                        sendResponse({error: "Не удалось подключиться к серверу. Убедитесь, что он запущен."});
+                        return;
+                    }
+
+                    // Дельта-синхронизация: сервер получает манифест (id, hash) всех тест-кейсов страницы,
+                    // а целиком - только активный и те, что изменились с последней успешной генерации.
+                    const manifest = await Promise.all(allTestCasesForPage.map(async tc => ({id: tc.id, hash: await testCaseHash(tc)})));
+                    const unsyncedIds = new Set(manifest
+                        .filter(({id, hash}) => id !== activeTestCase.id && syncedTestCaseHashes.get(id) !== hash)
+                        .map(({id}) => id));
 
                     const requestBody = {
-                        activeTestCase: activeTestCase,
-                        allTestCasesForPage: allTestCasesForPage,
+                        activeTestCase: allTestCasesForPage.find(tc => tc.id === activeTestCase.id),
+                        allTestCasesForPage: allTestCasesForPage.filter(tc => unsyncedIds.has(tc.id)),
+                        testCaseManifest: manifest,
+                        previousEtag: lastEtagByTestCase.get(activeTestCase.id),
                         stateData: { // Отправляем только нужные части state, а не весь
                             collections: state.collections,
                             activeCollectionId: state.activeCollectionId,
@@ -575,28 +596,64 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
                             generatePom: message.generatePom,
                             generateTest: message.generateTest,
                             generateBasePage: message.generateBasePage,
+                            ...pickGeneratorOptions(settings)
                         }
                     };
 
                     try {
-                        // 3. Отправляем запрос на наш сервер
-                        const response = await fetch('http://127.0.0.1:8000/api/v1/generate', {
+                        // 3. Отправляем запрос на наш сервер. If-None-Match со всеми известными ETag
+                        // позволяет серверу ответить 304 без повторной генерации.
+                        const headers = {
+                            'Content-Type': 'application/json',
+                            'Authorization': await getAuthorizationHeader(settings.licenseKey)
+                        };
+                        if (generatedCodeByEtag.size > 0) {
+                            headers['If-None-Match'] = [...generatedCodeByEtag.keys()].join(', ');
+                        }
+                        let response = await fetch(`${API_BASE_URL}/generate`, {
                             method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                                'Authorization': `Bearer ${settings.licenseKey}`
-                            },
+                            headers,
                             body: JSON.stringify(requestBody)
                         });
+                        if (response.status === 409) {
+                            // Части тест-кейсов на сервере нет (вытеснены, перезапуск, другой воркер) - досылаем их
+                            const missing = new Set(((await response.json()).detail || {}).missing || []);
+                            requestBody.allTestCasesForPage = allTestCasesForPage.filter(
+                                tc => missing.has(tc.id) && tc.id !== activeTestCase.id
+                            );
+                            response = await fetch(`${API_BASE_URL}/generate`, {
+                                method: 'POST',
+                                headers,
+                                body: JSON.stringify(requestBody)
+                            });
+                        }
+                        if (response.ok || response.status === 304) {
+                            manifest.forEach(({id, hash}) => syncedTestCaseHashes.set(id, hash));
+                        }
+
+                        if (response.status === 304) {
+                            lastEtagByTestCase.set(activeTestCase.id, response.headers.get('ETag'));
+                            sendResponse({code: generatedCodeByEtag.get(response.headers.get('ETag'))});
+                            return;
+                        }
 
                         const data = await response.json();
 
-                        if (!response.ok) {
+                        if (response.status === 401) licenseToken = null;
+                        if (response.status === 503) {
+                            // Сервер перегружен: сообщаем, через сколько секунд повторить
+                            const retryAfter = response.headers.get('Retry-After') || '?';
+                            sendResponse({error: `Сервер занят генерацией, повторите через ${retryAfter} сек.`});
+                        } else if (!response.ok) {
                             // Если сервер вернул ошибку, показываем ее
                             sendResponse({error: data.detail || 'Ошибка сервера'});
                         } else {
-                            // Если все хорошо, отправляем код обратно в popup
-                            sendResponse({code: data.code});
+                            // Не сохраненные сервером (больше квоты) тест-кейсы в следующий раз отправляем целиком
+                            (data.notStoredTestCases || []).forEach(id => syncedTestCaseHashes.delete(id));
+                            rememberGeneratedCode(response.headers.get('ETag'), data.code);
+                            lastEtagByTestCase.set(activeTestCase.id, response.headers.get('ETag'));
+                            // Если все хорошо, отправляем код обратно в popup (diff - от прошлой генерации этого тест-кейса)
+                            sendResponse({code: data.code, diff: data.diff});
                         }
 
                     } catch (e) {
@@ -954,6 +1011,148 @@ async function regenerateCodeForStep(step) {
 }
 
 
+// ======================================================
+// 5. ПОДГОТОВКА ДАННЫХ ДЛЯ СЕРВЕРА (скриншоты -> хеши)
+// ======================================================
+// Опции генерации BasePage, которые задаются на странице настроек и передаются серверу как есть
+const GENERATOR_OPTION_DEFAULTS = {
+    sharedLocatorCache: false,
+    fastActions: false,
+    elementCache: false,
+    similarityHealing: false,
+    stepTimings: false,
+    idleWait: false,
+    idleQuietMs: 300,
+    driverPool: false,
+    treeShakeBasePage: false,
+    sharedPrefixFixtures: false,
+    prefixStateSnapshot: false,
+    minimizeSteps: false
+};
+
+function pickGeneratorOptions(settings) {
+    return Object.fromEntries(Object.keys(GENERATOR_OPTION_DEFAULTS).map(key => [key, settings[key]]));
+}
+
+// Лицензионный ключ обменивается на короткоживущий подписанный токен: сервер проверяет его без БД.
+let licenseToken = null; // {licenseKey, token, expiresAt}
+
+async function getAuthorizationHeader(licenseKey) {
+    const now = Date.now();
+    if (!licenseToken || licenseToken.licenseKey !== licenseKey || licenseToken.expiresAt - now < 30000) {
+        licenseToken = null;
+        try {
+            const response = await fetch(`${API_BASE_URL}/token`, {
+                method: 'POST',
+                headers: {'Authorization': `Bearer ${licenseKey}`}
+            });
+            if (response.ok) {
+                const data = await response.json();
+                licenseToken = {licenseKey, token: data.access_token, expiresAt: now + data.expires_in * 1000};
+            }
+        } catch (e) {
+            console.error("Token exchange failed:", e);
+        }
+    }
+    // Если обмен не удался, работаем с ключом напрямую - сервер принимает оба варианта
+    return `Bearer ${licenseToken ? licenseToken.token : licenseKey}`;
+}
+
+async function sha256Hex(buffer) {
+    const digest = await crypto.subtle.digest('SHA-256', buffer);
+    return [...new Uint8Array(digest)].map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+// Последние сгенерированные ответы по ETag: при повторной генерации с теми же данными
+// сервер отвечает 304, и код берется отсюда.
+const GENERATED_CODE_CACHE_LIMIT = 10;
+const generatedCodeByEtag = new Map();
+
+function rememberGeneratedCode(etag, code) {
+    if (!etag) return;
+    generatedCodeByEtag.delete(etag);
+    generatedCodeByEtag.set(etag, code);
+    while (generatedCodeByEtag.size > GENERATED_CODE_CACHE_LIMIT) {
+        generatedCodeByEtag.delete(generatedCodeByEtag.keys().next().value);
+    }
+}
+
+// ETag последней генерации по id активного тест-кейса: передается как previousEtag,
+// и сервер добавляет в ответ diff от той версии кода.
+const lastEtagByTestCase = new Map();
+
+// Версии тест-кейсов, которые уже есть на сервере (id -> hash): их не нужно пересылать в /generate.
+// Сервер может их потерять - тогда он отвечает 409 со списком id, и они досылаются.
+const syncedTestCaseHashes = new Map();
+
+async function testCaseHash(testCase) {
+    return sha256Hex(new TextEncoder().encode(JSON.stringify(testCase)));
+}
+
+// Возвращает копии тест-кейсов, в шагах которых base64-скриншот заменен на screenshotHash.
+// Скриншоты, которых еще нет на сервере, загружаются один раз. Если проверку или загрузку
+// выполнить не удалось, шаг отправляется со скриншотом внутри, как до появления ассетов.
+async function prepareTestCasesForServer(testCases, licenseKey) {
+    const blobsByHash = new Map();
+    const strippedSteps = []; // [шаг без скриншота, исходный скриншот]
+
+    async function stripSteps(steps) {
+        return Promise.all((steps || []).map(async step => {
+            if (!step) return step;
+            const {screenshot, ...rest} = step;
+            if (screenshot) {
+                const blob = await (await fetch(screenshot)).blob();
+                const hash = await sha256Hex(await blob.arrayBuffer());
+                blobsByHash.set(hash, blob);
+                rest.screenshotHash = hash;
+                strippedSteps.push([rest, screenshot]);
+            }
+            if (step.type === 'conditional') {
+                [rest.condition] = await stripSteps([step.condition]);
+                rest.then_steps = await stripSteps(step.then_steps);
+                rest.else_steps = await stripSteps(step.else_steps);
+            }
+            return rest;
+        }));
+    }
+
+    const prepared = await Promise.all(testCases.map(async tc => ({
+        ...tc,
+        recordedSteps: await stripSteps(tc.recordedSteps)
+    })));
+
+    if (blobsByHash.size > 0) {
+        let notUploaded = new Set(blobsByHash.keys());
+        try {
+            const headers = {'Authorization': await getAuthorizationHeader(licenseKey)};
+            const checkResponse = await fetch(`${API_BASE_URL}/assets/check`, {
+                method: 'POST',
+                headers: {...headers, 'Content-Type': 'application/json'},
+                body: JSON.stringify({hashes: [...blobsByHash.keys()]})
+            });
+            if (checkResponse.ok) {
+                const {missing} = await checkResponse.json();
+                const uploaded = await Promise.all(missing.map(hash => fetch(`${API_BASE_URL}/assets/${hash}`, {
+                    method: 'PUT',
+                    headers: {...headers, 'Content-Type': 'application/octet-stream'},
+                    body: blobsByHash.get(hash)
+                }).then(response => response.ok, () => false)));
+                notUploaded = new Set(missing.filter((hash, i) => !uploaded[i]));
+            }
+        } catch (error) {
+            console.warn("Asset upload failed, screenshots are sent inline:", error);
+        }
+        for (const [step, screenshot] of strippedSteps) {
+            if (notUploaded.has(step.screenshotHash)) {
+                delete step.screenshotHash;
+                step.screenshot = screenshot;
+            }
+        }
+    }
+    return prepared;
+}
+
+
 // ======================================================
 // 6. ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ (AI + Naming)
 // ======================================================
@@ -989,19 +1188,54 @@ async function getLlmResponse(prompt) {
     }
 }
 
+// Имена шагов через LLM придумывает сервер: шаги, записанные почти одновременно, уходят одним запросом,
+// повторяющиеся (действие, элемент, значение) сервер отдает из своего кэша.
+const STEP_NAME_BATCH_DELAY_MS = 30;
+const STEP_NAME_REQUEST_TIMEOUT_MS = 30000;
+let pendingStepNames = []; // [{item, resolve}]
+let stepNameFlushTimer = null;
+
+function requestStepName(item) {
+    return new Promise(resolve => {
+        pendingStepNames.push({item, resolve});
+        if (!stepNameFlushTimer) stepNameFlushTimer = setTimeout(flushStepNames, STEP_NAME_BATCH_DELAY_MS);
+    });
+}
+
+async function flushStepNames() {
+    const batch = pendingStepNames;
+    pendingStepNames = [];
+    stepNameFlushTimer = null;
+
+    let names = [];
+    try {
+        const settings = await chrome.storage.sync.get({licenseKey: ''});
+        const response = await fetch(`${API_BASE_URL}/step-names`, {
+            method: 'POST',
+            headers: {
+                'Authorization': await getAuthorizationHeader(settings.licenseKey),
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({steps: batch.map(pending => pending.item)}),
+            signal: AbortSignal.timeout(STEP_NAME_REQUEST_TIMEOUT_MS)
+        });
+        if (response.ok) names = (await response.json()).names;
+    } catch (error) {
+        console.error("Step naming request failed:", error);
+    }
+    batch.forEach((pending, i) => pending.resolve(names[i] || null));
+}
+
 async function generateAllureStepName(step) {
     const elementName = generateElementName(step.data);
     const type = step.subType || step.type;
     const value = (step.data && step.data.value) || step.expectedText || '';
 
-    const prompt = `Generate a short, human-readable Allure step name in Russian for a UI test.
-    Action type: "${type}"
-    Element name: "${elementName}"
-    Value: "${value}"
-    Generate only the final string, like "Кликаем по кнопке 'Войти'" or "Вводим '{login}' в поле 'Имя пользователя'". Use placeholders like {variable_name} if the value is parameterized.`;
-
-    const llmName = await getLlmResponse(prompt);
-    if (llmName) return llmName;
+    const settings = await chrome.storage.sync.get({useLlm: false});
+    if (settings.useLlm) {
+        const llmName = await requestStepName({action: type, element: elementName, value: String(value)});
+        if (llmName) return llmName;
+    }
 
     // Fallback-логика
     let actionText = '';
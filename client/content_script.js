@@ -149,7 +149,9 @@ function getElementInfo(element) {
         iframeInfo,
         htmlContext: element.parentElement ? element.parentElement.innerHTML.substring(0, 2000) : '',
         targetOuterHtml: element.outerHTML,
-        rect: element.getBoundingClientRect().toJSON()
+        rect: element.getBoundingClientRect().toJSON(),
+        // Прокрутка в момент записи: rect во viewport-координатах, отпечаток элемента хранит положение на странице
+        scroll: {x: window.scrollX, y: window.scrollY}
     };
 }
 
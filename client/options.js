@@ -5,6 +5,18 @@ const customTestIdInput = document.getElementById('customTestId');
 const locatorStrategySelect = document.getElementById('locatorStrategy');
 const excludeXpathCheckbox = document.getElementById('excludeXpath');
 const licenseKeyInput = document.getElementById('licenseKey');
+const sharedLocatorCacheCheckbox = document.getElementById('sharedLocatorCache');
+const fastActionsCheckbox = document.getElementById('fastActions');
+const elementCacheCheckbox = document.getElementById('elementCache');
+const similarityHealingCheckbox = document.getElementById('similarityHealing');
+const stepTimingsCheckbox = document.getElementById('stepTimings');
+const idleWaitCheckbox = document.getElementById('idleWait');
+const idleQuietMsInput = document.getElementById('idleQuietMs');
+const driverPoolCheckbox = document.getElementById('driverPool');
+const treeShakeBasePageCheckbox = document.getElementById('treeShakeBasePage');
+const sharedPrefixFixturesCheckbox = document.getElementById('sharedPrefixFixtures');
+const prefixStateSnapshotCheckbox = document.getElementById('prefixStateSnapshot');
+const minimizeStepsCheckbox = document.getElementById('minimizeSteps');
 const saveButton = document.getElementById('save');
 const statusDiv = document.getElementById('status');
 
@@ -16,8 +28,19 @@ function saveOptions() {
         customTestId: customTestIdInput.value,
         locatorStrategy: locatorStrategySelect.value,
         excludeXpath: excludeXpathCheckbox.checked,
-        licenseKey: licenseKeyInput.value.trim()
-
+        licenseKey: licenseKeyInput.value.trim(),
+        sharedLocatorCache: sharedLocatorCacheCheckbox.checked,
+        fastActions: fastActionsCheckbox.checked,
+        elementCache: elementCacheCheckbox.checked,
+        similarityHealing: similarityHealingCheckbox.checked,
+        stepTimings: stepTimingsCheckbox.checked,
+        idleWait: idleWaitCheckbox.checked,
+        idleQuietMs: Math.max(0, parseInt(idleQuietMsInput.value, 10) || 0),
+        driverPool: driverPoolCheckbox.checked,
+        treeShakeBasePage: treeShakeBasePageCheckbox.checked,
+        sharedPrefixFixtures: sharedPrefixFixturesCheckbox.checked,
+        prefixStateSnapshot: prefixStateSnapshotCheckbox.checked,
+        minimizeSteps: minimizeStepsCheckbox.checked
     };
 
     chrome.storage.sync.set(settings, () => {
@@ -36,7 +59,19 @@ function restoreOptions() {
         customTestId: 'data-testid',
         locatorStrategy: 'smart',
         excludeXpath: false,
-        licenseKey: ''
+        licenseKey: '',
+        sharedLocatorCache: false,
+        fastActions: false,
+        elementCache: false,
+        similarityHealing: false,
+        stepTimings: false,
+        idleWait: false,
+        idleQuietMs: 300,
+        driverPool: false,
+        treeShakeBasePage: false,
+        sharedPrefixFixtures: false,
+        prefixStateSnapshot: false,
+        minimizeSteps: false
     };
 
     chrome.storage.sync.get(defaults, (items) => {
@@ -47,6 +82,18 @@ function restoreOptions() {
         locatorStrategySelect.value = items.locatorStrategy;
         excludeXpathCheckbox.checked = items.excludeXpath;
         licenseKeyInput.value = items.licenseKey;
+        sharedLocatorCacheCheckbox.checked = items.sharedLocatorCache;
+        fastActionsCheckbox.checked = items.fastActions;
+        elementCacheCheckbox.checked = items.elementCache;
+        similarityHealingCheckbox.checked = items.similarityHealing;
+        stepTimingsCheckbox.checked = items.stepTimings;
+        idleWaitCheckbox.checked = items.idleWait;
+        idleQuietMsInput.value = items.idleQuietMs;
+        driverPoolCheckbox.checked = items.driverPool;
+        treeShakeBasePageCheckbox.checked = items.treeShakeBasePage;
+        sharedPrefixFixturesCheckbox.checked = items.sharedPrefixFixtures;
+        prefixStateSnapshotCheckbox.checked = items.prefixStateSnapshot;
+        minimizeStepsCheckbox.checked = items.minimizeSteps;
     });
 }
 
@@ -78,6 +78,18 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 2500);
     }
 
+    // Сводка diff от прошлой генерации для тоста: " (+3 −1 строк)"
+    function formatDiffSummary(diff) {
+        if (typeof diff !== 'string') return '';
+        if (!diff) return ' (без изменений)';
+        let added = 0, removed = 0;
+        for (const line of diff.split('\n')) {
+            if (line.startsWith('+') && !line.startsWith('+++')) added++;
+            else if (line.startsWith('-') && !line.startsWith('---')) removed++;
+        }
+        return ` (+${added} −${removed} строк)`;
+    }
+
     function saveCheckboxStates() {
         const settings = {
             generatePom: generatePomCheckbox.checked,
@@ -225,7 +237,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }, (response) => {
             if (response && response.code) {
                 navigator.clipboard.writeText(response.code);
-                showToast('✅ Код сгенерирован и скопирован!');
+                showToast(`✅ Код сгенерирован и скопирован!${formatDiffSummary(response.diff)}`);
             } else if (response && response.error) {
                 showToast(`⚠️ Ошибка: ${response.error}`);
             } else {
@@ -0,0 +1,20 @@
+"""Общие фикстуры: клиент API с действующей лицензией без обращения к БД."""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import dependencies
+from app.main import app
+from app.security import LicenseState
+
+LICENSE = LicenseState(id=1, is_active=True, expires_at=datetime(2100, 1, 1))
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[dependencies.get_valid_license] = lambda: LICENSE
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
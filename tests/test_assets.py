@@ -0,0 +1,54 @@
+"""Загрузка ассетов (скриншотов шагов) по SHA-256: /assets/check и PUT /assets/{digest}."""
+import hashlib
+
+import pytest
+
+from app.assets import asset_store
+from app.core import config
+
+SCREENSHOT = b"\x89PNG fake screenshot bytes"
+DIGEST = hashlib.sha256(SCREENSHOT).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(asset_store, "root", str(tmp_path))
+
+
+def missing(client, *digests):
+    response = client.post("/api/v1/assets/check", json={"hashes": list(digests)})
+    assert response.status_code == 200
+    return response.json()["missing"]
+
+
+def test_check_before_and_after_upload(client):
+    assert missing(client, DIGEST) == [DIGEST]
+
+    response = client.put(f"/api/v1/assets/{DIGEST}", content=SCREENSHOT)
+    assert response.status_code == 200
+    assert response.json() == {"hash": DIGEST, "stored": True}
+
+    assert missing(client, DIGEST) == []
+    # Повторная загрузка тела не читает и ничего не пишет
+    assert client.put(f"/api/v1/assets/{DIGEST}", content=SCREENSHOT).json() == {"hash": DIGEST, "stored": False}
+
+
+def test_mismatched_hash_is_rejected(client):
+    other = hashlib.sha256(b"something else").hexdigest()
+
+    assert client.put(f"/api/v1/assets/{other}", content=SCREENSHOT).status_code == 400
+    assert missing(client, other) == [other]
+
+
+def test_invalid_hash_is_rejected(client):
+    assert client.put("/api/v1/assets/not-a-hash", content=SCREENSHOT).status_code == 400
+    assert client.post("/api/v1/assets/check", json={"hashes": ["../etc/passwd"]}).status_code == 400
+
+
+def test_oversized_body_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(config, "MAX_ASSET_BYTES", len(SCREENSHOT) - 1)
+
+    # С Content-Length тело не читается вовсе, без него (chunked) чтение обрывается на лимите
+    assert client.put(f"/api/v1/assets/{DIGEST}", content=SCREENSHOT).status_code == 413
+    assert client.put(f"/api/v1/assets/{DIGEST}", content=iter([SCREENSHOT[:10], SCREENSHOT[10:]])).status_code == 413
+    assert missing(client, DIGEST) == [DIGEST]
@@ -0,0 +1,54 @@
+"""Ключ кэша генерации (он же ETag) меняется вместе со сгенерированным кодом."""
+import json
+
+from app.code_generator import generate_full_code, generation_cache_key
+from app.wire import body_digest
+
+
+def recording(name, *elements):
+    return {
+        "name": name,
+        "pageClassName": "KeyPage",
+        "recordedSteps": [
+            {"type": "click", "locators": [f'(By.ID, "{el}")'], "data": {"selectors": {"id": el}},
+             "code": {"methodDefinition": f"    def click_{el}(self):\n        pass", "methodCall": f"page.click_{el}()"}}
+            for el in elements
+        ],
+    }
+
+
+def request_body(active, all_test_cases, previous_etag=None):
+    body = {"activeTestCase": active, "allTestCasesForPage": all_test_cases, "stateData": {}, "options": {}}
+    if previous_etag is not None:
+        body["previousEtag"] = previous_etag
+    return json.dumps(body).encode()
+
+
+def test_key_follows_sibling_test_cases_with_shared_prefix_fixtures():
+    active = recording("A", "login", "menu", "save")
+    sibling = recording("B", "login", "menu", "delete")
+    changed_sibling = recording("B", "logout", "menu", "delete")
+    options = {"generateTest": True, "generatePom": False, "sharedPrefixFixtures": True}
+
+    assert generate_full_code(active, [active, sibling], {}, options) != generate_full_code(active, [active, changed_sibling], {}, options)
+    assert body_digest(request_body(active, [active, sibling])) != body_digest(request_body(active, [active, changed_sibling]))
+
+
+def test_key_is_scoped_by_license_and_options():
+    digest = body_digest(request_body(recording("A", "login"), []))
+    options = {"generateTest": True}
+
+    assert generation_cache_key(1, digest, {}, options) == generation_cache_key(1, digest, {}, dict(options))
+    assert generation_cache_key(1, digest, {}, options) != generation_cache_key(2, digest, {}, options)
+    assert generation_cache_key(1, digest, {}, options) != generation_cache_key(1, digest, {}, {"generateTest": False})
+
+
+def test_body_digest_ignores_previous_etag():
+    active = recording("A", "login")
+    first, second = (
+        generation_cache_key(1, body_digest(request_body(active, [active], previous_etag=etag), etag), {}, {})
+        for etag in ('"' + "a" * 64 + '"', '"' + "b" * 64 + '"')
+    )
+
+    # Повторный запрос того же содержимого несет ETag прошлого ответа - ключ от этого не меняется
+    assert first == second
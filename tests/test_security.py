@@ -0,0 +1,104 @@
+"""Токены лицензий (app/security.py) и их проверка в зависимостях (app/dependencies.py)."""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import dependencies, security
+from app.cache import LRUCache
+from app.core import config
+from app.security import LicenseState
+
+ACTIVE = LicenseState(id=7, is_active=True, expires_at=datetime(2100, 1, 1), key="license-key-7")
+
+
+@pytest.fixture(autouse=True)
+def fresh_license_state(monkeypatch):
+    # Кэш лицензий и список отозванных - состояние процесса: каждому тесту свои
+    monkeypatch.setattr(dependencies, "license_cache", LRUCache(max_entries=10, sizeof=lambda _: 1))
+    monkeypatch.setattr(dependencies, "revoked_license_ids", set())
+
+
+def check(credential):
+    return asyncio.run(dependencies._check_license(f"Bearer {credential}"))
+
+
+def rejected_with(credential):
+    with pytest.raises(HTTPException) as error:
+        check(credential)
+    return error.value.status_code
+
+
+def test_token_round_trip():
+    token, ttl = security.create_license_token(ACTIVE)
+
+    assert security.looks_like_token(token)
+    assert 0 < ttl <= config.LICENSE_TOKEN_TTL_SECONDS
+    assert security.decode_license_token(token) == LicenseState(id=7, is_active=True, expires_at=ACTIVE.expires_at)
+    assert check(token).id == 7
+
+
+def test_tampered_signature_is_rejected():
+    token, _ = security.create_license_token(ACTIVE)
+    header, payload, signature = token.split(".")
+    tampered = ".".join([header, payload, ("A" if signature[0] != "A" else "B") + signature[1:]])
+
+    assert security.decode_license_token(tampered) is None
+    assert rejected_with(tampered) == 401
+
+
+def test_token_signed_with_another_key_is_rejected():
+    now = int(time.time())
+    claims = {"sub": "7", "act": True, "lexp": now + 3600, "iat": now, "exp": now + 60}
+    forged = jwt.encode(claims, "not-the-server-key", algorithm=config.TOKEN_ALGORITHM)
+
+    assert security.decode_license_token(forged) is None
+
+
+def test_expired_token_is_rejected():
+    now = int(time.time())
+    claims = {"sub": "7", "act": True, "lexp": now + 3600, "iat": now - 120, "exp": now - 60}
+    expired = jwt.encode(claims, security._SIGNING_KEY, algorithm=config.TOKEN_ALGORITHM)
+
+    assert security.decode_license_token(expired) is None
+    assert rejected_with(expired) == 401
+
+
+def test_token_does_not_outlive_license():
+    license = LicenseState(id=7, is_active=True, expires_at=datetime.utcnow() - timedelta(minutes=1))
+
+    token, ttl = security.create_license_token(license)
+
+    assert ttl == 0
+    assert security.decode_license_token(token) is None
+
+
+def test_token_of_inactive_license_is_forbidden():
+    token, _ = security.create_license_token(LicenseState(id=7, is_active=False, expires_at=ACTIVE.expires_at))
+
+    assert rejected_with(token) == 403
+
+
+def test_deactivation_revokes_tokens_and_cached_key():
+    token, _ = security.create_license_token(ACTIVE)
+    dependencies.license_cache.set(ACTIVE.key, ACTIVE)
+    assert check(ACTIVE.key) == ACTIVE  # Ключ проверяется по кэшу, без БД
+
+    dependencies.invalidate_license(LicenseState(id=7, is_active=False, expires_at=ACTIVE.expires_at, key=ACTIVE.key))
+
+    assert dependencies.license_cache.get(ACTIVE.key) is None
+    assert 7 in dependencies.revoked_license_ids
+    assert rejected_with(token) == 401
+
+
+@pytest.mark.parametrize("credential, is_token", [
+    ("aaa.bbb.ccc", True),
+    ("123e4567-e89b-12d3-a456-426614174000", False),
+    ("aaa.bbb", False),
+    ("a.b.c.d", False),
+])
+def test_looks_like_token(credential, is_token):
+    assert security.looks_like_token(credential) is is_token
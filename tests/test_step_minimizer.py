@@ -0,0 +1,133 @@
+"""Граничные случаи минимизации записи (app/step_minimizer.py) и кода, который из нее получается."""
+import ast
+
+from app.code_generator import _emit_method_calls, generate_full_code
+from app.step_ir import ConditionalNode, compile_test_case
+from app.step_minimizer import DUPLICATE_CLICK_WINDOW_MS, minimize
+
+RECORDED_AT = 1_700_000_000_000
+
+
+def step(action, element=None, at=None):
+    """Шаг записи; at - отметка времени (мс) от начала записи, она же id шага."""
+    name = f"{action}_{element}" if element else action
+    return {
+        "id": RECORDED_AT + (at if at is not None else 0),
+        "type": action,
+        "locators": [f'(By.ID, "{element}")'] if element else [],
+        "data": {"selectors": {"id": element}, "tag": "div"} if element else {},
+        "code": {"methodDefinition": f"    def {name}(self):\n        pass", "methodCall": f"page.{name}()"},
+    }
+
+
+def frame(element):
+    return step("switch_to_iframe", element)
+
+
+def default():
+    return step("switch_to_default_content")
+
+
+def conditional(then_steps, else_steps=()):
+    condition = step("assertVisible", "banner")
+    condition["booleanCheck"] = {"methodName": "is_visible_with_healing", "locatorVarName": "banner_locators"}
+    return {"type": "conditional", "condition": condition, "then_steps": list(then_steps), "else_steps": list(else_steps)}
+
+
+def recording(*steps):
+    return {"name": "Minimized", "pageClassName": "MinPage", "recordedSteps": list(steps)}
+
+
+def calls(compiled):
+    return [line.strip() for line in _emit_method_calls(compiled.steps, 1)]
+
+
+def test_frame_round_trip_in_then_branch_keeps_compilable_if():
+    tc = recording(frame("f1"), conditional([default(), frame("f1")], [step("click", "retry")]))
+    minimized = minimize(compile_test_case(tc))
+
+    assert calls(minimized) == [
+        "page.switch_to_iframe_f1()",
+        "if page.is_visible_with_healing(page.banner_locators):",
+        "pass",
+        "else:",
+        "page.click_retry()",
+    ]
+    assert minimized.removed_steps == {"frame": 2}
+
+
+def test_conditional_with_both_branches_emptied_is_dropped():
+    tc = recording(frame("f1"), conditional([default(), frame("f1")], [default(), frame("f1")]), step("click", "ok"))
+    minimized = minimize(compile_test_case(tc))
+
+    assert not any(isinstance(node, ConditionalNode) for node in minimized.steps)
+    assert calls(minimized) == ["page.switch_to_iframe_f1()", "page.click_ok()"]
+    # Локатор условия больше нигде не используется и в POM не попадает
+    assert [entry[0] for entry in minimized.locator_entries] == ["f1", "ok"]
+
+
+def test_recorded_empty_conditional_is_kept():
+    compiled = minimize(compile_test_case(recording(conditional([]))))
+
+    assert calls(compiled) == ["if page.is_visible_with_healing(page.banner_locators):", "pass"]
+
+
+def test_generated_code_with_emptied_branch_compiles():
+    tc = recording(frame("f1"), conditional([default(), frame("f1")], [step("click", "retry")]))
+    code = generate_full_code(tc, [tc], {}, {"generateTest": True, "generatePom": True, "minimizeSteps": True})
+
+    ast.parse(code)
+    assert "    if page.is_visible_with_healing(page.banner_locators):\n        pass\n    else:\n" in code
+
+
+def test_frame_is_unknown_after_conditional():
+    # До блока тест в f1, но после IF/ELSE фрейм неизвестен: выход на страницу и вход в f1 нужны оба
+    tc = recording(frame("f1"), conditional([default()], [step("click", "x")]), default(), frame("f1"))
+    minimized = minimize(compile_test_case(tc))
+
+    assert calls(minimized)[-2:] == ["page.switch_to_default_content()", "page.switch_to_iframe_f1()"]
+
+
+def test_branches_start_from_frame_before_block():
+    tc = recording(frame("f1"), conditional([default(), frame("f1"), step("click", "a")], [frame("f2")]))
+    minimized = minimize(compile_test_case(tc))
+
+    assert calls(minimized) == [
+        "page.switch_to_iframe_f1()",
+        "if page.is_visible_with_healing(page.banner_locators):",
+        "page.click_a()",
+        "else:",
+        "page.switch_to_iframe_f2()",  # Вложенный фрейм внутри f1: вход остается
+    ]
+
+
+def test_duplicate_click_window():
+    window = DUPLICATE_CLICK_WINDOW_MS
+    tc = recording(
+        step("click", "save", at=0),
+        step("click", "save", at=window - 1),  # Двойная запись: убирается
+        step("click", "save", at=window * 3),  # Повторный клик: остается
+        step("click", "other", at=window * 3 + 1),
+    )
+    minimized = minimize(compile_test_case(tc))
+
+    assert calls(minimized) == ["page.click_save()", "page.click_save()", "page.click_other()"]
+    assert minimized.removed_steps == {"click": 1}
+
+
+def test_duplicate_click_window_does_not_cross_conditional():
+    tc = recording(step("click", "save", at=0), conditional([step("click", "save", at=10)]))
+    minimized = minimize(compile_test_case(tc))
+
+    assert minimized.removed_steps == {}
+    assert calls(minimized)[-1] == "page.click_save()"
+
+
+def test_source_ir_is_not_modified():
+    compiled = compile_test_case(recording(frame("f1"), conditional([default(), frame("f1")]), step("click", "ok")))
+    steps_before = list(compiled.steps)
+
+    minimized = minimize(compiled)
+
+    assert compiled.steps == steps_before
+    assert minimize(compiled) is minimized
@@ -0,0 +1,77 @@
+"""Хранилище тест-кейсов дельта-синхронизации (app/test_case_store.py)."""
+from app import schemas
+from app.test_case_store import TestCaseStore
+
+
+def recording(name, *elements):
+    return {
+        "name": name,
+        "pageClassName": "StorePage",
+        "recordedSteps": [
+            {"type": "click", "locators": [f'(By.ID, "{el}")'], "data": {"selectors": {"id": el}},
+             "code": {"methodDefinition": f"    def click_{el}(self):\n        pass", "methodCall": f"page.click_{el}()"}}
+            for el in elements
+        ],
+    }
+
+
+def store(**limits):
+    params = {"max_licenses": 10, "max_cases_per_license": 10, "max_bytes_per_license": 1024 * 1024, "ttl_seconds": 3600}
+    return TestCaseStore(**{**params, **limits})
+
+
+def test_put_and_get_by_hash():
+    cases = store()
+    tc = recording("A", "login")
+
+    compiled, stored = cases.put(1, "a", "h1", tc)
+
+    assert stored
+    assert cases.get(1, "a", "h1") == (tc, compiled)
+    assert cases.get(1, "a", "h2") is None  # Другая версия тест-кейса
+    assert cases.get(2, "a", "h1") is None  # Другая лицензия
+
+
+def test_resolve_keeps_manifest_order_and_reports_missing():
+    cases = store()
+    first, second = recording("A", "login"), recording("B", "logout")
+    cases.put(1, "b", "hb", second)
+    manifest = [schemas.TestCaseRef(id="a", hash="ha"), schemas.TestCaseRef(id="b", hash="hb"), schemas.TestCaseRef(id="c", hash="hc")]
+
+    test_cases, compiled, missing, not_stored = cases.resolve(1, manifest, {"a": first})
+
+    assert test_cases == [first, second]
+    assert len(compiled) == 2
+    assert missing == ["c"]
+    assert not_stored == []
+    assert cases.get(1, "a", "ha") is not None  # Присланный тест-кейс сохранен
+
+
+def test_resolve_reports_hash_mismatch_as_missing():
+    cases = store()
+    cases.put(1, "a", "old", recording("A", "login"))
+
+    _, _, missing, _ = cases.resolve(1, [schemas.TestCaseRef(id="a", hash="new")], {})
+
+    assert missing == ["a"]
+
+
+def test_eviction_by_case_count():
+    cases = store(max_cases_per_license=1)
+    cases.put(1, "a", "ha", recording("A", "login"))
+    cases.put(1, "b", "hb", recording("B", "logout"))
+
+    assert cases.get(1, "a", "ha") is None
+    assert cases.get(1, "b", "hb") is not None
+
+
+def test_oversized_test_case_is_used_but_not_stored():
+    cases = store(max_bytes_per_license=64)
+    big = recording("Big", *(f"element_{i}" for i in range(20)))
+
+    test_cases, _, missing, not_stored = cases.resolve(1, [schemas.TestCaseRef(id="big", hash="h")], {"big": big})
+
+    assert test_cases == [big]
+    assert missing == []
+    assert not_stored == ["big"]
+    assert cases.get(1, "big", "h") is None
@@ -0,0 +1,74 @@
+"""Декодирование тел запросов (app/wire.py): распаковка с ограничением размера."""
+import gzip
+import zlib
+
+import pytest
+from fastapi import HTTPException
+
+from app import wire
+from app.core import config
+
+MAX_BYTES = 1024
+
+
+def bomb(compress):
+    # Нули жмутся в сотни раз: сжатое тело маленькое, распакованное - больше лимита
+    return compress(b"\0" * (MAX_BYTES * 100))
+
+
+@pytest.mark.parametrize("encoding, compress", [
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+    ("zstd", lambda data: pytest.importorskip("zstandard").ZstdCompressor().compress(data)),
+])
+def test_decompression_bomb_is_rejected(encoding, compress):
+    body = bomb(compress)
+    assert len(body) < MAX_BYTES
+
+    with pytest.raises(HTTPException) as error:
+        wire.decompress_body(body, encoding, MAX_BYTES)
+
+    assert error.value.status_code == 413
+
+
+def test_body_at_limit_is_accepted():
+    data = b"x" * MAX_BYTES
+
+    assert wire.decompress_body(gzip.compress(data), "gzip", MAX_BYTES) == data
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate", "zstd"])
+def test_corrupt_body_is_rejected(encoding):
+    if encoding == "zstd":
+        pytest.importorskip("zstandard")
+
+    with pytest.raises(HTTPException) as error:
+        wire.decompress_body(b"definitely not compressed", encoding, MAX_BYTES)
+
+    assert error.value.status_code == 400
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        wire.decompress_body(b"{}", "br", MAX_BYTES)
+
+    assert error.value.status_code == 415
+
+
+def test_generate_rejects_bomb_and_corrupt_body(client, monkeypatch):
+    monkeypatch.setattr(config, "MAX_REQUEST_BODY_BYTES", MAX_BYTES)
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+
+    assert client.post("/api/v1/generate", content=bomb(gzip.compress), headers=headers).status_code == 413
+    assert client.post("/api/v1/generate", content=b"\x1f\x8bbroken", headers=headers).status_code == 400
+
+
+def test_msgpack_body_is_parsed(client):
+    msgpack = pytest.importorskip("msgpack")
+    body = {"activeTestCase": {"name": "A", "pageClassName": "P", "recordedSteps": []},
+            "allTestCasesForPage": [], "stateData": {}, "options": {"generateTest": True}}
+
+    response = client.post("/api/v1/generate", content=msgpack.packb(body), headers={"Content-Type": "application/msgpack"})
+
+    assert response.status_code == 200
+    assert "code" in response.json()
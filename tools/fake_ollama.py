@@ -0,0 +1,97 @@
+# tools/fake_ollama.py
+"""
+Локальная замена Ollama для проверки именования шагов без модели.
+
+    python tools/fake_ollama.py --port 11435 --delay 0.5
+    OLLAMA_URL=http://127.0.0.1:11435 uvicorn app.main:app
+
+Отвечает на POST /api/generate (stream: false). Для промптов именования шагов (строка "Steps: [...]")
+возвращает {"names": [...]} с детерминированными именами, для остальных - фиксированную строку.
+--delay задерживает ответ (проверка таймаута), --fail отвечает 500 (проверка шаблонных имен),
+--wrong-count возвращает на одно имя меньше (проверка ответа не по формату).
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STEPS_MARKER = "Steps: "
+
+
+def fake_step_name(step: dict) -> str:
+    value = f" значением '{step['value']}'" if step.get("value") else ""
+    return f"Выполняем {step['action']} на '{step['element']}'{value}"
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOllama/1.0"
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length))
+            prompt = payload["prompt"]
+        except (ValueError, KeyError):
+            self._send(400, {"error": "invalid request"})
+            return
+
+        options = self.server.options
+        with self.server.lock:
+            self.server.requests_served += 1
+        if options.delay:
+            time.sleep(options.delay)
+        if options.fail:
+            self._send(500, {"error": "model failed"})
+            return
+
+        if STEPS_MARKER in prompt:
+            steps = json.loads(prompt.rsplit(STEPS_MARKER, 1)[1])
+            names = [fake_step_name(step) for step in steps]
+            if options.wrong_count:
+                names = names[:-1]
+            text = json.dumps({"names": names}, ensure_ascii=False)
+            self.log_message("named %d steps", len(steps))
+        else:
+            text = "fake response"
+        self._send(200, {"model": payload.get("model"), "response": text, "done": True})
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host: str, port: int, options: argparse.Namespace) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+    server.options = options
+    server.lock = threading.Lock()
+    server.requests_served = 0
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Fake Ollama server for step naming tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.0, help="Задержка ответа, секунды")
+    parser.add_argument("--fail", action="store_true", help="Отвечать 500 на каждый запрос")
+    parser.add_argument("--wrong-count", action="store_true", help="Возвращать на одно имя меньше, чем шагов")
+    options = parser.parse_args(argv)
+
+    server = make_server(options.host, options.port, options)
+    print(f"Fake Ollama listening on http://{options.host}:{options.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()